@@ -200,5 +200,12 @@ print(f'Saved to {outpath}')
 drive = GoogleDriveAPI()
 drive.authenticate()
 
-result = drive.upload_file(outpath, mime_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-print(f'Uploaded to Google Drive: {result}')
+# Skips the upload when Drive already has this exact file; resumes if interrupted
+[result] = drive.upload_many([{
+    'path': outpath,
+    'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}])
+if result['status'] == 'failed':
+    print(f'Upload failed: {result["error"]}')
+else:
+    print(f'Google Drive ({result["status"]}): {result["file"]}')
@@ -0,0 +1,318 @@
+"""
+ECE 20001 AC Frequency Sweeps
+Phasor analysis of RLC netlists over thousands of frequencies at once.
+
+The MNA matrix of an RLC circuit is affine in frequency, A(w) = G + jw B,
+and its sparsity pattern never changes. ac_matrices() stamps G and B once;
+ac_sweep() then re-solves every frequency without re-stamping:
+
+    modal    one eigendecomposition of the shifted pencil, after which each
+             frequency is an O(n) diagonal scale plus a matrix product
+             (small circuits, checked against a direct solve)
+    direct   stacked (batch, n, n) numpy.linalg.solve in chunks
+    sparse   CSC structure built once; per frequency only the nonzero
+             values are refilled and refactored with SuperLU
+
+frequency_response() is the one-call entry point: Bode magnitude/phase of
+an output (optionally relative to an input) plus the resonance peak,
+half-power frequencies, bandwidth and Q.
+
+Run:
+    python3 circuit_ac.py circuit.cir V:out [--input V:in] [--from 10]
+        [--to 1meg] [--points 2000] [--csv bode.csv] [--plot bode.png]
+"""
+
+import sys
+
+import numpy as np
+
+from circuit_engine import SPARSE_THRESHOLD, Circuit, Solution, parse_value, sparse, sparse_linalg
+from circuit_sweep import solve_batch
+
+CHUNK_SIZE = 256
+MODAL_RTOL = 1e-9
+
+
+def ac_matrices(circuit, params=None):
+    """
+    Frequency-independent parts of the phasor MNA system.
+
+    Returns:
+        (rows, cols, g, b, z, values) where A(w) = G + jw B is the COO
+        matrix with data g + 1j * w * b, and z is the source phasor vector
+    """
+    values = circuit.values(params)
+    rows, cols, d0, rhs = circuit.stamps(values=values, omega=0.0)
+    _, _, d1, _ = circuit.stamps(values=values, omega=1.0)
+    g = np.array(d0, dtype=complex)
+    b = (np.array(d1, dtype=complex) - g) / 1j
+    return np.array(rows), np.array(cols), g, b, np.array(rhs, dtype=complex), values
+
+
+def _dense(n, rows, cols, data):
+    A = np.zeros((n, n), dtype=complex)
+    np.add.at(A, (rows, cols), data)
+    return A
+
+
+def _solve_direct(G, B, z, omega):
+    x = np.empty((len(omega), len(z)), dtype=complex)
+    for start in range(0, len(omega), CHUNK_SIZE):
+        w = omega[start:start + CHUNK_SIZE]
+        A = G[None] + 1j * w[:, None, None] * B[None]
+        x[start:start + CHUNK_SIZE] = solve_batch(A, np.broadcast_to(z, (len(w), len(z))))
+    return x
+
+
+def _solve_modal(G, B, z, omega):
+    """
+    G + jw B = K (I + (jw - s) K^-1 B) with K = G + s B for a real shift s,
+    so with K^-1 B = V diag(lam) V^-1 every frequency is
+    x(w) = V [(V^-1 K^-1 z) / (1 + (jw - s) lam)].
+
+    Returns None when the pencil is badly conditioned; the caller falls
+    back to direct solves.
+    """
+    positive = omega[omega > 0]
+    shift = float(np.sqrt(positive.min() * positive.max())) if positive.size else 1.0
+    for s in (shift, shift * 10, shift / 10):
+        K = G + s * B
+        try:
+            KinvB = np.linalg.solve(K, B)
+            lam, V = np.linalg.eig(KinvB)
+            y = np.linalg.solve(V, np.linalg.solve(K, z))
+        except np.linalg.LinAlgError:
+            continue
+        if not np.all(np.isfinite(lam)) or np.linalg.cond(V) > 1e8:
+            continue
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = (y[None, :] / (1 + (1j * omega[:, None] - s) * lam[None, :])) @ V.T
+
+        # Spot-check against the unreduced system before trusting it
+        for i in {0, len(omega) // 2, len(omega) - 1}:
+            A = G + 1j * omega[i] * B
+            residual = np.linalg.norm(A @ x[i] - z)
+            if not residual <= MODAL_RTOL * max(np.linalg.norm(A) * np.linalg.norm(x[i]), np.linalg.norm(z)):
+                break
+        else:
+            return x
+    return None
+
+
+def _solve_sparse(n, rows, cols, g, b, z, omega):
+    # Map every COO entry to its slot in a fixed CSC structure once, so each
+    # frequency only refills the data array instead of re-assembling.
+    keys, position = np.unique(cols * n + rows, return_inverse=True)
+    indptr = np.searchsorted(keys // n, np.arange(n + 1))
+    g_data = np.zeros(len(keys), dtype=complex)
+    b_data = np.zeros(len(keys), dtype=complex)
+    np.add.at(g_data, position, g)
+    np.add.at(b_data, position, b)
+    A = sparse.csc_matrix((g_data, keys % n, indptr), shape=(n, n))
+
+    x = np.full((len(omega), n), np.nan, dtype=complex)
+    for i, w in enumerate(omega):
+        A.data = g_data + 1j * w * b_data
+        try:
+            x[i] = sparse_linalg.splu(A).solve(z)
+        except RuntimeError:
+            continue
+    return x
+
+
+def ac_sweep(circuit, freqs, params=None, method="auto"):
+    """
+    Phasor solution at every frequency.
+
+    Args:
+        circuit: Circuit with R/L/C elements and AC sources
+        freqs: Frequencies in Hz
+        params: Values for parameter names
+        method: "modal", "direct", "sparse" or "auto" (sparse above
+                SPARSE_THRESHOLD unknowns, else modal with direct fallback)
+
+    Returns:
+        Solution whose accessors return one complex phasor per frequency;
+        frequencies where the circuit is singular come back as NaN
+    """
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+    omega = 2 * np.pi * freqs
+    rows, cols, g, b, z, values = ac_matrices(circuit, params)
+    n = circuit.size
+
+    if method == "auto":
+        method = "sparse" if sparse is not None and n > SPARSE_THRESHOLD else "modal"
+    if method == "sparse":
+        if sparse is None:
+            raise ImportError("Sparse backend needs SciPy: pip install scipy")
+        x = _solve_sparse(n, rows, cols, g, b, z, omega)
+    elif method in ("modal", "direct"):
+        G, B = _dense(n, rows, cols, g), _dense(n, rows, cols, b)
+        x = _solve_modal(G, B, z, omega) if method == "modal" else None
+        if x is None:
+            x = _solve_direct(G, B, z, omega)
+    else:
+        raise ValueError(f"Unknown method '{method}' (use modal, direct, sparse or auto)")
+
+    return Solution(circuit, x, values, omega)
+
+
+def resonance(freqs, response):
+    """
+    Peak and half-power points of a magnitude response.
+
+    Args:
+        freqs: Frequencies in Hz (increasing)
+        response: Complex or magnitude response at those frequencies
+
+    Returns:
+        {"peak_hz", "peak_gain", "f_low", "f_high", "bandwidth_hz", "q"};
+        half-power points are linearly interpolated and None when the
+        sweep does not reach them
+    """
+    mag = np.abs(np.asarray(response))
+    valid = np.isfinite(mag)
+    if not valid.any():
+        raise ValueError("Response is singular at every frequency")
+    peak = int(np.nanargmax(np.where(valid, mag, -np.inf)))
+    half = mag[peak] / np.sqrt(2)
+
+    def crossing(indices):
+        prev = peak
+        for i in indices:
+            if valid[i] and mag[i] <= half:
+                t = (mag[prev] - half) / (mag[prev] - mag[i]) if mag[prev] != mag[i] else 0.0
+                return float(freqs[prev] + t * (freqs[i] - freqs[prev]))
+            prev = i
+        return None
+
+    f_low = crossing(range(peak - 1, -1, -1))
+    f_high = crossing(range(peak + 1, len(mag)))
+    bandwidth = f_high - f_low if f_low is not None and f_high is not None else None
+    return {
+        "peak_hz": float(freqs[peak]),
+        "peak_gain": float(mag[peak]),
+        "f_low": f_low,
+        "f_high": f_high,
+        "bandwidth_hz": bandwidth,
+        "q": float(freqs[peak] / bandwidth) if bandwidth else None,
+    }
+
+
+def frequency_response(circuit, output, fstart=1.0, fstop=1e6, points=1000, input=None, params=None, method="auto"):
+    """
+    Bode data and resonance figures in one call.
+
+    Args:
+        circuit: Circuit to analyse
+        output: Quantity spec of the output, e.g. "V:out" or "I:R1"
+        fstart, fstop: Sweep range in Hz (log spaced)
+        points: Number of frequencies
+        input: Optional quantity spec to divide by (e.g. "V:in"); without
+               it the response is the raw phasor, which is the transfer
+               function when the source is "AC 1"
+
+    Returns:
+        {"freqs", "response", "magnitude_db", "phase_deg", "resonance"}
+    """
+    freqs = np.logspace(np.log10(fstart), np.log10(fstop), points)
+    solution = ac_sweep(circuit, freqs, params=params, method=method)
+    response = np.broadcast_to(solution.quantity(output), freqs.shape).astype(complex)
+    if input is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            response = response / solution.quantity(input)
+
+    with np.errstate(divide="ignore"):
+        magnitude_db = 20 * np.log10(np.abs(response))
+    return {
+        "freqs": freqs,
+        "response": response,
+        "magnitude_db": magnitude_db,
+        "phase_deg": np.rad2deg(np.unwrap(np.angle(response))),
+        "resonance": resonance(freqs, response),
+    }
+
+
+def plot_bode(result, path, title=None):
+    """Write a Bode plot of a frequency_response() result. Needs matplotlib."""
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise ImportError("Bode plots need matplotlib: pip install matplotlib") from None
+
+    fig, (ax_mag, ax_phase) = plt.subplots(2, 1, sharex=True, figsize=(8, 6))
+    ax_mag.semilogx(result["freqs"], result["magnitude_db"])
+    ax_mag.set_ylabel("Magnitude (dB)")
+    ax_phase.semilogx(result["freqs"], result["phase_deg"])
+    ax_phase.set_ylabel("Phase (deg)")
+    ax_phase.set_xlabel("Frequency (Hz)")
+    peak = result["resonance"]["peak_hz"]
+    for ax in (ax_mag, ax_phase):
+        ax.grid(True, which="both", alpha=0.3)
+        ax.axvline(peak, color="gray", linestyle="--", linewidth=0.8)
+    if title:
+        ax_mag.set_title(title)
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+
+
+def _parse_cli(argv):
+    options = {"--input": None, "--from": "1", "--to": "1meg", "--points": "1000", "--csv": None, "--plot": None}
+    positional = []
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = next(args)
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+def main():
+    positional, options = _parse_cli(sys.argv[1:])
+    if len(positional) != 2:
+        print("Usage: circuit_ac.py circuit.cir V:out [--input V:in] [--from 10] [--to 1meg] "
+              "[--points 2000] [--csv bode.csv] [--plot bode.png]")
+        sys.exit(1)
+
+    circuit = Circuit.from_file(positional[0])
+    result = frequency_response(
+        circuit,
+        positional[1],
+        fstart=parse_value(options["--from"]),
+        fstop=parse_value(options["--to"]),
+        points=int(options["--points"]),
+        input=options["--input"],
+    )
+
+    res = result["resonance"]
+    print(f"Swept {len(result['freqs'])} frequencies")
+    print(f"  Peak: {res['peak_gain']:.6g} ({20 * np.log10(res['peak_gain']):.2f} dB) at {res['peak_hz']:.6g} Hz")
+    if res["f_low"] is not None:
+        print(f"  Lower -3 dB: {res['f_low']:.6g} Hz")
+    if res["f_high"] is not None:
+        print(f"  Upper -3 dB: {res['f_high']:.6g} Hz")
+    if res["q"] is not None:
+        print(f"  Bandwidth: {res['bandwidth_hz']:.6g} Hz, Q = {res['q']:.4g}")
+
+    if options["--csv"]:
+        np.savetxt(
+            options["--csv"],
+            np.column_stack([result["freqs"], result["magnitude_db"], result["phase_deg"]]),
+            delimiter=",",
+            header="freq_hz,magnitude_db,phase_deg",
+            comments="",
+        )
+        print(f"  Wrote {options['--csv']}")
+    if options["--plot"]:
+        plot_bode(result, options["--plot"], title=f"{positional[1]} ({positional[0]})")
+        print(f"  Wrote {options['--plot']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+"""
+ECE 20001 Circuit Engine
+Modified Nodal Analysis (MNA) solver for SPICE-like netlists.
+
+Replaces hand-written KVL/KCL equations with one reusable engine: parse a
+netlist, stamp the MNA matrix, solve it numerically with LU (NumPy). A
+symbolic SymPy solve is available with solve_symbolic() when an exact
+answer is needed.
+
+Netlist format (one element per line, '*' starts a comment line,
+';' starts an inline comment, node "0" or "gnd" is ground):
+
+    R<name> n1 n2 value                 resistor
+    C<name> n1 n2 value                 capacitor (open circuit at DC)
+    L<name> n1 n2 value                 inductor (short circuit at DC)
+    V<name> n+ n- value [AC mag [deg]]  independent voltage source (+ at n+)
+    I<name> n+ n- value [AC mag [deg]]  independent current source, arrow n+ -> n-
+    E<name> n+ n- nc+ nc- gain          VCVS: V(n+,n-) = gain * V(nc+,nc-)
+    G<name> n+ n- nc+ nc- gm            VCCS: arrow n+ -> n-, I = gm * V(nc+,nc-)
+    F<name> n+ n- ctrl gain             CCCS: arrow n+ -> n-, I = gain * I(ctrl)
+    H<name> n+ n- ctrl r                CCVS: V(n+,n-) = r * I(ctrl)
+    .param name=value ...               default parameter values
+
+Values accept SPICE suffixes (1k, 4.7u, 2meg) or a parameter name.
+I(ctrl) is the current through a resistor or inductor (n1 -> n2) or a
+V/E/H source (n+ -> n- through the source), so "3*Io where Io flows B -> A through 12
+ohms" is just "F1 E D R12 3" with "R12 B A 12".
+
+solve(omega=...) does phasor analysis at one angular frequency. Sources
+with an "AC mag deg" spec are the phasor excitations (SPICE rules: once
+any source has one, the others are off); a circuit with no AC specs uses
+every source value as a zero-phase phasor. See circuit_ac.py for sweeps.
+
+Run: python3 circuit_engine.py circuit.cir [ground_node]
+"""
+
+import re
+import sys
+from collections import Counter, namedtuple
+
+import numpy as np
+
+try:
+    import scipy.sparse as sparse
+    import scipy.sparse.linalg as sparse_linalg
+except ImportError:
+    sparse = None
+
+GROUND_NAMES = ("0", "gnd", "GND")
+
+SUFFIXES = {
+    "f": 1e-15, "p": 1e-12, "n": 1e-9, "u": 1e-6, "m": 1e-3,
+    "k": 1e3, "meg": 1e6, "g": 1e9, "t": 1e12,
+}
+VALUE_RE = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|[fpnumkgt])?[a-z]*$", re.IGNORECASE)
+
+# Above this many unknowns, backend="auto" assembles CSC and uses sparse LU
+SPARSE_THRESHOLD = 200
+
+# Element kinds whose current is an extra MNA unknown
+BRANCH_KINDS = ("V", "E", "H", "L")
+NODE_COUNTS = {"R": 2, "C": 2, "L": 2, "V": 2, "I": 2, "E": 4, "G": 4, "F": 2, "H": 2}
+
+# ac is (magnitude, phase in degrees) for sources with an AC spec
+Element = namedtuple("Element", ["kind", "name", "nodes", "value", "control", "ac"], defaults=(None,))
+
+
+def parse_value(token):
+    """
+    Parse a SPICE number ("4.7k", "10u", "2meg") or return a parameter name.
+
+    Returns:
+        float, or the parameter name as a string (a leading '-' is kept)
+    """
+    match = VALUE_RE.match(token)
+    if match:
+        number, suffix = match.groups()
+        return float(number) * SUFFIXES.get((suffix or "").lower(), 1.0)
+    name = token.strip("{}")
+    if not re.match(r"^-?[A-Za-z_]\w*$", name):
+        raise ValueError(f"Bad value: {token}")
+    return name
+
+
+def _parse_source(tokens, name, line_no):
+    """Split "[value] AC mag [deg]" into (value, (mag, deg))."""
+    upper = [t.upper() for t in tokens]
+    at = upper.index("AC")
+    if at > 1 or len(tokens) - at not in (2, 3):
+        raise ValueError(f"Line {line_no}: expected '{name} n+ n- [value] AC mag [deg]'")
+    value = tokens[0] if at == 1 else "0"
+    ac = tuple(parse_value(t) for t in tokens[at + 1:])
+    if any(isinstance(v, str) for v in ac):
+        raise ValueError(f"Line {line_no}: AC magnitude and phase must be numbers")
+    return value, (ac + (0.0,))[:2]
+
+
+def parse_netlist(text):
+    """
+    Parse netlist text.
+
+    Returns:
+        (elements, params) where params holds .param defaults
+    """
+    elements = []
+    params = {}
+    for line_no, raw in enumerate(text.splitlines(), 1):
+        line = raw.split(";", 1)[0].strip()
+        if not line or line.startswith("*"):
+            continue
+
+        tokens = line.split()
+        if tokens[0].startswith("."):
+            if tokens[0].lower() == ".param":
+                for assignment in " ".join(tokens[1:]).replace(" = ", "=").split():
+                    name, value = assignment.split("=", 1)
+                    params[name] = parse_value(value)
+            continue
+
+        name = tokens[0]
+        kind = name[0].upper()
+        if kind not in NODE_COUNTS:
+            raise ValueError(f"Line {line_no}: unknown element type '{name}'")
+
+        n_nodes = NODE_COUNTS[kind]
+        control = None
+        ac = None
+        if kind in ("V", "I") and len(tokens) > 3 and "AC" in (t.upper() for t in tokens[3:]):
+            nodes, value, ac = tuple(tokens[1:3]), *_parse_source(tokens[3:], name, line_no)
+        elif kind in ("F", "H"):
+            if len(tokens) != 5:
+                raise ValueError(f"Line {line_no}: expected '{name} n+ n- ctrl value'")
+            nodes, control, value = tuple(tokens[1:3]), tokens[3], tokens[4]
+        else:
+            if len(tokens) != n_nodes + 2:
+                raise ValueError(f"Line {line_no}: expected {n_nodes} nodes and a value for '{name}'")
+            nodes, value = tuple(tokens[1:n_nodes + 1]), tokens[n_nodes + 1]
+
+        elements.append(Element(kind, name, nodes, parse_value(value), control, ac))
+
+    duplicates = {n for n, count in Counter(e.name for e in elements).items() if count > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate element names: {', '.join(sorted(duplicates))}")
+    return elements, params
+
+
+class Circuit:
+    def __init__(self, elements, ground=None, params=None):
+        """
+        Build the MNA index for a list of elements.
+
+        Args:
+            elements: Element tuples (see parse_netlist)
+            ground: Reference node (default: "0" or "gnd", whichever appears)
+            params: Default values for parameter names used in the netlist
+        """
+        self.elements = list(elements)
+        self.by_name = {e.name: e for e in self.elements}
+        self.params = dict(params or {})
+
+        # dict keeps first-seen order with O(1) membership
+        all_nodes = dict.fromkeys(node for e in self.elements for node in e.nodes)
+
+        if ground is None:
+            ground = next((g for g in GROUND_NAMES if g in all_nodes), None)
+            if ground is None:
+                raise ValueError("No ground node. Name one node 0 or pass ground=...")
+        elif ground not in all_nodes:
+            raise ValueError(f"Ground node '{ground}' is not in the circuit")
+        self.ground = ground
+
+        self.nodes = [n for n in all_nodes if n != ground]
+        self.node_index = {n: i for i, n in enumerate(self.nodes)}
+        self.node_index[ground] = -1
+
+        self.branches = [e.name for e in self.elements if e.kind in BRANCH_KINDS]
+        self.branch_index = {name: len(self.nodes) + i for i, name in enumerate(self.branches)}
+        self.size = len(self.nodes) + len(self.branches)
+
+        for e in self.elements:
+            if e.control is not None:
+                ctrl = self.by_name.get(e.control)
+                if ctrl is None or ctrl.kind not in BRANCH_KINDS + ("R",):
+                    raise ValueError(
+                        f"{e.name}: control '{e.control}' must be a resistor, inductor or a V/E/H source"
+                    )
+        self.has_ac = any(e.ac is not None for e in self.elements)
+
+    @classmethod
+    def from_netlist(cls, text, ground=None):
+        elements, params = parse_netlist(text)
+        return cls(elements, ground=ground, params=params)
+
+    @classmethod
+    def from_file(cls, path, ground=None):
+        with open(path) as f:
+            return cls.from_netlist(f.read(), ground=ground)
+
+    def netlist_lines(self):
+        """Element lines in a canonical order, for hashing a topology."""
+        lines = []
+        for e in sorted(self.elements, key=lambda e: e.name):
+            fields = [e.name, *e.nodes]
+            if e.control is not None:
+                fields.append(e.control)
+            fields.append(e.value if isinstance(e.value, str) else repr(float(e.value)))
+            if e.ac is not None:
+                fields += ["AC", repr(float(e.ac[0])), repr(float(e.ac[1]))]
+            lines.append(" ".join(fields))
+        return lines
+
+    def parameter_names(self):
+        """Parameter names referenced by element values."""
+        names = []
+        for e in self.elements:
+            if isinstance(e.value, str) and e.value.lstrip("-") not in names:
+                names.append(e.value.lstrip("-"))
+        return names
+
+    def values(self, params=None):
+        """Numeric value of every element, resolving parameter names."""
+        merged = {**self.params, **(params or {})}
+        out = {}
+        for e in self.elements:
+            value = e.value
+            if isinstance(value, str):
+                sign = -1.0 if value.startswith("-") else 1.0
+                key = value.lstrip("-")
+                if key not in merged:
+                    raise KeyError(f"{e.name}: no value for parameter '{key}'")
+                value = sign * merged[key]
+            out[e.name] = value
+        return out
+
+    def _control_terms(self, name, values):
+        """
+        I(ctrl) as a list of (unknown index, coefficient).
+
+        Resistor currents are (V(n1) - V(n2)) / R; source currents are
+        their own branch unknowns.
+        """
+        ctrl = self.by_name[name]
+        if ctrl.kind == "R":
+            a, b = (self.node_index[n] for n in ctrl.nodes)
+            g = 1 / values[name]
+            return [(a, g), (b, -g)]
+        return [(self.branch_index[name], 1)]
+
+    def source_phasor(self, name, value):
+        """Excitation of an independent source in phasor analysis."""
+        e = self.by_name[name]
+        if not self.has_ac:
+            return value
+        if e.ac is None:
+            return 0
+        mag, deg = e.ac
+        return mag * np.exp(1j * np.deg2rad(deg))
+
+    def stamps(self, params=None, values=None, omega=None):
+        """
+        MNA stamps as COO triplets.
+
+        Args:
+            omega: Angular frequency for phasor analysis; None is DC, where
+                   capacitors are open and inductors are shorts. Capacitor
+                   and inductor entries are stamped for any omega (even 0),
+                   so the sparsity pattern does not depend on frequency.
+
+        Returns:
+            (rows, cols, data, rhs) with duplicates to be summed; ground
+            terms are already dropped. Entries keep the type of the
+            element values, so SymPy values give SymPy stamps.
+        """
+        values = values if values is not None else self.values(params)
+        rows, cols, data = [], [], []
+        rhs = [0] * self.size
+
+        def add(r, c, v):
+            if r >= 0 and c >= 0:
+                rows.append(r)
+                cols.append(c)
+                data.append(v)
+
+        def inject(node, current):
+            if node >= 0:
+                rhs[node] += current
+
+        for e in self.elements:
+            v = values[e.name]
+            n = [self.node_index[node] for node in e.nodes]
+
+            if e.kind == "R":
+                g = 1 / v
+                add(n[0], n[0], g)
+                add(n[1], n[1], g)
+                add(n[0], n[1], -g)
+                add(n[1], n[0], -g)
+
+            elif e.kind == "C":
+                if omega is not None:
+                    y = 1j * omega * v
+                    add(n[0], n[0], y)
+                    add(n[1], n[1], y)
+                    add(n[0], n[1], -y)
+                    add(n[1], n[0], -y)
+
+            elif e.kind == "I":
+                if omega is not None:
+                    v = self.source_phasor(e.name, v)
+                inject(n[0], -v)
+                inject(n[1], v)
+
+            elif e.kind == "G":
+                for row, sign in ((n[0], 1), (n[1], -1)):
+                    add(row, n[2], sign * v)
+                    add(row, n[3], -sign * v)
+
+            elif e.kind == "F":
+                for idx, coeff in self._control_terms(e.control, values):
+                    add(n[0], idx, v * coeff)
+                    add(n[1], idx, -v * coeff)
+
+            else:
+                k = self.branch_index[e.name]
+                add(n[0], k, 1)
+                add(n[1], k, -1)
+                add(k, n[0], 1)
+                add(k, n[1], -1)
+                if e.kind == "V":
+                    rhs[k] = v if omega is None else self.source_phasor(e.name, v)
+                elif e.kind == "L":
+                    if omega is not None:
+                        add(k, k, -1j * omega * v)
+                elif e.kind == "E":
+                    add(k, n[2], -v)
+                    add(k, n[3], v)
+                else:
+                    for idx, coeff in self._control_terms(e.control, values):
+                        add(k, idx, -v * coeff)
+
+        return rows, cols, data, rhs
+
+    def matrix(self, params=None, omega=None):
+        """Dense MNA system (A, z); complex when omega is given."""
+        dtype = float if omega is None else complex
+        rows, cols, data, rhs = self.stamps(params, omega=omega)
+        A = np.zeros((self.size, self.size), dtype=dtype)
+        np.add.at(A, (rows, cols), data)
+        return A, np.array(rhs, dtype=dtype)
+
+    def sparse_matrix(self, params=None, omega=None):
+        """Sparse MNA system (A as CSC, z). Requires SciPy."""
+        if sparse is None:
+            raise ImportError("Sparse backend needs SciPy: pip install scipy")
+        dtype = float if omega is None else complex
+        rows, cols, data, rhs = self.stamps(params, omega=omega)
+        A = sparse.coo_matrix(
+            (np.array(data, dtype=dtype), (rows, cols)), shape=(self.size, self.size)
+        ).tocsc()
+        return A, np.array(rhs, dtype=dtype)
+
+    def _use_sparse(self, backend):
+        if backend == "auto":
+            return sparse is not None and self.size > SPARSE_THRESHOLD
+        if backend not in ("dense", "sparse"):
+            raise ValueError(f"Unknown backend '{backend}' (use dense, sparse or auto)")
+        return backend == "sparse"
+
+    def solve(self, params=None, backend="auto", omega=None):
+        """
+        Solve the circuit numerically.
+
+        Args:
+            params: Values for parameter names (overrides .param defaults)
+            backend: "dense" (LAPACK LU), "sparse" (SuperLU on CSC, memory
+                     and time scale with nonzeros), or "auto" to pick sparse
+                     above SPARSE_THRESHOLD unknowns
+            omega: Angular frequency (rad/s) for a phasor solve; None is DC
+
+        Returns:
+            Solution (complex phasors when omega is given)
+        """
+        values = self.values(params)
+        dtype = float if omega is None else complex
+        rows, cols, data, rhs = self.stamps(values=values, omega=omega)
+        rhs = np.array(rhs, dtype=dtype)
+        try:
+            if self._use_sparse(backend):
+                A = sparse.coo_matrix(
+                    (np.array(data, dtype=dtype), (rows, cols)), shape=(self.size, self.size)
+                ).tocsc()
+                x = sparse_linalg.splu(A).solve(rhs)
+            else:
+                A = np.zeros((self.size, self.size), dtype=dtype)
+                np.add.at(A, (rows, cols), data)
+                x = np.linalg.solve(A, rhs)
+        except (np.linalg.LinAlgError, RuntimeError):
+            raise ValueError(
+                "Singular MNA matrix: check for floating nodes, voltage-source "
+                "loops or current-source cutsets"
+            ) from None
+        return Solution(self, x, values, omega)
+
+    def solve_symbolic(self, symbols=None):
+        """
+        Exact solve with SymPy (opt-in, much slower than solve()).
+
+        Args:
+            symbols: Parameter name -> SymPy symbol or number. Parameters
+                     without an entry become symbols of the same name;
+                     numeric element values become exact Rationals.
+
+        Returns:
+            Solution whose values are SymPy expressions
+        """
+        import sympy as sp
+
+        symbols = dict(symbols or {})
+        for name in self.parameter_names():
+            symbols.setdefault(name, sp.Symbol(name, positive=True))
+        values = {}
+        for e in self.elements:
+            if isinstance(e.value, str):
+                key = e.value.lstrip("-")
+                value = symbols[key]
+                values[e.name] = -value if e.value.startswith("-") else value
+            else:
+                values[e.name] = sp.nsimplify(e.value, rational=True)
+
+        rows, cols, data, rhs = self.stamps(values=values)
+        A = sp.zeros(self.size, self.size)
+        for r, c, v in zip(rows, cols, data):
+            A[r, c] += v
+        z = sp.Matrix(rhs)
+        x = A.LUsolve(z).applyfunc(sp.simplify)
+        return Solution(self, np.array(list(x), dtype=object), values)
+
+
+class Solution:
+    def __init__(self, circuit, x, values, omega=None):
+        """
+        Solved node voltages and branch currents.
+
+        Args:
+            circuit: The Circuit that was solved
+            x: MNA solution vector (node voltages, then branch currents),
+               or a (batch, size) stack of them; accessors then return
+               one value per batch row
+            values: Element values used for the solve
+            omega: Angular frequency of a phasor solution (scalar, or one
+                   per batch row for a frequency sweep); None for DC
+        """
+        self.circuit = circuit
+        self.x = x
+        self.values = values
+        self.omega = omega
+
+    def voltage(self, node, ref=None):
+        """V(node) relative to ground, or V(node) - V(ref)."""
+        i = self.circuit.node_index[node]
+        v = self.x[..., i] if i >= 0 else 0
+        if ref is not None:
+            v = v - self.voltage(ref)
+        return v
+
+    def element_voltage(self, name):
+        """V(n1) - V(n2) across an element (n+ - n- for sources)."""
+        e = self.circuit.by_name[name]
+        return self.voltage(e.nodes[0], e.nodes[1])
+
+    def current(self, name):
+        """
+        Current through an element, flowing n1 -> n2 (R, L, C) or
+        n+ -> n- through the element (sources).
+        """
+        e = self.circuit.by_name[name]
+        v = self.values[name]
+        if e.kind == "R":
+            return self.element_voltage(name) / v
+        if e.kind == "C":
+            if self.omega is None:
+                return 0.0
+            return 1j * self.omega * v * self.element_voltage(name)
+        if e.kind == "I":
+            if self.omega is not None:
+                return self.circuit.source_phasor(name, v)
+            return v
+        if e.kind == "G":
+            return v * self.voltage(e.nodes[2], e.nodes[3])
+        if e.kind == "F":
+            return v * self.current(e.control)
+        return self.x[..., self.circuit.branch_index[name]]
+
+    def power(self, name):
+        """
+        Power absorbed by an element (passive sign convention). For phasor
+        solutions this is the complex power V I* / 2 (peak phasors), whose
+        real part is the average power.
+        """
+        if self.omega is not None:
+            return self.element_voltage(name) * np.conj(self.current(name)) / 2
+        return self.element_voltage(name) * self.current(name)
+
+    def quantity(self, spec):
+        """
+        Evaluate a quantity spec: "V:node", "V:node,ref", "I:element" or
+        "P:element", with a leading "-" to flip the sign.
+        """
+        sign = -1 if spec.startswith("-") else 1
+        kind, target = spec.lstrip("-").split(":", 1)
+        if kind == "V":
+            return sign * self.voltage(*target.split(","))
+        if kind == "I":
+            return sign * self.current(target)
+        if kind == "P":
+            return sign * self.power(target)
+        raise ValueError(f"Unknown quantity '{spec}' (use V:, I: or P:)")
+
+    def node_voltages(self):
+        return {node: self.voltage(node) for node in self.circuit.nodes}
+
+    def as_dict(self):
+        """Node voltages, element currents and absorbed powers."""
+        names = [e.name for e in self.circuit.elements]
+        return {
+            "voltages": self.node_voltages(),
+            "currents": {n: self.current(n) for n in names},
+            "powers": {n: self.power(n) for n in names},
+        }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: circuit_engine.py circuit.cir [ground_node]")
+        sys.exit(1)
+
+    circuit = Circuit.from_file(sys.argv[1], ground=sys.argv[2] if len(sys.argv) > 2 else None)
+    result = circuit.solve().as_dict()
+
+    print("Node voltages:")
+    for node, v in result["voltages"].items():
+        print(f"  V({node}) = {v:.6g} V")
+    print("Element currents and absorbed power:")
+    for name in result["currents"]:
+        print(f"  {name}: I = {result['currents'][name]:.6g} A, P = {result['powers'][name]:.6g} W")
+
+
+if __name__ == "__main__":
+    main()
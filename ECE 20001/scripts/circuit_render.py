@@ -0,0 +1,438 @@
+"""
+ECE 20001 Solution Trace Renderers
+Turns a circuit_trace.solution_trace() dict into plain text, Markdown, or
+a standalone HTML page in the style of mesh_analysis/explanation (same
+step layout, collapsible sections, verification cards and answer box).
+
+Example:
+    trace = solution_trace(circuit, meshes=..., answers={"Io": "I:R20"})
+    render_markdown(trace)
+    render_html(trace)
+"""
+
+import html
+import re
+
+SUBSCRIPTS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+MESH_CLASSES = ["mesh1", "mesh2", "mesh3"]
+MESH_COLORS = ["#e74c3c", "#3498db", "#9b59b6"]
+
+
+def _num(value):
+    value = float(value)
+    if abs(value) < 1e-12:
+        value = 0.0
+    return f"{value:.6g}"
+
+
+def _direction(value):
+    if abs(value) < 1e-12:
+        return "zero"
+    return "as assumed" if value > 0 else "opposite to the assumed direction"
+
+
+# (title, intro) for each numbered step, shared by every renderer
+STEPS = [
+    ("Identify Circuit Topology", "Nodes and the elements connected to each."),
+    ("Define Mesh Currents", "One current per mesh, in the traversal direction listed."),
+    ("Write KVL Equations", "Current sources fix mesh currents; KVL is written around "
+                            "meshes (or supermeshes) that avoid them."),
+    ("Solve the System of Equations", "Solving the system gives every mesh current."),
+    ("Element Currents and Answers", "Each element current is the signed sum of the mesh "
+                                     "currents through it."),
+    ("Verify Solution", "Independent checks on the solved circuit."),
+]
+
+
+def render_text(trace):
+    lines = [trace["title"], "=" * len(trace["title"]), ""]
+
+    def heading(k):
+        title, intro = STEPS[k - 1]
+        lines.extend([f"STEP {k}: {title}", "-" * 60, intro])
+
+    heading(1)
+    for node, elements in trace["circuit"]["nodes"].items():
+        suffix = " (ground)" if node == trace["circuit"]["ground"] else ""
+        lines.append(f"  {node}{suffix}: {', '.join(elements)}")
+    lines.append("")
+
+    heading(2)
+    for mesh in trace["meshes"]:
+        lines.append(f"  {mesh['name']}: {' -> '.join(mesh['path'])}  [{', '.join(mesh['elements'])}]")
+    for sm in trace["supermeshes"]:
+        lines.append(f"  Supermesh {' + '.join(sm['meshes'])} (around {', '.join(sm['excluded'])})")
+    lines.append("")
+
+    heading(3)
+    for k, eq in enumerate(trace["equations"], 1):
+        lines.append(f"  {eq['label']}:")
+        if eq["kind"] == "constraint":
+            lines.append(f"    {eq['source']}: {eq['note']}")
+        for term in eq.get("terms", []):
+            lines.append(f"    {term}")
+        lines.append(f"    => {eq['equation']}   ({k})")
+    lines.append("")
+
+    heading(4)
+    for name, value in trace["mesh_currents"].items():
+        lines.append(f"  {name} = {_num(value)} A ({_direction(value)})")
+    lines.append("")
+
+    heading(5)
+    for name, current in trace["element_currents"].items():
+        lines.append(f"  I({name}) = {current['expression'] or '0'} = {_num(current['value'])} A")
+    for answer in trace["answers"]:
+        expression = f"{answer['expression']} = " if answer["expression"] else ""
+        lines.append(f"  {answer['label']} = {expression}{_num(answer['value'])} {answer['unit']}")
+    lines.append("")
+
+    heading(6)
+    for check in trace["verification"]["checks"]:
+        status = "PASS" if check["passed"] else "FAIL"
+        lines.append(f"  {status}  {check['name']} (max residual {check['max_residual']:.2e})")
+        for detail in check["details"]:
+            lines.append(f"        {detail}")
+    lines.append(f"  Confidence: {trace['verification']['confidence']}")
+
+    if trace["answers"]:
+        lines.extend(["", "FINAL ANSWER"])
+        for answer in trace["answers"]:
+            lines.append(f"  {answer['label']} = {_num(answer['value'])} {answer['unit']}")
+    return "\n".join(lines) + "\n"
+
+
+def render_markdown(trace):
+    out = [f"# {trace['title']}", ""]
+
+    def heading(k):
+        title, intro = STEPS[k - 1]
+        out.extend([f"## Step {k}: {title}", "", intro, ""])
+
+    heading(1)
+    out.extend(["| Node | Connected elements |", "|---|---|"])
+    for node, elements in trace["circuit"]["nodes"].items():
+        label = f"{node} (ground)" if node == trace["circuit"]["ground"] else node
+        out.append(f"| {label} | {', '.join(elements)} |")
+    out.append("")
+
+    heading(2)
+    for mesh in trace["meshes"]:
+        shared = f", shared with {', '.join(mesh['shared'])}" if mesh["shared"] else ""
+        out.append(f"- **{mesh['name']}**: {' → '.join(mesh['path'])} ({', '.join(mesh['elements'])}{shared})")
+    for sm in trace["supermeshes"]:
+        out.append(f"- **Supermesh** {' + '.join(sm['meshes'])}, skipping {', '.join(sm['excluded'])}")
+    out.append("")
+
+    heading(3)
+    for k, eq in enumerate(trace["equations"], 1):
+        out.append(f"**{eq['label']}**")
+        out.append("")
+        detail = [f"{eq['source']}: {eq['note']}"] if eq["kind"] == "constraint" else eq["terms"]
+        out.extend(["```", *detail, f"=> {eq['equation']}   ({k})", "```", ""])
+
+    heading(4)
+    out.extend(["| Mesh current | Value | Direction |", "|---|---|---|"])
+    for name, value in trace["mesh_currents"].items():
+        out.append(f"| {name} | {_num(value)} A | {_direction(value)} |")
+    out.append("")
+
+    heading(5)
+    out.extend(["| Element | Current | Value |", "|---|---|---|"])
+    for name, current in trace["element_currents"].items():
+        out.append(f"| {name} | `{current['expression'] or '0'}` | {_num(current['value'])} A |")
+    out.append("")
+    for answer in trace["answers"]:
+        expression = f"`{answer['expression']}` = " if answer["expression"] else ""
+        out.append(f"- **{answer['label']}** = {expression}{_num(answer['value'])} {answer['unit']}")
+    out.append("")
+
+    heading(6)
+    for check in trace["verification"]["checks"]:
+        mark = "✓" if check["passed"] else "✗"
+        out.append(f"- {mark} **{check['name']}** (max residual {check['max_residual']:.2e})")
+        for detail in check["details"]:
+            out.append(f"  - {detail}")
+    out.append(f"\nConfidence: **{trace['verification']['confidence']}**\n")
+
+    if trace["answers"]:
+        out.append("## Final Answer\n")
+        for answer in trace["answers"]:
+            out.append(f"**{answer['label']} = {_num(answer['value'])} {answer['unit']}**  ")
+    return "\n".join(out).rstrip() + "\n"
+
+
+CSS = """
+        :root {
+            --primary: #2c3e50; --secondary: #34495e; --accent: #3498db;
+            --success: #27ae60; --warning: #f39c12; --danger: #e74c3c; --light: #ecf0f1;
+            --mesh1: #e74c3c; --mesh2: #3498db; --mesh3: #9b59b6;
+        }
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh; line-height: 1.6;
+        }
+        .container {
+            max-width: 1000px; margin: 0 auto; background: white; padding: 40px;
+            border-radius: 16px; box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+        }
+        .header { border-bottom: 3px solid var(--accent); padding-bottom: 20px; margin-bottom: 30px; }
+        .source { color: #666; font-size: 14px; margin-bottom: 8px; text-transform: uppercase; letter-spacing: 1px; }
+        h1 { color: var(--primary); font-size: 32px; font-weight: 700; }
+        h2 {
+            color: var(--secondary); margin: 30px 0 15px; font-size: 22px; cursor: pointer;
+            user-select: none; padding: 15px 20px; background: var(--light); border-radius: 8px;
+            display: flex; align-items: center; transition: all 0.3s ease;
+        }
+        h2:hover { background: #dfe6e9; transform: translateX(5px); }
+        h2::before { content: '▼'; font-size: 12px; margin-right: 15px; transition: transform 0.3s ease; color: var(--accent); }
+        h2.collapsed::before { transform: rotate(-90deg); }
+        .step-number {
+            background: var(--accent); color: white; width: 30px; height: 30px; border-radius: 50%;
+            display: inline-flex; align-items: center; justify-content: center; margin-right: 12px;
+            font-size: 14px; font-weight: bold;
+        }
+        .step {
+            margin-bottom: 25px; padding: 25px; background: #f8f9fa;
+            border-left: 5px solid var(--accent); border-radius: 0 12px 12px 0;
+        }
+        .step.hidden { display: none; }
+        .step p { margin-bottom: 15px; color: var(--secondary); }
+        .equation-block { background: white; border: 2px solid #e0e0e0; border-radius: 10px; padding: 20px; margin: 20px 0; overflow-x: auto; }
+        .equation-title { font-weight: 600; color: var(--primary); margin-bottom: 12px; font-size: 16px; }
+        .equation {
+            font-family: 'Courier New', monospace; background: #fafafa; padding: 15px 20px; margin: 10px 0;
+            border-radius: 8px; border-left: 4px solid var(--accent); font-size: 16px; line-height: 1.8;
+            overflow-x: auto; white-space: pre-wrap;
+        }
+        .equation.mesh1 { border-left-color: var(--mesh1); background: #fdf2f2; }
+        .equation.mesh2 { border-left-color: var(--mesh2); background: #f0f7ff; }
+        .equation.mesh3 { border-left-color: var(--mesh3); background: #f8f0ff; }
+        .highlight {
+            background: linear-gradient(120deg, #fff3cd 0%, #ffeeba 100%); padding: 3px 8px;
+            border-radius: 4px; font-weight: bold; border: 1px solid #ffc107;
+        }
+        .result {
+            background: linear-gradient(120deg, #d4edda 0%, #c3e6cb 100%); padding: 3px 8px;
+            border-radius: 4px; font-weight: bold; border: 1px solid var(--success);
+        }
+        .answer {
+            background: linear-gradient(135deg, #d4edda 0%, #b8dfc8 100%); border: 2px solid var(--success);
+            padding: 30px; margin: 35px 0; border-radius: 16px; text-align: center;
+        }
+        .answer-label { font-size: 14px; text-transform: uppercase; letter-spacing: 2px; color: var(--success); margin-bottom: 10px; }
+        .answer-value { font-size: 36px; font-weight: bold; color: var(--primary); font-family: 'Courier New', monospace; }
+        .mesh-table { width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 15px; }
+        .mesh-table th, .mesh-table td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #e0e0e0; }
+        .mesh-table th { background: var(--light); font-weight: 600; color: var(--primary); }
+        .verification-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); gap: 20px; margin: 20px 0; }
+        .verification-card { background: white; border: 2px solid #e0e0e0; border-radius: 12px; padding: 20px; }
+        .verification-card.success { border-color: var(--success); background: linear-gradient(135deg, #f0fff4 0%, #e6ffed 100%); }
+        .verification-card.failure { border-color: var(--danger); background: #fdf2f2; }
+        .verification-card h4 { color: var(--primary); margin-bottom: 12px; display: flex; align-items: center; gap: 8px; }
+        .check-icon { color: var(--success); font-size: 20px; }
+        .cross-icon { color: var(--danger); font-size: 20px; }
+        .derivation { background: #fffef0; border: 1px solid #f0e68c; border-radius: 8px; padding: 15px; margin: 15px 0; }
+        .derivation-step { display: flex; align-items: flex-start; margin: 8px 0; font-family: 'Courier New', monospace; }
+        .derivation-step .arrow { color: var(--accent); margin-right: 10px; font-weight: bold; }
+        .note { background: #fff8e1; border-left: 4px solid var(--warning); padding: 15px 20px; margin: 15px 0; border-radius: 0 8px 8px 0; font-size: 14px; }
+        .note strong { color: var(--warning); }
+        .nav-buttons { display: flex; justify-content: space-between; margin-top: 30px; padding-top: 20px; border-top: 2px solid var(--light); }
+        .nav-btn { padding: 12px 24px; border: none; border-radius: 8px; cursor: pointer; font-size: 14px; font-weight: 600; }
+        .nav-btn.expand { background: var(--accent); color: white; }
+        .nav-btn.collapse { background: var(--light); color: var(--secondary); }
+        @media (max-width: 768px) {
+            .container { padding: 20px; }
+            h1 { font-size: 24px; }
+            .answer-value { font-size: 28px; }
+        }
+"""
+
+SCRIPT = """
+        function toggleStep(num) {
+            const step = document.getElementById('step' + num);
+            step.classList.toggle('hidden');
+            step.previousElementSibling.classList.toggle('collapsed');
+        }
+
+        function setAll(hidden) {
+            document.querySelectorAll('.step').forEach(step => {
+                step.classList.toggle('hidden', hidden);
+                step.previousElementSibling.classList.toggle('collapsed', hidden);
+            });
+        }
+"""
+
+
+def _h(text):
+    """Escape for HTML, with mesh-current subscripts and typographic minus."""
+    text = html.escape(str(text))
+    text = re.sub(r"\bi(\d+)\b", lambda m: "i" + m.group(1).translate(SUBSCRIPTS), text)
+    return re.sub(r"(?<!\w)-", "−", text)
+
+
+def render_html(trace):
+    body = []
+
+    def step(k, content):
+        title, intro = STEPS[k - 1]
+        body.append(f'        <h2 onclick="toggleStep({k})"><span class="step-number">{k}</span>{html.escape(title)}</h2>')
+        body.append(f'        <div id="step{k}" class="step">')
+        body.append(f"            <p>{html.escape(intro)}</p>")
+        body.extend(content)
+        body.append("        </div>\n")
+
+    rows = [
+        f"                    <tr><td><strong>{_h(node)}</strong>{' (ground)' if node == trace['circuit']['ground'] else ''}</td>"
+        f"<td>{_h(', '.join(elements))}</td></tr>"
+        for node, elements in trace["circuit"]["nodes"].items()
+    ]
+    step(1, [
+        '            <div class="equation-block">',
+        '                <div class="equation-title">Node Identification</div>',
+        '                <table class="mesh-table">',
+        "                    <tr><th>Node</th><th>Connected Elements</th></tr>",
+        *rows,
+        "                </table>",
+        "            </div>",
+    ])
+
+    content = ['            <div class="equation-block">', '                <div class="equation-title">Mesh Definitions</div>']
+    for k, mesh in enumerate(trace["meshes"]):
+        shared = f"\nShared with: {', '.join(mesh['shared'])}" if mesh["shared"] else ""
+        content.append(
+            f'                <div class="equation {MESH_CLASSES[k % 3]}"><strong>Mesh {k + 1} ({_h(mesh["name"])})</strong>\n'
+            f"Path: {_h(' → '.join(mesh['path']))}\nElements: {_h(', '.join(mesh['elements']))}{_h(shared)}</div>"
+        )
+    content.append("            </div>")
+    for sm in trace["supermeshes"]:
+        content.append(
+            f'            <div class="note"><strong>Note:</strong> {_h(", ".join(sm["excluded"]))} is shared by '
+            f"{_h(' and '.join(sm['meshes']))}, so KVL is written around their combined exterior (a supermesh).</div>"
+        )
+    step(2, content)
+
+    content = []
+    for k, eq in enumerate(trace["equations"], 1):
+        detail = [f"{eq['source']}: {eq['note']}"] if eq["kind"] == "constraint" else eq["terms"]
+        content += [
+            '            <div class="equation-block">',
+            f'                <div class="equation-title">{_h(eq["label"])}</div>',
+            f'                <div class="equation">{_h(chr(10).join(detail))}</div>',
+            '                <div class="derivation">',
+            f'                    <div class="derivation-step"><span class="arrow">→</span>'
+            f'<span class="highlight">{_h(eq["equation"])}</span>&nbsp;... (Equation {k})</div>',
+            "                </div>",
+            "            </div>",
+        ]
+    summary = "\n".join(f"({k})  {eq['equation']}" for k, eq in enumerate(trace["equations"], 1))
+    content += [
+        '            <div class="equation-block">',
+        '                <div class="equation-title">System of Equations Summary</div>',
+        f'                <div class="equation">{_h(summary)}</div>',
+        "            </div>",
+    ]
+    step(3, content)
+
+    rows = []
+    for k, (name, value) in enumerate(trace["mesh_currents"].items()):
+        rows.append(
+            f'                    <tr><td style="color: {MESH_COLORS[k % 3]}; font-weight: bold;">{_h(name)}</td>'
+            f"<td><strong>{_h(_num(value))} A</strong></td><td>{html.escape(_direction(value).capitalize())}</td></tr>"
+        )
+    step(4, [
+        '            <div class="equation-block">',
+        '                <div class="equation-title">Mesh Current Results</div>',
+        '                <table class="mesh-table">',
+        "                    <tr><th>Mesh Current</th><th>Value</th><th>Interpretation</th></tr>",
+        *rows,
+        "                </table>",
+        "            </div>",
+    ])
+
+    lines = "\n".join(
+        f"I({name}) = {current['expression'] or '0'} = {_num(current['value'])} A"
+        for name, current in trace["element_currents"].items()
+    )
+    content = [
+        '            <div class="equation-block">',
+        '                <div class="equation-title">Element Currents from Mesh Currents</div>',
+        f'                <div class="equation">{_h(lines)}</div>',
+        "            </div>",
+    ]
+    for answer in trace["answers"]:
+        derivation = []
+        if answer["expression"]:
+            derivation.append(f"{answer['label']} = {answer['expression']}")
+        derivation.append(f'<span class="result">{_h(answer["label"])} = {_h(_num(answer["value"]))} {answer["unit"]}</span>')
+        content += [
+            '            <div class="equation-block">',
+            f'                <div class="equation-title">Determine {_h(answer["label"])} ({_h(answer["spec"])})</div>',
+            '                <div class="derivation">',
+            *[
+                f'                    <div class="derivation-step"><span class="arrow">→</span>{d if d.startswith("<span") else _h(d)}</div>'
+                for d in derivation
+            ],
+            "                </div>",
+            "            </div>",
+        ]
+    step(5, content)
+
+    cards = []
+    for check in trace["verification"]["checks"]:
+        ok = check["passed"]
+        icon = '<span class="check-icon">✓</span>' if ok else '<span class="cross-icon">✗</span>'
+        details = "\n".join(check["details"]) or f"Max residual {check['max_residual']:.2e}"
+        cards += [
+            f'                <div class="verification-card {"success" if ok else "failure"}">',
+            f"                    <h4>{icon} {_h(check['name'].upper() if len(check['name']) == 3 else check['name'].capitalize())}</h4>",
+            f'                    <div class="equation">{_h(details)}</div>',
+            "                </div>",
+        ]
+    verdict = "All verification checks pass." if trace["verification"]["passed"] else "Some verification checks failed."
+    step(6, [
+        '            <div class="verification-grid">',
+        *cards,
+        "            </div>",
+        f'            <p style="margin-top: 20px;"><strong>{verdict}</strong> Confidence: {trace["verification"]["confidence"]}.</p>',
+    ])
+
+    answers = "".join(
+        f'\n            <div class="answer-value">{_h(a["label"])} = {_h(_num(a["value"]))} {a["unit"]}</div>'
+        for a in trace["answers"]
+    )
+    if answers:
+        body.append(f'        <div class="answer">\n            <div class="answer-label">Final Answer</div>{answers}\n        </div>\n')
+
+    title = html.escape(trace["title"])
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} | ECE 20001</title>
+    <style>{CSS}    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="source">ECE 20001 | Mesh Analysis</div>
+            <h1>{title}</h1>
+        </div>
+
+{chr(10).join(body)}
+        <div class="nav-buttons">
+            <button class="nav-btn collapse" onclick="setAll(true)">Collapse All Steps</button>
+            <button class="nav-btn expand" onclick="setAll(false)">Expand All Steps</button>
+        </div>
+    </div>
+
+    <script>{SCRIPT}    </script>
+</body>
+</html>
+"""
+
+
+RENDERERS = {"text": render_text, "markdown": render_markdown, "html": render_html}
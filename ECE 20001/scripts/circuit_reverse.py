@@ -0,0 +1,283 @@
+"""
+ECE 20001 Reverse Solver for Multiple-Choice Circuit Problems
+Given a partially known circuit and the answer choices, finds which
+element placements, source orientations and quantity definitions
+reproduce an answer.
+
+Replaces the hand-coded searches in mesh_reverse_engineer.py,
+mesh_find_answer5.py and mesh_brute_force.py.
+
+A problem is a JSON file:
+
+    {
+      "base": "R12 B A 12\\nR3 B C 3\\n...",        known elements
+      "slots": {                                  one alternative per slot
+        "dep_source": ["F1 0 D R12 3", "F1 D 0 R12 3"],
+        "r6": ["R6 D C 6", "R6 A C 6", ""]          "" = element absent
+      },
+      "grid": {"Rx": [3, 6, 12]},                 numeric unknowns
+      "fixed": {"Vs": 36},
+      "quantities": {"Io": ["I:R12", "-I:R12"], "P": ["P:R6"]},
+      "answers": [[2.75, 253.5], [1, 6]]
+    }
+
+Run: python3 circuit_reverse.py problem.json
+"""
+
+import hashlib
+import itertools
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from circuit_engine import Circuit, Solution
+from circuit_sweep import assemble_sweep, match_answers, measure, solve_batch
+
+CHUNK_SIZE = 32
+POOL_THRESHOLD = 64
+
+
+def canonical_netlist(lines):
+    """Order-independent form of a netlist, for de-duplicating hypotheses."""
+    return "\n".join(sorted(" ".join(line.split()) for line in lines if line.strip()))
+
+
+def netlist_hash(lines):
+    return hashlib.sha256(canonical_netlist(lines).encode()).hexdigest()[:16]
+
+
+def quantity_nodes(quantities):
+    """Nodes named by the voltage specs in a {label: [specs]} mapping."""
+    nodes = set()
+    for specs in quantities.values():
+        for spec in specs:
+            kind, target = spec.lstrip("-").split(":", 1)
+            if kind == "V":
+                nodes.update(target.split(","))
+    return nodes
+
+
+def is_well_formed(circuit, measured=()):
+    """
+    Cheap structural pruning before any solve.
+
+    Rejects circuits with parts not connected to ground, or with a dangling
+    node: one touched by a single element and by nothing else (no E/G
+    control sense, no measured voltage), so it only adds an unknown
+    without affecting any answer.
+
+    Args:
+        measured: Nodes whose voltage is asked for; an open terminal there
+                  is a legitimate output port
+    """
+    degree = {}
+    parent = {}
+
+    def find(n):
+        while parent.setdefault(n, n) != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for e in circuit.elements:
+        a, b = e.nodes[0], e.nodes[1]
+        degree[a] = degree.get(a, 0) + 1
+        degree[b] = degree.get(b, 0) + 1
+        parent[find(a)] = find(b)
+        if e.kind in ("E", "G"):
+            for n in e.nodes[2:4]:
+                degree[n] = degree.get(n, 0) + 1
+    for n in measured:
+        if n in degree:
+            degree[n] += 1
+
+    if any(d < 2 for d in degree.values()):
+        return False
+    root = find(circuit.ground)
+    return all(find(n) == root for n in degree)
+
+
+def enumerate_topologies(base, slots):
+    """
+    Yield (choices, lines) for every combination of slot alternatives,
+    skipping combinations that produce the same netlist.
+    """
+    base_lines = [line for line in base.splitlines() if line.strip()]
+    names = list(slots)
+    seen = set()
+    for combo in itertools.product(*(range(len(slots[n])) for n in names)):
+        lines = base_lines + [slots[n][i] for n, i in zip(names, combo) if slots[n][i].strip()]
+        key = canonical_netlist(lines)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield dict(zip(names, combo)), lines
+
+
+def _prepare_topology(lines, grid, fixed, ground, measured=()):
+    """
+    Circuit and stacked MNA systems for one topology across the grid.
+
+    Returns:
+        (circuit, A, z, values, params), or None if the topology is
+        malformed or leaves a value undefined
+    """
+    try:
+        circuit = Circuit.from_netlist("\n".join(lines), ground=ground)
+    except ValueError:
+        return None
+    if not is_well_formed(circuit, measured):
+        return None
+    try:
+        return (circuit, *assemble_sweep(circuit, grid, fixed=fixed))
+    except (KeyError, ValueError):
+        return None
+
+
+def _match_topology(solution, params, quantities, answers, rel_tol):
+    """Every quantity definition's matches against the answers for one solved topology."""
+    labels = list(quantities)
+    matches = []
+    for definition in itertools.product(*(quantities[label] for label in labels)):
+        specs = dict(zip(labels, definition))
+        try:
+            with np.errstate(invalid="ignore"):
+                values = measure(solution, specs)
+        except KeyError:
+            continue
+        for row, answer, residual in match_answers(values, answers, rel_tol=rel_tol):
+            matches.append({
+                "answer": answer,
+                "residual": residual,
+                "params": {n: float(params[n][row]) for n in params},
+                "quantities": specs,
+                "measured": values[row].tolist(),
+            })
+    return matches
+
+
+def _evaluate_chunk(chunk, grid, fixed, quantities, answers, ground, rel_tol):
+    """
+    Solve a chunk of topologies and collect their matches.
+
+    Topologies whose MNA systems have the same size are stacked (all grid
+    rows of all of them) and solved in one solve_batch call.
+    """
+    prepared = []
+    measured = quantity_nodes(quantities)
+    for choices, lines in chunk:
+        item = _prepare_topology(lines, grid, fixed, ground, measured)
+        if item is not None:
+            prepared.append((choices, lines, *item))
+
+    by_size = {}
+    for i, (_, _, circuit, _, _, _, _) in enumerate(prepared):
+        by_size.setdefault(circuit.size, []).append(i)
+
+    solved = {}
+    for group in by_size.values():
+        x = solve_batch(
+            np.concatenate([prepared[i][3] for i in group]),
+            np.concatenate([prepared[i][4] for i in group]),
+        )
+        offset = 0
+        for i in group:
+            rows = len(prepared[i][3])
+            solved[i] = x[offset:offset + rows]
+            offset += rows
+
+    results = []
+    for i, (choices, lines, circuit, _, _, values, params) in enumerate(prepared):
+        solution = Solution(circuit, solved[i], values)
+        for match in _match_topology(solution, params, quantities, answers, rel_tol):
+            match["choices"] = choices
+            match["netlist"] = canonical_netlist(lines)
+            match["topology"] = netlist_hash(lines)
+            results.append(match)
+    return results
+
+
+def reverse_solve(
+    base,
+    answers,
+    quantities,
+    slots=None,
+    grid=None,
+    fixed=None,
+    ground=None,
+    rel_tol=1e-3,
+    workers=None,
+):
+    """
+    Search the hypothesis space for circuits that reproduce an answer.
+
+    Args:
+        base: Netlist text of the elements that are known
+        answers: Candidate answers, each a list in quantities order
+        quantities: {label: [measure specs]}; every spec combination is tried
+        slots: {slot: [netlist line alternatives]} ("" = leave out)
+        grid: {param: values} for numeric unknowns, solved as one batch
+        fixed: Scalar parameter values
+        ground: Reference node (default "0"/"gnd")
+        rel_tol: Relative tolerance for an answer match
+        workers: Process count; None runs small searches inline and large
+                 ones on a default-sized pool
+
+    Returns:
+        Matches sorted by residual, each with answer index, residual, slot
+        choices, params, quantity definitions and the canonical netlist
+    """
+    topologies = list(enumerate_topologies(base, slots or {}))
+    chunks = [topologies[i:i + CHUNK_SIZE] for i in range(0, len(topologies), CHUNK_SIZE)]
+    args = (grid or {}, fixed or {}, quantities, answers, ground, rel_tol)
+
+    if workers == 1 or (workers is None and len(topologies) < POOL_THRESHOLD):
+        results = [m for chunk in chunks for m in _evaluate_chunk(chunk, *args)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_evaluate_chunk, chunk, *args) for chunk in chunks]
+            results = [m for f in futures for m in f.result()]
+
+    results.sort(key=lambda m: (m["residual"], m["answer"]))
+    return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: circuit_reverse.py problem.json")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        problem = json.load(f)
+
+    matches = reverse_solve(
+        problem["base"],
+        problem["answers"],
+        problem["quantities"],
+        slots=problem.get("slots"),
+        grid=problem.get("grid"),
+        fixed=problem.get("fixed"),
+        ground=problem.get("ground"),
+        rel_tol=problem.get("rel_tol", 1e-3),
+    )
+
+    if not matches:
+        print("No hypothesis reproduces any of the answers.")
+        return
+
+    print(f"{len(matches)} matching hypotheses:")
+    for m in matches:
+        answer = problem["answers"][m["answer"]]
+        print(f"\nAnswer {m['answer'] + 1} {answer} (residual {m['residual']:.2e})")
+        print(f"  slots: {m['choices']}")
+        if m["params"]:
+            print(f"  params: {m['params']}")
+        print(f"  quantities: {m['quantities']}")
+        for line in m["netlist"].splitlines():
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
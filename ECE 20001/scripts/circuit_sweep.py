@@ -0,0 +1,206 @@
+"""
+ECE 20001 Batch Circuit Sweeps
+Solves a circuit template for every combination of parameter values at
+once: the MNA systems are stacked into a (batch, n, n) array and solved
+with a single numpy.linalg.solve call.
+
+Replaces the nested loops in mesh_brute_force.py / mesh_three_mesh.py,
+where every combination was a separate sp.solve inside a bare try/except.
+
+Run:
+    python3 circuit_sweep.py template.cir R1=3,6,12 R2=6,24 k=-3,3 \\
+        --measure Io=I:R12 P=P:R6 --answers 2.75,253.5 1,6
+"""
+
+import itertools
+import sys
+
+import numpy as np
+
+from circuit_engine import Circuit, Solution
+
+
+def expand_grid(grid):
+    """
+    Cartesian product of parameter value lists.
+
+    Args:
+        grid: {param: sequence of values}
+
+    Returns:
+        {param: (batch,) array}, row b holding the b-th combination
+    """
+    names = list(grid)
+    combos = np.array(list(itertools.product(*(grid[n] for n in names))), dtype=float)
+    if combos.size == 0:
+        return {n: np.zeros(0) for n in names}
+    return {n: combos[:, i] for i, n in enumerate(names)}
+
+
+def expand_cases(cases):
+    """Stack a list of {param: value} dicts into {param: (batch,) array}."""
+    names = list(cases[0]) if cases else []
+    return {n: np.array([case[n] for case in cases], dtype=float) for n in names}
+
+
+def assemble_batch(circuit, values, batch):
+    """
+    Stacked MNA systems.
+
+    Stamps are built once with array-valued element values, so assembly is
+    one vectorized add per nonzero rather than one Python solve per case.
+
+    Returns:
+        (A, z) with shapes (batch, n, n) and (batch, n)
+    """
+    rows, cols, data, rhs = circuit.stamps(values=values)
+    A = np.zeros((batch, circuit.size, circuit.size))
+    for r, c, d in zip(rows, cols, data):
+        A[:, r, c] += d
+    z = np.zeros((batch, circuit.size))
+    for i, v in enumerate(rhs):
+        z[:, i] = v
+    return A, z
+
+
+def solve_batch(A, z):
+    """
+    Solve every system in the stack.
+
+    Singular candidates (shorted sources, floating nodes) come back as NaN
+    rows instead of aborting the sweep. A stack containing one is split in
+    half and retried, so the other systems are still solved in large
+    batches rather than one at a time.
+    """
+    try:
+        return np.linalg.solve(A, z[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        pass
+    if len(A) <= 1:
+        return np.full(z.shape, np.nan, dtype=np.result_type(A, z))
+    mid = len(A) // 2
+    return np.concatenate([solve_batch(A[:mid], z[:mid]), solve_batch(A[mid:], z[mid:])])
+
+
+def assemble_sweep(circuit, grid=None, cases=None, fixed=None):
+    """
+    Stacked MNA systems for a sweep, without solving them (so systems from
+    several circuits of the same size can share one solve_batch call).
+
+    Returns:
+        (A, z, values, params); see sweep
+    """
+    params = expand_cases(cases) if cases is not None else expand_grid(grid or {})
+    batch = len(next(iter(params.values()))) if params else 1
+    merged = {**(fixed or {}), **params}
+
+    values = {
+        name: np.broadcast_to(np.asarray(v, dtype=float), (batch,))
+        for name, v in circuit.values(merged).items()
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        A, z = assemble_batch(circuit, values, batch)
+    return A, z, values, params
+
+
+def sweep(circuit, grid=None, cases=None, fixed=None):
+    """
+    Solve a circuit template across a parameter grid in one batch.
+
+    Args:
+        circuit: Circuit whose values reference parameter names
+        grid: {param: values}; every combination is solved
+        cases: Alternatively, an explicit list of {param: value} dicts
+        fixed: Scalar values for parameters that don't vary
+
+    Returns:
+        (Solution, params) where Solution accessors return (batch,) arrays
+        and params is {param: (batch,) array} describing each row
+    """
+    A, z, values, params = assemble_sweep(circuit, grid, cases, fixed)
+    return Solution(circuit, solve_batch(A, z), values), params
+
+
+def measure(solution, quantities):
+    """
+    Evaluate named quantities on a (batch) solution.
+
+    Args:
+        quantities: {label: spec} where spec is "V:node", "V:node,ref",
+                    "I:element", "P:element" (prefix "-" to flip the sign),
+                    or a callable(solution)
+
+    Returns:
+        (batch, len(quantities)) array, columns in quantities order
+    """
+    columns = [spec(solution) if callable(spec) else solution.quantity(spec) for spec in quantities.values()]
+    return np.column_stack([np.broadcast_to(c, solution.x.shape[:1]) for c in columns])
+
+
+def match_answers(values, answers, rel_tol=1e-3, abs_tol=1e-6):
+    """
+    Compare measured quantities with a list of candidate answers.
+
+    Args:
+        values: (batch, m) measured quantities
+        answers: (n_answers, m) answer tuples, in the same column order
+
+    Returns:
+        List of (batch_row, answer_index, max_abs_residual), best first
+    """
+    answers = np.atleast_2d(np.asarray(answers, dtype=float))
+    residual = np.abs(values[:, None, :] - answers[None, :, :])
+    ok = residual <= abs_tol + rel_tol * np.abs(answers[None, :, :])
+    rows, idx = np.nonzero(np.all(ok, axis=2))
+    worst = residual[rows, idx].max(axis=1) if rows.size else np.zeros(0)
+    order = np.argsort(worst, kind="stable")
+    return [(int(rows[i]), int(idx[i]), float(worst[i])) for i in order]
+
+
+def _parse_cli(argv):
+    grid, quantities, answers = {}, {}, []
+    mode = "grid"
+    for arg in argv:
+        if arg == "--measure":
+            mode = "measure"
+        elif arg == "--answers":
+            mode = "answers"
+        elif mode == "grid":
+            name, values = arg.split("=", 1)
+            grid[name] = [float(v) for v in values.split(",")]
+        elif mode == "measure":
+            label, spec = arg.split("=", 1)
+            quantities[label] = spec
+        else:
+            answers.append([float(v) for v in arg.split(",")])
+    return grid, quantities, answers
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: circuit_sweep.py template.cir P=v1,v2 ... --measure L=I:R1 ... [--answers a,b ...]")
+        sys.exit(1)
+
+    circuit = Circuit.from_file(sys.argv[1])
+    grid, quantities, answers = _parse_cli(sys.argv[2:])
+    solution, params = sweep(circuit, grid)
+    values = measure(solution, quantities) if quantities else np.zeros((len(solution.x), 0))
+
+    print(f"Solved {len(solution.x)} candidates")
+    if not answers:
+        for b in range(len(solution.x)):
+            setting = ", ".join(f"{n}={params[n][b]:g}" for n in params)
+            measured = ", ".join(f"{l}={v:.6g}" for l, v in zip(quantities, values[b]))
+            print(f"  {setting}: {measured}")
+        return
+
+    matches = match_answers(values, answers)
+    if not matches:
+        print("No candidate matches any answer.")
+    for b, a, residual in matches:
+        setting = ", ".join(f"{n}={params[n][b]:g}" for n in params)
+        print(f"  answer {a + 1} matches {setting} (residual {residual:.2e})")
+
+
+if __name__ == "__main__":
+    main()
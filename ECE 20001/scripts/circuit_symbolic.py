@@ -0,0 +1,215 @@
+"""
+ECE 20001 Compiled Symbolic Circuit Solutions
+Solves a circuit topology symbolically once, turns the answers into
+NumPy-vectorized functions with lambdify, and caches the expressions on
+disk keyed by a canonical netlist hash.
+
+Where mesh_analysis_solver.py calls sp.solve on every run, this pays the
+SymPy cost the first time a topology is seen; every later evaluation (and
+every later run) is plain vectorized NumPy.
+
+Example:
+    circuit = Circuit.from_file("../netlists/solve_vx.cir")
+    f = compile_circuit(circuit, {"Vx": "V:A,M", "P8": "P:R8"}, free=["R10", "R8"])
+    f.expressions["Vx"]                     # exact SymPy expression
+    f(R10=10, R8=np.linspace(1, 20, 1000))  # {"Vx": array, "P8": array}
+"""
+
+import ast
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from circuit_engine import Circuit
+
+SCRIPT_DIR = Path(__file__).parent
+CACHE_DIR = SCRIPT_DIR / ".circuit_cache"
+CACHE_VERSION = 1
+
+_memory_cache = {}
+
+
+def with_free_elements(circuit, free):
+    """
+    Copy of a circuit where the listed numeric elements become parameters
+    named after the element (R10 -> parameter "R10").
+    """
+    free = set(free or ())
+    missing = free - set(circuit.by_name)
+    if missing:
+        raise KeyError(f"No such elements: {', '.join(sorted(missing))}")
+    elements = [
+        e._replace(value=e.name) if e.name in free else e
+        for e in circuit.elements
+    ]
+    params = {name: circuit.by_name[name].value for name in free}
+    return Circuit(elements, ground=circuit.ground, params={**circuit.params, **params})
+
+
+def topology_key(circuit, outputs):
+    """Hash of the canonical netlist, ground node and requested outputs."""
+    payload = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "netlist": circuit.netlist_lines(),
+            "ground": circuit.ground,
+            "outputs": outputs,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class CompiledCircuit:
+    def __init__(self, params, expressions):
+        """
+        Vectorized closed-form answers for one topology.
+
+        Args:
+            params: Parameter names, in argument order
+            expressions: {label: SymPy expression in those parameters}
+        """
+        import sympy as sp
+
+        self.params = list(params)
+        self.expressions = expressions
+        symbols = [sp.Symbol(p, positive=True) for p in self.params]
+        self._functions = {
+            label: sp.lambdify(symbols, expr, modules="numpy")
+            for label, expr in expressions.items()
+        }
+
+    def __call__(self, **params):
+        """Evaluate every output; array arguments broadcast."""
+        missing = [p for p in self.params if p not in params]
+        if missing:
+            raise KeyError(f"Missing parameters: {', '.join(missing)}")
+        args = [np.asarray(params[p], dtype=float) for p in self.params]
+        shape = np.broadcast_shapes(*(a.shape for a in args)) if args else ()
+        return {
+            label: np.broadcast_to(np.asarray(f(*args), dtype=float), shape)
+            for label, f in self._functions.items()
+        }
+
+
+def _solve(circuit, outputs):
+    import sympy as sp
+
+    solution = circuit.solve_symbolic()
+    return {label: sp.simplify(solution.quantity(spec)) for label, spec in outputs.items()}
+
+
+def from_srepr(text):
+    """
+    Rebuild an expression from sp.srepr() output without evaluating it as
+    code (sp.sympify would run whatever a cache file contains).
+
+    Only calls to SymPy expression classes and SymPy constants are allowed,
+    with numbers and expressions as arguments; string literals only as a
+    Symbol name (a plain identifier) or a Float's digits.
+
+    Raises:
+        ValueError: if the text is anything else
+    """
+    import sympy as sp
+
+    def build(node):
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float, bool):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = build(node.operand)
+            if type(value) in (int, float):
+                return -value
+        elif isinstance(node, ast.Name):
+            value = getattr(sp, node.id, None)
+            if isinstance(value, sp.Basic):
+                return value
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            cls = getattr(sp, node.func.id, None)
+            if isinstance(cls, type) and issubclass(cls, sp.Basic):
+                args = []
+                for arg in node.args:
+                    if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                        if cls is sp.Float:
+                            float(arg.value)  # digits only; raises ValueError otherwise
+                        elif not (cls is sp.Symbol and arg.value.isidentifier()):
+                            raise ValueError(f"Unexpected string argument to {node.func.id}")
+                        args.append(arg.value)
+                    else:
+                        args.append(build(arg))
+                kwargs = {}
+                for kw in node.keywords:
+                    if not (isinstance(kw.value, ast.Constant) and type(kw.value.value) in (int, bool)):
+                        raise ValueError(f"Unexpected keyword argument to {node.func.id}")
+                    kwargs[kw.arg] = kw.value.value
+                return cls(*args, **kwargs)
+        raise ValueError(f"Not a SymPy srepr expression: {ast.dump(node)[:80]}")
+
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Not a SymPy srepr expression: {e}") from None
+    return build(tree.body)
+
+
+def _load(path):
+    """Cached (params, expressions), or None if the file is unreadable or not a cache file."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        params = data["params"]
+        if not all(isinstance(p, str) and p.isidentifier() for p in params):
+            return None
+        return params, {label: from_srepr(srepr) for label, srepr in data["expressions"].items()}
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def _save(path, params, expressions):
+    import sympy as sp
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {"params": params, "expressions": {k: sp.srepr(v) for k, v in expressions.items()}},
+            f,
+            indent=2,
+        )
+
+
+def compile_circuit(circuit, outputs, free=None, cache_dir=CACHE_DIR):
+    """
+    Closed-form, vectorized solution functions for a circuit topology.
+
+    Args:
+        circuit: Circuit to solve
+        outputs: {label: quantity spec}, e.g. {"Io": "I:R12", "P6": "P:R6"}
+        free: Numeric elements to keep symbolic (their name becomes the
+              parameter name); parameter names in the netlist are always free
+        cache_dir: Where solved expressions are stored (None = memory only)
+
+    Returns:
+        CompiledCircuit; call it with parameter values to evaluate
+    """
+    if free:
+        circuit = with_free_elements(circuit, free)
+    key = topology_key(circuit, outputs)
+
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    path = Path(cache_dir) / f"{key}.json" if cache_dir else None
+    cached = _load(path) if path and path.exists() else None
+    if cached is not None:
+        params, expressions = cached
+    else:
+        params = circuit.parameter_names()
+        expressions = _solve(circuit, outputs)
+        if path:
+            _save(path, params, expressions)
+
+    compiled = CompiledCircuit(params, expressions)
+    _memory_cache[key] = compiled
+    return compiled
@@ -0,0 +1,197 @@
+"""
+ECE 20001 Thevenin / Norton Equivalents
+Thevenin and Norton equivalents at any port, and the power delivered to a
+swept load, from one LU factorization.
+
+With u the port incidence vector (+1 at a, -1 at b), a load conductance g
+across the port is the rank-1 update A + g u u^T of the MNA matrix. The
+circuit is factored once with a reference load g0 (so ports that are open
+circuits for Thevenin, like a node fed only by current sources, still
+factor), giving x0 = A0^-1 z, w0 = A0^-1 u, V0 = u.x0 and R0 = u.w0:
+
+    In = V0 / R0     Rth = R0 / (1 - g0 R0)     Vth = In Rth
+
+By Sherman-Morrison every other load is an O(n) vector update with no
+re-solve,
+
+    x_L = x0 - w0 * (g - g0) V0 / (1 + (g - g0) R0)
+
+Independent sources stay on; the test current is superposed, so dependent
+sources are handled without special cases.
+
+Example (power in the 6 ohm resistor, for any value of it):
+    eq = PortEquivalent.at_element(circuit, "R6")
+    eq.vth, eq.rth
+    solution, load = eq.load_sweep(np.linspace(1, 20, 500))
+    load["P"]
+
+Run: python3 circuit_thevenin.py circuit.cir R6 [--loads 1,2,6,12]
+     python3 circuit_thevenin.py circuit.cir A B [--loads 1,2,6,12]
+"""
+
+import sys
+
+import numpy as np
+
+from circuit_engine import Circuit, Element, Solution, parse_value, sparse, sparse_linalg
+
+
+class PortEquivalent:
+    def __init__(self, circuit, a, b, params=None, remove=None):
+        """
+        Equivalent of a circuit seen from the port (a, b).
+
+        Args:
+            circuit: Circuit to reduce
+            a, b: Port nodes; Vth is V(a) - V(b)
+            params: Values for parameter names
+            remove: Element to take out of the circuit first (the load)
+        """
+        self.a, self.b = a, b
+        self.load_name = remove or "RL"
+        elements = [e for e in circuit.elements if e.name != remove]
+        if remove is not None and len(elements) == len(circuit.elements):
+            raise KeyError(f"No element named '{remove}'")
+        self.circuit = Circuit(elements, ground=circuit.ground, params=circuit.params)
+        for node in (a, b):
+            if node not in self.circuit.node_index:
+                raise ValueError(f"Port node '{node}' is not connected to the rest of the circuit")
+
+        self.values = self.circuit.values(params)
+        rows, cols, data, rhs = self.circuit.stamps(values=self.values)
+        n = self.circuit.size
+        self.u = np.zeros(n)
+        for node, sign in ((a, 1.0), (b, -1.0)):
+            i = self.circuit.node_index[node]
+            if i >= 0:
+                self.u[i] += sign
+
+        resistances = [abs(self.values[e.name]) for e in elements if e.kind == "R" and self.values[e.name]]
+        self.g0 = 1 / float(np.median(resistances)) if resistances else 1.0
+        port = np.flatnonzero(self.u)
+        for r in port:
+            for c in port:
+                rows.append(r)
+                cols.append(c)
+                data.append(self.g0 * self.u[r] * self.u[c])
+
+        # One factorization, two right-hand sides: sources and test current
+        columns = np.column_stack([np.array(rhs, dtype=float), self.u])
+        try:
+            if self.circuit._use_sparse("auto"):
+                A = sparse.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsc()
+                solved = sparse_linalg.splu(A).solve(columns)
+            else:
+                A = np.zeros((n, n))
+                np.add.at(A, (rows, cols), data)
+                solved = np.linalg.solve(A, columns)
+        except (np.linalg.LinAlgError, RuntimeError):
+            raise ValueError(
+                "Singular MNA matrix: check for floating nodes, voltage-source "
+                "loops or current-source cutsets away from the port"
+            ) from None
+
+        self.x0, self.w0 = solved[:, 0], solved[:, 1]
+        self.v0 = float(self.u @ self.x0)
+        self.r0 = float(self.u @ self.w0)
+        denom = 1 - self.g0 * self.r0
+        if abs(denom) < 1e-9:
+            # Port sees only current sources: Norton with infinite resistance
+            self.rth = np.inf
+            self.vth = np.copysign(np.inf, self.v0) if self.v0 else 0.0
+        else:
+            self.rth = self.r0 / denom
+            self.vth = self.v0 / denom
+
+    @classmethod
+    def at_element(cls, circuit, name, params=None):
+        """Equivalent seen by an element, with that element removed."""
+        e = circuit.by_name[name]
+        return cls(circuit, e.nodes[0], e.nodes[1], params=params, remove=name)
+
+    @property
+    def isc(self):
+        """Norton (short-circuit) current, flowing a -> b through the short."""
+        return self.v0 / self.r0 if self.r0 else np.copysign(np.inf, self.v0)
+
+    def norton(self):
+        return self.isc, self.rth
+
+    def max_power(self):
+        """Load resistance for maximum power transfer and that power."""
+        if not 0 < self.rth < np.inf:
+            raise ValueError(f"Rth = {self.rth:g} ohm: no finite maximum power transfer")
+        return self.rth, self.vth ** 2 / (4 * self.rth)
+
+    def open_solution(self):
+        """Solution of the circuit with the port open."""
+        if self.rth == np.inf:
+            raise ValueError("The port voltage is unbounded with the port open")
+        x = self.x0 + self.w0 * self.g0 * self.v0 / (1 - self.g0 * self.r0)
+        return Solution(self.circuit, x, self.values)
+
+    def load_sweep(self, resistances):
+        """
+        The circuit with each resistance connected across the port.
+
+        Args:
+            resistances: Load values in ohms (scalar or array)
+
+        Returns:
+            (Solution, load) where Solution accessors return one value per
+            load (the load is an element named after the removed one, or
+            "RL"), and load is {"R", "V", "I", "P"} for the load itself
+        """
+        r = np.atleast_1d(np.asarray(resistances, dtype=float))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dg = 1 / r - self.g0
+            scale = dg * self.v0 / (1 + dg * self.r0)
+        x = self.x0[None, :] - scale[:, None] * self.w0[None, :]
+
+        load = Element("R", self.load_name, (self.a, self.b), self.load_name, None)
+        circuit = Circuit(self.circuit.elements + [load], ground=self.circuit.ground)
+        solution = Solution(circuit, x, {**self.values, self.load_name: r})
+
+        v = self.v0 - scale * self.r0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            i = v / r
+        return solution, {"R": r, "V": v, "I": i, "P": v * i}
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: circuit_thevenin.py circuit.cir (ELEMENT | NODE_A NODE_B) [--loads r1,r2,...]")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+    loads = None
+    if "--loads" in args:
+        at = args.index("--loads")
+        loads = [parse_value(v) for v in args[at + 1].split(",")]
+        args = args[:at] + args[at + 2:]
+
+    circuit = Circuit.from_file(sys.argv[1])
+    if len(args) == 1:
+        eq = PortEquivalent.at_element(circuit, args[0])
+        print(f"Seen by {args[0]} (port {eq.a}, {eq.b}):")
+    else:
+        eq = PortEquivalent(circuit, args[0], args[1])
+        print(f"Port {eq.a}, {eq.b}:")
+
+    print(f"  Vth = {eq.vth:.6g} V")
+    print(f"  Rth = {eq.rth:.6g} ohm")
+    isc, _ = eq.norton()
+    print(f"  In  = {isc:.6g} A")
+    if 0 < eq.rth < np.inf:
+        r_best, p_best = eq.max_power()
+        print(f"  Max power {p_best:.6g} W at R = {r_best:.6g} ohm")
+
+    if loads:
+        _, load = eq.load_sweep(loads)
+        print("Load sweep:")
+        for r, v, i, p in zip(load["R"], load["V"], load["I"], load["P"]):
+            print(f"  R = {r:<10.6g} V = {v:<12.6g} I = {i:<12.6g} P = {p:.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+ECE 20001 Mesh Analysis Solution Trace
+Builds the step-by-step mesh (loop current) solution of a netlist as plain
+data: mesh definitions, current-source constraints, supermeshes, the KVL
+system, solved mesh currents, element currents as mesh-current
+expressions, requested answers and verification.
+
+The numbers come from one MNA solve (circuit_engine); the mesh equations
+are written from the topology and checked against that solution, so the
+trace is always self-consistent. circuit_render.py turns a trace into
+text, Markdown or the HTML explanation format, replacing the hundreds of
+narrating print calls in mesh_analysis_solver.py.
+
+Meshes can be given as element lists in traversal order (clockwise in the
+figure), e.g. [["V12", "R15", "R20", "R5"], ...]. Without them, independent
+loops are picked from a spanning tree that keeps current sources out of
+the tree, so each current source sets one loop current directly.
+
+Run:
+    python3 circuit_trace.py circuit.cir [--meshes V12,R15,R20,R5;R20,I2,R10]
+        [--answer Io=I:R20] [--format text|markdown|html] [--out file]
+"""
+
+import json
+import sys
+
+import numpy as np
+
+from circuit_engine import Circuit
+from circuit_verify import verify
+
+# Elements whose voltage is not set by their own current
+CURRENT_KINDS = ("I", "F", "G", "C")
+# Tree priority: voltage-defined elements first, current sources last
+TREE_PRIORITY = {"V": 0, "E": 0, "H": 0, "L": 0, "R": 1, "C": 2, "G": 2, "F": 2, "I": 2}
+TOL = 1e-9
+
+
+def _fmt(value):
+    value = float(value)
+    if abs(value) < 1e-12:
+        value = 0.0
+    return f"{value:.6g}"
+
+
+def linear_text(coeffs, rhs=None):
+    """'40 i1 - 20 i2 - 15 i3' (and ' = rhs' when given)."""
+    parts = []
+    for name, c in coeffs.items():
+        if abs(c) < TOL:
+            continue
+        magnitude = "" if abs(abs(c) - 1) < TOL else f"{_fmt(abs(c))} "
+        sign = "-" if c < 0 else "+"
+        parts.append((sign, f"{magnitude}{name}"))
+    if not parts:
+        text = "0"
+    else:
+        text = ("-" if parts[0][0] == "-" else "") + parts[0][1]
+        text += "".join(f" {sign} {term}" for sign, term in parts[1:])
+    return text if rhs is None else f"{text} = {_fmt(rhs)}"
+
+
+def walk_loop(circuit, elements):
+    """
+    Orient a closed loop given as element names in traversal order.
+
+    Returns:
+        (signs, nodes): +1/-1 per element (+1 when traversed n1 -> n2) and
+        the node sequence, starting and ending at the same node
+    """
+    es = [circuit.by_name[name] for name in elements]
+    first, last = es[0].nodes[:2], es[-1].nodes[:2]
+    start = next((n for n in first if n in last), first[0]) if len(es) > 1 else first[0]
+    nodes, signs = [start], []
+    for e in es:
+        a, b = e.nodes[0], e.nodes[1]
+        if nodes[-1] == a:
+            signs.append(1)
+            nodes.append(b)
+        elif nodes[-1] == b:
+            signs.append(-1)
+            nodes.append(a)
+        else:
+            raise ValueError(f"Mesh {' '.join(elements)}: {e.name} does not continue from node {nodes[-1]}")
+    if nodes[-1] != start:
+        raise ValueError(f"Mesh {' '.join(elements)} does not close (ends at {nodes[-1]}, started at {start})")
+    return signs, nodes
+
+
+def independent_loops(circuit):
+    """
+    One loop per chord of a spanning tree built from voltage-defined
+    elements first and current sources last.
+
+    Returns:
+        List of element-name lists in traversal order
+    """
+    parent = {}
+
+    def find(n):
+        while parent.setdefault(n, n) != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    tree, chords = [], []
+    order = sorted(circuit.elements, key=lambda e: TREE_PRIORITY[e.kind])
+    for e in order:
+        ra, rb = find(e.nodes[0]), find(e.nodes[1])
+        if ra == rb:
+            chords.append(e)
+        else:
+            parent[ra] = rb
+            tree.append(e)
+
+    adjacency = {}
+    for e in tree:
+        adjacency.setdefault(e.nodes[0], []).append((e.nodes[1], e.name))
+        adjacency.setdefault(e.nodes[1], []).append((e.nodes[0], e.name))
+
+    chords.sort(key=lambda e: circuit.elements.index(e))
+    loops = []
+    for chord in chords:
+        # Tree path from the chord's n2 back to its n1
+        start, goal = chord.nodes[1], chord.nodes[0]
+        previous = {start: None}
+        queue = [start]
+        while queue:
+            node = queue.pop(0)
+            for other, name in adjacency.get(node, []):
+                if other not in previous:
+                    previous[other] = (node, name)
+                    queue.append(other)
+        path = []
+        node = goal
+        while previous[node]:
+            node, name = previous[node]
+            path.append(name)
+        loops.append([chord.name] + path)
+    return loops
+
+
+class MeshSystem:
+    def __init__(self, circuit, meshes=None):
+        """
+        Mesh incidence for a circuit.
+
+        Args:
+            circuit: Circuit to analyse
+            meshes: Element-name lists in traversal order; default
+                    independent_loops(circuit)
+        """
+        self.circuit = circuit
+        self.mesh_elements = [list(m) for m in (meshes or independent_loops(circuit))]
+        self.names = [f"i{k + 1}" for k in range(len(self.mesh_elements))]
+
+        needed = len(circuit.elements) - len(circuit.nodes)
+        if len(self.mesh_elements) != needed:
+            raise ValueError(f"{len(self.mesh_elements)} meshes given, the circuit needs {needed}")
+
+        self.paths = []
+        self.incidence = {e.name: np.zeros(len(self.names)) for e in circuit.elements}
+        for k, elements in enumerate(self.mesh_elements):
+            signs, nodes = walk_loop(circuit, elements)
+            self.paths.append(nodes)
+            for name, sign in zip(elements, signs):
+                self.incidence[name][k] += sign
+        M = np.array([self.incidence[e.name] for e in circuit.elements])
+        if np.linalg.matrix_rank(M) < len(self.names):
+            raise ValueError("Meshes are not independent")
+
+    def current_coeffs(self, name, sign=1):
+        """Element current (n1 -> n2) as {mesh current: coefficient}."""
+        return {m: sign * c for m, c in zip(self.names, self.incidence[name]) if c}
+
+    def current_text(self, name, sign=1):
+        return linear_text(self.current_coeffs(name, sign))
+
+
+def _control_voltage(system, values, plus, minus, scale=1):
+    """
+    scale * V(plus, minus) as mesh-current coefficients when the nodes are
+    a resistor's terminals, else None.
+    """
+    for r in system.circuit.elements:
+        if r.kind == "R" and set(r.nodes) == {plus, minus}:
+            orient = 1 if r.nodes[0] == plus else -1
+            return system.current_coeffs(r.name, scale * orient * values[r.name])
+    return None
+
+
+def _voltage_law(system, solution, e, sign):
+    """
+    Voltage across e in the traversal direction, as (coeffs, constant,
+    text). Current-type elements return None (their voltage is unknown).
+    """
+    values = solution.values
+    v = values[e.name]
+    if e.kind in CURRENT_KINDS:
+        return None
+    if e.kind == "R":
+        coeffs = system.current_coeffs(e.name, sign * v)
+        return coeffs, 0.0, f"{e.name}: {_fmt(v)}({system.current_text(e.name, sign)})"
+    if e.kind == "V":
+        return {}, sign * v, f"{e.name}: {'+' if sign > 0 else '-'}{_fmt(v)} V"
+    if e.kind == "L":
+        return {}, 0.0, f"{e.name}: 0 (short at DC)"
+    if e.kind == "H":
+        coeffs = system.current_coeffs(e.control, sign * v)
+        return coeffs, 0.0, f"{e.name}: {_fmt(sign * v)} I({e.control}) = {linear_text(coeffs)}"
+
+    # E: gain * V(nc+, nc-), in mesh currents when the control nodes are a
+    # resistor's terminals, otherwise taken from the solution
+    coeffs = _control_voltage(system, values, e.nodes[2], e.nodes[3], sign * v)
+    if coeffs is not None:
+        return coeffs, 0.0, f"{e.name}: {_fmt(sign * v)} V({e.nodes[2]},{e.nodes[3]}) = {linear_text(coeffs)}"
+    vc = float(solution.voltage(e.nodes[2], e.nodes[3]))
+    return {}, sign * v * vc, f"{e.name}: {_fmt(sign * v)} V({e.nodes[2]},{e.nodes[3]}) = {_fmt(sign * v * vc)} V (from solution)"
+
+
+def _source_constraint(system, solution, e):
+    """Current-source constraint: sum of mesh currents through e = its value."""
+    values = solution.values
+    coeffs = system.current_coeffs(e.name)
+    v = values[e.name]
+    if e.kind == "I":
+        rhs, note = v, f"{_fmt(v)} A source"
+    elif e.kind == "C":
+        rhs, note = 0.0, "open at DC"
+    elif e.kind == "F":
+        for m, c in system.current_coeffs(e.control, v).items():
+            coeffs[m] = coeffs.get(m, 0) - c
+        rhs, note = 0.0, f"{_fmt(v)} I({e.control})"
+    else:
+        control = _control_voltage(system, values, e.nodes[2], e.nodes[3], v)
+        if control is not None:
+            for m, c in control.items():
+                coeffs[m] = coeffs.get(m, 0) - c
+            rhs, note = 0.0, f"{_fmt(v)} V({e.nodes[2]},{e.nodes[3]}) = {linear_text(control)}"
+        else:
+            rhs = v * float(solution.voltage(e.nodes[2], e.nodes[3]))
+            note = f"{_fmt(v)} V({e.nodes[2]},{e.nodes[3]}) = {_fmt(rhs)} A (from solution)"
+    return {
+        "label": f"{e.name} constraint",
+        "kind": "constraint",
+        "source": e.name,
+        "note": note,
+        "coeffs": coeffs,
+        "rhs": rhs,
+        "equation": linear_text(coeffs, rhs),
+    }
+
+
+def _kvl(system, solution, combo, label, kind):
+    """KVL for a combination {mesh index: multiplier} of meshes."""
+    coeffs = {m: 0.0 for m in system.names}
+    constant, terms = 0.0, []
+    for element in system.circuit.elements:
+        through = sum(mult * system.incidence[element.name][k] for k, mult in combo.items())
+        if abs(through) < TOL:
+            continue
+        law = _voltage_law(system, solution, element, through)
+        if law is None:
+            raise ValueError(f"{label}: passes through current source {element.name}")
+        element_coeffs, element_constant, text = law
+        for m, c in element_coeffs.items():
+            coeffs[m] += c
+        constant += element_constant
+        terms.append(text)
+    coeffs = {m: c for m, c in coeffs.items() if abs(c) > TOL}
+    return {
+        "label": label,
+        "kind": kind,
+        "meshes": [system.names[k] for k in combo],
+        "terms": terms,
+        "coeffs": coeffs,
+        "rhs": -constant,
+        "equation": linear_text(coeffs, -constant),
+    }
+
+
+def _nullspace(A):
+    if A.shape[0] == 0:
+        return np.eye(A.shape[1])
+    _, s, vt = np.linalg.svd(A)
+    rank = int((s > TOL * max(1.0, s.max())).sum())
+    return vt[rank:].T
+
+
+def mesh_equations(system, solution):
+    """
+    Constraint, mesh KVL and supermesh KVL equations.
+
+    Meshes linked by a shared current source form a group; each group gets
+    one constraint per source plus KVL around the combinations of its
+    meshes in which every source voltage cancels (the supermesh).
+
+    Returns:
+        (equations, supermeshes)
+    """
+    circuit = system.circuit
+    n = len(system.names)
+    sources = [e for e in circuit.elements if e.kind in CURRENT_KINDS]
+
+    parent = list(range(n))
+
+    def find(k):
+        while parent[k] != k:
+            k = parent[k]
+        return k
+
+    for e in sources:
+        meshes = np.flatnonzero(system.incidence[e.name])
+        for k in meshes[1:]:
+            parent[find(k)] = find(meshes[0])
+
+    equations, supermeshes = [], []
+    for root in sorted({find(k) for k in range(n)}):
+        group = [k for k in range(n) if find(k) == root]
+        group_sources = [e for e in sources if np.any(system.incidence[e.name][group])]
+        equations += [_source_constraint(system, solution, e) for e in group_sources]
+
+        if not group_sources:
+            k = group[0]
+            equations.append(_kvl(system, solution, {k: 1}, f"Mesh {k + 1} KVL", "kvl"))
+            continue
+
+        S = np.array([system.incidence[e.name][group] for e in group_sources])
+        for vector in _nullspace(S).T:
+            vector = vector / vector[np.argmax(np.abs(vector) > TOL)]
+            combo = {k: float(np.round(c, 9)) for k, c in zip(group, vector) if abs(c) > TOL}
+            names = " + ".join(system.names[k] for k in combo)
+            label = f"Supermesh ({names}) KVL" if len(combo) > 1 else f"Mesh {next(iter(combo)) + 1} KVL"
+            equations.append(_kvl(system, solution, combo, label, "supermesh" if len(combo) > 1 else "kvl"))
+            if len(combo) > 1:
+                supermeshes.append({
+                    "meshes": [system.names[k] for k in combo],
+                    "excluded": [e.name for e in group_sources],
+                })
+    return equations, supermeshes
+
+
+def solution_trace(circuit, meshes=None, answers=None, title=None):
+    """
+    Full mesh-analysis trace of a circuit, as JSON-serializable data.
+
+    Args:
+        circuit: Circuit to solve
+        meshes: Optional mesh element lists (see MeshSystem)
+        answers: {label: quantity spec} to report, e.g. {"Io": "I:R20"}
+        title: Heading for rendered output
+
+    Returns:
+        dict with title, circuit, meshes, constraints, supermeshes,
+        equations, mesh_currents, element_currents, answers, verification
+    """
+    system = MeshSystem(circuit, meshes)
+    solution = circuit.solve()
+
+    element_currents = np.array([float(solution.current(e.name)) for e in circuit.elements])
+    M = np.array([system.incidence[e.name] for e in circuit.elements])
+    mesh_values = np.linalg.lstsq(M, element_currents, rcond=None)[0]
+    if np.abs(M @ mesh_values - element_currents).max() > 1e-6 * max(1.0, np.abs(element_currents).max()):
+        raise ValueError("Mesh currents cannot reproduce the element currents; check the mesh definitions")
+    mesh_currents = dict(zip(system.names, mesh_values.tolist()))
+
+    equations, supermeshes = mesh_equations(system, solution)
+    residuals = []
+    for eq in equations:
+        lhs = sum(c * mesh_currents[m] for m, c in eq["coeffs"].items())
+        eq["residual"] = float(lhs - eq["rhs"])
+        residuals.append(abs(eq["residual"]))
+
+    traced_answers = []
+    for label, spec in (answers or {}).items():
+        sign = -1 if spec.startswith("-") else 1
+        kind, target = spec.lstrip("-").split(":", 1)
+        expression = system.current_text(target, sign) if kind == "I" else None
+        traced_answers.append({
+            "label": label,
+            "spec": spec,
+            "expression": expression,
+            "value": float(solution.quantity(spec)),
+            "unit": {"V": "V", "I": "A", "P": "W"}[kind],
+        })
+
+    report = verify(solution)
+    report["checks"].append({
+        "name": "equations",
+        "passed": bool(max(residuals, default=0.0) <= 1e-6 * max(1.0, np.abs(mesh_values).max())),
+        "warning": False,
+        "max_residual": float(max(residuals, default=0.0)),
+        "details": [],
+    })
+    report["passed"] = all(c["passed"] for c in report["checks"])
+
+    return {
+        "title": title or "Mesh Analysis",
+        "circuit": {
+            "netlist": circuit.netlist_lines(),
+            "ground": circuit.ground,
+            "nodes": {
+                node: [e.name for e in circuit.elements if node in e.nodes[:2]]
+                for node in [*circuit.nodes, circuit.ground]
+            },
+        },
+        "meshes": [
+            {
+                "name": name,
+                "elements": elements,
+                "path": path,
+                "shared": sorted({
+                    other
+                    for el in elements
+                    for other, c in zip(system.names, system.incidence[el])
+                    if c and other != name
+                }),
+            }
+            for name, elements, path in zip(system.names, system.mesh_elements, system.paths)
+        ],
+        "constraints": [eq for eq in equations if eq["kind"] == "constraint"],
+        "supermeshes": supermeshes,
+        "equations": equations,
+        "mesh_currents": mesh_currents,
+        "element_currents": {
+            e.name: {"expression": system.current_text(e.name), "value": float(v)}
+            for e, v in zip(circuit.elements, element_currents)
+        },
+        "answers": traced_answers,
+        "verification": {
+            "confidence": report["confidence"] if report["passed"] else "Low",
+            "passed": report["passed"],
+            "checks": report["checks"],
+        },
+    }
+
+
+def _parse_cli(argv):
+    options = {"--meshes": None, "--format": "text", "--out": None, "--title": None}
+    answers, positional = {}, []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--answer":
+            label, spec = next(args).split("=", 1)
+            answers[label] = spec
+        elif arg in options:
+            options[arg] = next(args)
+        else:
+            positional.append(arg)
+    return positional, answers, options
+
+
+def main():
+    positional, answers, options = _parse_cli(sys.argv[1:])
+    if len(positional) != 1:
+        print("Usage: circuit_trace.py circuit.cir [--meshes E1,E2,...;E3,...] [--answer Io=I:R20] "
+              "[--format text|markdown|html|json] [--title T] [--out file]")
+        sys.exit(1)
+
+    from circuit_render import RENDERERS
+
+    circuit = Circuit.from_file(positional[0])
+    meshes = [m.split(",") for m in options["--meshes"].split(";")] if options["--meshes"] else None
+    trace = solution_trace(circuit, meshes=meshes, answers=answers, title=options["--title"])
+
+    if options["--format"] == "json":
+        output = json.dumps(trace, indent=2)
+    elif options["--format"] in RENDERERS:
+        output = RENDERERS[options["--format"]](trace)
+    else:
+        print(f"Unknown format '{options['--format']}' (use text, markdown, html or json)")
+        sys.exit(1)
+
+    if options["--out"]:
+        with open(options["--out"], "w") as f:
+            f.write(output)
+        print(f"Wrote {options['--out']}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+ECE 20001 Transient Simulation
+Time-domain response of RC / RL / RLC netlists after a switching event.
+
+The MNA system of a circuit with capacitors and inductors is the
+descriptor system G x + B x' = z(t) (G and B from circuit_ac.ac_matrices).
+Each step replaces x' with a companion model:
+
+    backward Euler   (G + B/h) x_n = z_n + B x_{n-1} / h
+    trapezoidal      (G + 2B/h) x_n = z_n + B (2 x_{n-1} / h + x'_{n-1})
+
+Step sizes are powers of two below max_step, picked from a divided
+difference estimate of the local truncation error, so the controller
+keeps returning to the same few step sizes and their LU factorizations
+are cached instead of recomputed. The first step uses backward Euler to
+start cleanly from the initial conditions.
+
+Results are streamed in blocks (Transient.stream) or reduced to the
+requested quantities only (Transient.run), so long simulations never hold
+every intermediate state.
+
+Example:
+    sim = Transient(Circuit.from_file("../netlists/rc_step.cir"), initial={"C1": 0})
+    result = sim.run(5e-3, {"Vc": "V:out", "Ic": "I:C1"})
+    result["t"], result["Vc"]
+
+Run:
+    python3 circuit_transient.py circuit.cir tstop V:out [I:C1 ...]
+        [--ic C1=0,L1=0 | --before before.cir] [--method be] [--csv out.csv]
+"""
+
+import math
+import sys
+from collections import deque
+
+import numpy as np
+
+from circuit_ac import ac_matrices
+from circuit_engine import SPARSE_THRESHOLD, Circuit, Solution, parse_value, sparse, sparse_linalg
+
+try:
+    import scipy.linalg as dense_linalg
+except ImportError:
+    dense_linalg = None
+
+RELTOL = 1e-3
+ABSTOL = 1e-6
+FIRST_STEP_LEVEL = 10  # first step is max_step / 2**10
+MAX_LEVEL = 40
+
+
+def step(before, after, at=0.0):
+    """Source waveform that jumps from before to after at t = at."""
+    return lambda t: after if t >= at else before
+
+
+def pulse(low, high, delay=0.0, rise=0.0, fall=0.0, width=math.inf, period=math.inf):
+    """SPICE-style PULSE waveform."""
+    def value(t):
+        if t < delay:
+            return low
+        t = (t - delay) % period if math.isfinite(period) else t - delay
+        if t < rise:
+            return low + (high - low) * t / rise
+        if t < rise + width:
+            return high
+        if t < rise + width + fall:
+            return high - (high - low) * (t - rise - width) / fall
+        return low
+    return value
+
+
+def sine(offset, amplitude, freq, delay=0.0, phase_deg=0.0):
+    """SPICE-style SIN waveform (no damping)."""
+    def value(t):
+        if t < delay:
+            return offset + amplitude * math.sin(math.radians(phase_deg))
+        return offset + amplitude * math.sin(2 * math.pi * freq * (t - delay) + math.radians(phase_deg))
+    return value
+
+
+def initial_states(circuit, solution):
+    """Capacitor voltages and inductor currents of a solved circuit, by name."""
+    states = {}
+    for e in circuit.elements:
+        if e.kind in ("C", "L") and e.name in solution.circuit.by_name:
+            if e.kind == "C":
+                states[e.name] = float(solution.element_voltage(e.name))
+            else:
+                states[e.name] = float(solution.current(e.name))
+    return states
+
+
+def consistent_start(circuit, states, params=None):
+    """
+    MNA vector at t = 0+ that honours the given states.
+
+    Capacitors become voltage sources at their initial voltage and
+    inductors current sources at their initial current (sources controlled
+    by an inductor current are frozen at t = 0+ the same way), then the
+    resistive circuit is solved.
+    """
+    values = circuit.values(params)
+    elements = []
+    for e in circuit.elements:
+        if e.kind == "C":
+            elements.append(e._replace(kind="V", value=states.get(e.name, 0.0)))
+        elif e.kind == "L":
+            elements.append(e._replace(kind="I", value=states.get(e.name, 0.0)))
+        elif e.control is not None and circuit.by_name[e.control].kind == "L":
+            frozen = values[e.name] * states.get(e.control, 0.0)
+            elements.append(e._replace(kind="I" if e.kind == "F" else "V", value=frozen, control=None))
+        else:
+            elements.append(e._replace(value=values[e.name]))
+
+    start = Circuit(elements, ground=circuit.ground).solve()
+    x = np.zeros(circuit.size)
+    for node, i in circuit.node_index.items():
+        if i >= 0:
+            x[i] = start.voltage(node)
+    for name, k in circuit.branch_index.items():
+        x[k] = states.get(name, 0.0) if circuit.by_name[name].kind == "L" else start.current(name)
+    return x
+
+
+class TransientSolution(Solution):
+    def __init__(self, circuit, t, x, xdot, values):
+        """
+        A block of time points; accessors return one value per time point.
+
+        Args:
+            t: (m,) time points
+            x: (m, size) MNA solutions at those times
+            xdot: (m, size) companion-model derivatives, for capacitor currents
+        """
+        super().__init__(circuit, x, values)
+        self.t = t
+        self.xdot = xdot
+
+    def current(self, name):
+        e = self.circuit.by_name[name]
+        if e.kind != "C":
+            return super().current(name)
+        a, b = (self.circuit.node_index[n] for n in e.nodes)
+        dv = (self.xdot[..., a] if a >= 0 else 0) - (self.xdot[..., b] if b >= 0 else 0)
+        return self.values[name] * dv
+
+
+class Transient:
+    def __init__(
+        self,
+        circuit,
+        params=None,
+        sources=None,
+        initial="dc",
+        method="trap",
+        reltol=RELTOL,
+        abstol=ABSTOL,
+    ):
+        """
+        Transient simulator for one circuit.
+
+        Args:
+            circuit: Circuit with R, L, C and sources
+            params: Values for parameter names
+            sources: {source name: waveform(t)} for time-varying V/I
+                     sources; others keep their netlist value
+            initial: "dc" (operating point of the netlist values, as SPICE
+                     does), a {"C1": v0, "L1": i0} dict (missing states are
+                     zero), or a Circuit describing the t < 0 configuration
+            method: "trap" (trapezoidal) or "be" (backward Euler)
+            reltol, abstol: Local truncation error tolerances per unknown
+        """
+        if method not in ("trap", "be"):
+            raise ValueError(f"Unknown method '{method}' (use trap or be)")
+        self.circuit = circuit
+        self.method = method
+        self.reltol = reltol
+        self.abstol = abstol
+        self.sources = dict(sources or {})
+        unknown = [n for n in self.sources if n not in circuit.by_name or circuit.by_name[n].kind not in ("V", "I")]
+        if unknown:
+            raise KeyError(f"Not independent sources: {', '.join(unknown)}")
+
+        rows, cols, g, b, _, self.values = ac_matrices(circuit, params)
+        n = circuit.size
+        self._sparse = sparse is not None and n > SPARSE_THRESHOLD
+        if self._sparse:
+            self.G = sparse.coo_matrix((g.real, (rows, cols)), shape=(n, n)).tocsc()
+            self.B = sparse.coo_matrix((b.real, (rows, cols)), shape=(n, n)).tocsc()
+        else:
+            self.G = np.zeros((n, n))
+            self.B = np.zeros((n, n))
+            np.add.at(self.G, (rows, cols), g.real)
+            np.add.at(self.B, (rows, cols), b.real)
+
+        # z(t) = constant part + sum of waveform(t) * unit source vector
+        self._z_const = np.array(circuit.stamps(values=self._source_values(None))[3], dtype=float)
+        self._z_unit = {
+            name: np.array(circuit.stamps(values=self._source_values(name))[3], dtype=float)
+            for name in self.sources
+        }
+
+        if isinstance(initial, Circuit):
+            states = initial_states(circuit, initial.solve(params))
+        elif initial == "dc":
+            states = initial_states(circuit, circuit.solve(params))
+        else:
+            states = dict(initial)
+        self.x0 = consistent_start(circuit, states, params)
+        # x' at t = 0+ is only reported (the first step is backward Euler),
+        # so a least-squares solve of B x' = z - G x is enough
+        B = self.B.toarray() if self._sparse else self.B
+        self.xdot0 = np.linalg.lstsq(B, self.z(0.0) - self.G @ self.x0, rcond=None)[0]
+
+        self._factors = {}
+        self.stats = {"steps": 0, "rejected": 0, "factorizations": 0}
+
+    def _source_values(self, only):
+        """Element values with waveform sources zeroed, or just one at 1."""
+        values = dict(self.values)
+        for name in self.sources:
+            values[name] = 1.0 if name == only else 0.0
+        if only is not None:
+            for e in self.circuit.elements:
+                if e.kind in ("V", "I") and e.name != only:
+                    values[e.name] = 0.0
+        return values
+
+    def z(self, t):
+        z = self._z_const.copy()
+        for name, waveform in self.sources.items():
+            z += waveform(t) * self._z_unit[name]
+        return z
+
+    def _solver(self, alpha):
+        """Factorization of G + alpha B, cached by alpha."""
+        solver = self._factors.get(alpha)
+        if solver is not None:
+            return solver
+
+        A = self.G + alpha * self.B
+        try:
+            if self._sparse:
+                solver = sparse_linalg.splu(A.tocsc()).solve
+            elif dense_linalg is not None:
+                lu = dense_linalg.lu_factor(A, check_finite=False)
+                solver = lambda rhs: dense_linalg.lu_solve(lu, rhs, check_finite=False)
+            else:
+                inverse = np.linalg.inv(A)
+                solver = inverse.dot
+        except (np.linalg.LinAlgError, RuntimeError):
+            raise ValueError(f"Singular companion system at step 1/{alpha:.3g} s") from None
+        self.stats["factorizations"] += 1
+        self._factors[alpha] = solver
+        return solver
+
+    def _advance(self, t, x, xdot, h, method):
+        """One step of size h from (t, x); returns (x_new, xdot_new)."""
+        if method == "be":
+            alpha = 1 / h
+            rhs = self.z(t + h) + self.B @ (alpha * x)
+            x_new = self._solver(alpha)(rhs)
+            return x_new, alpha * (x_new - x)
+        alpha = 2 / h
+        rhs = self.z(t + h) + self.B @ (alpha * x + xdot)
+        x_new = self._solver(alpha)(rhs)
+        return x_new, alpha * (x_new - x) - xdot
+
+    def _error_ratio(self, history, t_new, x_new, method):
+        """Largest LTE / tolerance over the unknowns, from divided differences."""
+        order = 1 if method == "be" else 2
+        points = list(history)[-(order + 1):] + [(t_new, x_new)]
+        if len(points) < order + 2:
+            return 0.0
+        ts = [p[0] for p in points]
+        dd = [p[1] for p in points]
+        for level in range(1, order + 2):
+            dd = [(dd[i + 1] - dd[i]) / (ts[i + level] - ts[i]) for i in range(len(dd) - 1)]
+        h = t_new - ts[-2]
+        # LTE: h^2/2 * x'' for backward Euler, h^3/12 * x''' for trapezoidal;
+        # the k-th divided difference is x^(k) / k!
+        lte = h * h * np.abs(dd[0]) if order == 1 else h ** 3 / 2 * np.abs(dd[0])
+        tol = self.reltol * np.maximum(np.abs(x_new), np.abs(points[-2][1])) + self.abstol
+        return float(np.max(lte / tol))
+
+    def stream(self, tstop, max_step=None, chunk=256):
+        """
+        Integrate from 0 to tstop.
+
+        Args:
+            tstop: End time in seconds
+            max_step: Largest step (default tstop / 50)
+            chunk: Time points per yielded block
+
+        Yields:
+            TransientSolution blocks in time order; the first starts at t = 0
+        """
+        max_step = max_step or tstop / 50
+        order = 1 if self.method == "be" else 2
+        t, x = 0.0, self.x0
+        xdot = self.xdot0
+        history = deque([(t, x)], maxlen=3)
+        level = FIRST_STEP_LEVEL
+        first = True
+        block_t, block_x, block_xdot = [t], [x], [xdot]
+
+        while t < tstop * (1 - 1e-12):
+            h = min(max_step / 2 ** level, tstop - t)
+            method = "be" if first else self.method
+            x_new, xdot_new = self._advance(t, x, xdot, h, method)
+            ratio = self._error_ratio(history, t + h, x_new, method)
+
+            if ratio > 1 and level < MAX_LEVEL:
+                self.stats["rejected"] += 1
+                level = min(MAX_LEVEL, level + max(1, math.ceil(math.log2(ratio) / (order + 1))))
+                continue
+
+            t, x, xdot = t + h, x_new, xdot_new
+            history.append((t, x))
+            first = False
+            self.stats["steps"] += 1
+            if ratio * 2 ** (order + 1) < 0.5 and level > 0:
+                level -= 1
+
+            block_t.append(t)
+            block_x.append(x)
+            block_xdot.append(xdot)
+            if len(block_t) >= chunk:
+                yield TransientSolution(self.circuit, np.array(block_t), np.array(block_x), np.array(block_xdot), self.values)
+                block_t, block_x, block_xdot = [], [], []
+
+        if block_t:
+            yield TransientSolution(self.circuit, np.array(block_t), np.array(block_x), np.array(block_xdot), self.values)
+
+    def run(self, tstop, quantities, max_step=None):
+        """
+        Waveforms of the requested quantities only.
+
+        Args:
+            quantities: {label: quantity spec}, e.g. {"Vc": "V:out", "Ic": "I:C1"}
+
+        Returns:
+            {"t": array, label: array, ...}
+        """
+        columns = {"t": []}
+        columns.update({label: [] for label in quantities})
+        for block in self.stream(tstop, max_step=max_step):
+            columns["t"].append(block.t)
+            for label, spec in quantities.items():
+                columns[label].append(np.broadcast_to(block.quantity(spec), block.t.shape))
+        return {label: np.concatenate(parts) for label, parts in columns.items()}
+
+
+def _parse_cli(argv):
+    options = {"--ic": None, "--before": None, "--method": "trap", "--csv": None, "--max-step": None}
+    positional = []
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = next(args)
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+def main():
+    positional, options = _parse_cli(sys.argv[1:])
+    if len(positional) < 3:
+        print("Usage: circuit_transient.py circuit.cir tstop V:out [I:C1 ...] "
+              "[--ic C1=0,L1=0 | --before before.cir] [--method be] [--max-step 1u] [--csv out.csv]")
+        sys.exit(1)
+
+    circuit = Circuit.from_file(positional[0])
+    initial = "dc"
+    if options["--before"]:
+        initial = Circuit.from_file(options["--before"], ground=circuit.ground)
+    elif options["--ic"]:
+        initial = {}
+        for item in options["--ic"].split(","):
+            name, value = item.split("=", 1)
+            initial[name] = parse_value(value)
+
+    quantities = {spec: spec for spec in positional[2:]}
+    sim = Transient(circuit, initial=initial, method=options["--method"])
+    max_step = parse_value(options["--max-step"]) if options["--max-step"] else None
+    result = sim.run(parse_value(positional[1]), quantities, max_step=max_step)
+
+    stats = sim.stats
+    print(f"{stats['steps']} steps ({stats['rejected']} rejected), {stats['factorizations']} factorizations")
+    for spec in quantities:
+        wave = result[spec]
+        print(f"  {spec}: start {wave[0]:.6g}, end {wave[-1]:.6g}, min {wave.min():.6g}, max {wave.max():.6g}")
+
+    if options["--csv"]:
+        labels = ["t", *quantities]
+        np.savetxt(
+            options["--csv"],
+            np.column_stack([result[label] for label in labels]),
+            delimiter=",",
+            header=",".join(labels),
+            comments="",
+        )
+        print(f"  Wrote {options['--csv']}")
+
+
+if __name__ == "__main__":
+    main()
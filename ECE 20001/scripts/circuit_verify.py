@@ -0,0 +1,357 @@
+"""
+ECE 20001 Circuit Solution Verifier
+Independent checks on a solved circuit, run concurrently in-process:
+
+    kcl          currents leaving every node sum to zero
+    kvl          source and inductor laws (from branch and control
+                 quantities) summed around every fundamental loop are zero
+    power        Tellegen: total absorbed power is zero
+    units        element values are physical, claimed answers carry the
+                 right unit, and DC node voltages and powers stay within
+                 what the independent sources can drive through the
+                 passive elements (a warning: dependent sources can
+                 legitimately exceed it)
+    signs        passive sign convention: resistors absorb, something
+                 delivers, dependent sources equal gain * control
+
+Phasor solutions (solve(omega=...)) are checked the same way with complex
+values compared by magnitude; the sign checks use real (average) power.
+
+Returns a structured report with a High / Medium / Low confidence, in the
+same spirit as the checker agents in hw_solutions, without LLM round trips.
+
+Run: python3 circuit_verify.py circuit.cir [ground_node]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from circuit_engine import Circuit
+
+RTOL = 1e-9
+ATOL = 1e-12
+
+UNITS = {"V": "V", "I": "A", "P": "W"}
+VALUE_UNITS = {"R": "ohm", "C": "F", "L": "H", "V": "V", "I": "A", "E": "V/V", "G": "S", "F": "A/A", "H": "ohm"}
+
+
+def _check(name, passed, residual=0.0, details=None, warning=False):
+    return {
+        "name": name,
+        "passed": bool(passed),
+        "warning": bool(warning) and bool(passed),
+        "max_residual": float(residual),
+        "details": details or [],
+    }
+
+
+def _num(solution, value):
+    """A scalar from the solution: complex for phasor solutions, float for DC."""
+    return complex(value) if solution.omega is not None else float(value)
+
+
+def _scale(solution):
+    """Typical magnitude of the currents and voltages in the solution."""
+    x = np.abs(np.asarray(solution.x))
+    return max(float(x.max()) if x.size else 0.0, 1.0)
+
+
+def check_kcl(solution):
+    """Sum of element currents leaving each non-ground node."""
+    circuit = solution.circuit
+    leaving = {node: 0.0 for node in circuit.nodes}
+    for e in circuit.elements:
+        current = _num(solution, solution.current(e.name))
+        a, b = e.nodes[0], e.nodes[1]
+        if a in leaving:
+            leaving[a] += current
+        if b in leaving:
+            leaving[b] -= current
+
+    tol = ATOL + RTOL * _scale(solution)
+    bad = [f"node {n}: {r:+.3e} A" for n, r in leaving.items() if abs(r) > tol]
+    worst = max((abs(r) for r in leaving.values()), default=0.0)
+    return _check("kcl", not bad, worst, bad)
+
+
+def law_voltage(solution, name):
+    """
+    Element voltage from its own law. Voltage sources, E and H use their
+    value and control quantity, and inductors their MNA branch current, so
+    a loop through them checks the constraint rows against the node
+    potentials. R and C currents are derived from those same potentials,
+    and current sources have no voltage law, so these contribute their
+    terminal voltage and cannot fail the check on their own.
+    """
+    e = solution.circuit.by_name[name]
+    v = solution.values[name]
+    if e.kind == "L":
+        if solution.omega is None:
+            return 0.0
+        return 1j * solution.omega * v * complex(solution.x[solution.circuit.branch_index[name]])
+    if e.kind == "V":
+        return v if solution.omega is None else complex(solution.circuit.source_phasor(name, v))
+    if e.kind == "E":
+        return v * _num(solution, solution.voltage(e.nodes[2], e.nodes[3]))
+    if e.kind == "H":
+        return v * _num(solution, solution.current(e.control))
+    return _num(solution, solution.element_voltage(name))
+
+
+def fundamental_loops(circuit):
+    """
+    One loop per element not in a spanning tree of the circuit graph.
+
+    Returns:
+        List of loops, each a list of (element name, +1/-1) with the sign
+        giving the traversal direction relative to the element's n1 -> n2
+    """
+    adjacency = {}
+    for e in circuit.elements:
+        a, b = e.nodes[0], e.nodes[1]
+        adjacency.setdefault(a, []).append((b, e.name, 1))
+        adjacency.setdefault(b, []).append((a, e.name, -1))
+
+    parent = {}
+    for root in adjacency:
+        if root in parent:
+            continue
+        parent[root] = None
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for other, name, sign in adjacency[node]:
+                if other not in parent:
+                    parent[other] = (node, name, sign)
+                    stack.append(other)
+
+    tree = {p[1] for p in parent.values() if p}
+
+    def path_to_root(node):
+        path = []
+        while parent[node]:
+            prev, name, sign = parent[node]
+            path.append((node, name, sign))
+            node = prev
+        return path
+
+    loops = []
+    for e in circuit.elements:
+        if e.name in tree:
+            continue
+        a, b = e.nodes[0], e.nodes[1]
+        up_b, up_a = path_to_root(b), path_to_root(a)
+        a_nodes = {n for n, _, _ in up_a}
+        b_nodes = {n for n, _, _ in up_b}
+        # Walk a -> b through the element, then b back up to the common
+        # ancestor and down to a. Shared tree edges cancel.
+        loop = [(e.name, 1)]
+        loop += [(name, -sign) for n, name, sign in up_b if n not in a_nodes]
+        loop += [(name, sign) for n, name, sign in up_a if n not in b_nodes]
+        loops.append(loop)
+    return loops
+
+
+def check_kvl(solution):
+    """Element-law voltages around every fundamental loop."""
+    law = {e.name: law_voltage(solution, e.name) for e in solution.circuit.elements}
+    tol = ATOL + RTOL * _scale(solution)
+    bad, worst = [], 0.0
+    for loop in fundamental_loops(solution.circuit):
+        residual = sum(sign * law[name] for name, sign in loop)
+        worst = max(worst, abs(residual))
+        if abs(residual) > tol:
+            bad.append(f"loop {' '.join(n for n, _ in loop)}: {residual:+.3e} V")
+    return _check("kvl", not bad, worst, bad)
+
+
+def check_power(solution):
+    """Tellegen's theorem: absorbed (complex, for phasors) powers sum to zero."""
+    powers = {e.name: _num(solution, solution.power(e.name)) for e in solution.circuit.elements}
+    total = sum(powers.values())
+    scale = max(sum(abs(p) for p in powers.values()), 1.0)
+    passed = abs(total) <= ATOL + RTOL * scale * 10
+    details = [] if passed else [f"sum of absorbed power = {total:+.3e} W"]
+    return _check("power", passed, abs(total), details)
+
+
+def source_limits(solution):
+    """
+    Largest node voltage and element power a DC circuit of independent
+    sources and passive elements can reach.
+
+    Superposition plus the maximum principle: a voltage source moves no
+    node further than its own value, and a current source drives at most
+    its value times the total resistance. Dependent sources can exceed
+    this (they are amplifiers), so exceeding it is a warning, not a failure.
+
+    Returns:
+        (volts, watts), or None for phasor solutions, where resonance can
+        exceed any such bound
+    """
+    if solution.omega is not None:
+        return None
+    circuit = solution.circuit
+    resistances = [abs(solution.values[e.name]) for e in circuit.elements if e.kind == "R"]
+    sources = [abs(solution.values[e.name]) for e in circuit.elements if e.kind == "I"]
+    volts = sum(abs(solution.values[e.name]) for e in circuit.elements if e.kind == "V")
+    volts += sum(sources) * sum(resistances)
+    amps = sum(sources) + (volts / min(resistances) if resistances and min(resistances) > 0 else 0.0)
+    return volts, volts * amps
+
+
+def check_units(solution, claims=None):
+    """
+    Physical element values, unit labels on claimed answers, and node
+    voltages and powers on the scale the independent sources set.
+
+    Args:
+        claims: {label: (value, unit, quantity spec)}, e.g.
+                {"Io": (1.0, "A", "I:R12")}
+    """
+    details, warnings, worst = [], [], 0.0
+    for e in solution.circuit.elements:
+        v = solution.values[e.name]
+        if not np.isfinite(v):
+            details.append(f"{e.name}: value {v} is not finite")
+        if e.kind == "R" and v <= 0:
+            warnings.append(f"{e.name}: non-positive resistance {v:g} {VALUE_UNITS['R']}")
+
+    limits = source_limits(solution)
+    if limits is not None:
+        volts, watts = limits
+        slack = 1 + 1e-6
+        for node, u in solution.node_voltages().items():
+            if abs(u) > volts * slack + ATOL:
+                worst = max(worst, abs(u) - volts)
+                warnings.append(
+                    f"V({node}) = {float(u):.6g} V exceeds the {volts:.6g} V the independent "
+                    f"sources can drive; check dependent-source gains and orientation"
+                )
+        for e in solution.circuit.elements:
+            p = float(solution.power(e.name))
+            if abs(p) > watts * slack + ATOL:
+                warnings.append(f"{e.name}: {p:.6g} W exceeds the {watts:.6g} W source power scale")
+
+    for label, (value, unit, spec) in (claims or {}).items():
+        expected = UNITS[spec.lstrip("-")[0]]
+        if unit != expected:
+            details.append(f"{label}: unit '{unit}' should be '{expected}' for {spec}")
+        actual = _num(solution, solution.quantity(spec))
+        if abs(actual - value) > 1e-6 + 1e-3 * abs(actual):
+            details.append(f"{label}: claimed {value:g} {unit}, circuit gives {actual:.6g} {expected}")
+
+    return _check("units", not details, worst, details + warnings, warning=bool(warnings))
+
+
+def check_signs(solution):
+    """Passive sign convention and dependent-source consistency."""
+    details, warnings, worst = [], [], 0.0
+    circuit = solution.circuit
+    tol = ATOL + RTOL * _scale(solution)
+    powers = {e.name: _num(solution, solution.power(e.name)) for e in circuit.elements}
+    # Average power for phasor solutions; reactive power has no sign convention to check
+    real = {name: p.real for name, p in powers.items()}
+
+    for e in circuit.elements:
+        if e.kind == "R" and solution.values[e.name] > 0 and real[e.name] < -tol:
+            details.append(f"{e.name}: resistor delivers {-real[e.name]:.3e} W")
+
+    if any(abs(p) > tol for p in real.values()) and not any(p < -tol for p in real.values()):
+        details.append("no element delivers power")
+
+    for e in circuit.elements:
+        v = solution.values[e.name]
+        if e.kind == "F":
+            output, control = solution.current(e.name), solution.current(e.control)
+        elif e.kind == "G":
+            output, control = solution.current(e.name), solution.voltage(e.nodes[2], e.nodes[3])
+        elif e.kind == "E":
+            output, control = solution.element_voltage(e.name), solution.voltage(e.nodes[2], e.nodes[3])
+        elif e.kind == "H":
+            output, control = solution.element_voltage(e.name), solution.current(e.control)
+        else:
+            continue
+        residual = _num(solution, output) - v * _num(solution, control)
+        worst = max(worst, abs(residual))
+        if abs(residual) > tol:
+            details.append(f"{e.name}: output differs from gain * control by {residual:+.3e}")
+
+    if all(abs(p) <= tol for p in powers.values()):
+        warnings.append("every element carries zero power; check source values and orientation")
+
+    return _check("signs", not details, worst, details + warnings, warning=bool(warnings))
+
+
+def verify(solution, claims=None, workers=5):
+    """
+    Run every check concurrently and summarize.
+
+    Args:
+        solution: Numeric Solution from Circuit.solve()
+        claims: Optional answers to check, {label: (value, unit, spec)}
+        workers: Threads for the checks
+
+    Returns:
+        {"confidence", "passed", "checks": [...], "elapsed_ms"}
+    """
+    if np.ndim(solution.x) > 1:
+        raise ValueError("verify checks a single solution; solve one parameter set or frequency at a time")
+
+    start = time.perf_counter()
+    jobs = [
+        (check_kcl, ()),
+        (check_kvl, ()),
+        (check_power, ()),
+        (check_units, (claims,)),
+        (check_signs, ()),
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, solution, *args) for fn, args in jobs]
+        checks = []
+        for (fn, _), future in zip(jobs, futures):
+            try:
+                checks.append(future.result())
+            except Exception as e:
+                checks.append(_check(fn.__name__.replace("check_", ""), False, details=[f"check crashed: {e}"]))
+
+    failed = [c for c in checks if not c["passed"]]
+    warned = [c for c in checks if c["warning"]]
+    if failed:
+        confidence = "Low"
+    elif warned:
+        confidence = "Medium"
+    else:
+        confidence = "High"
+
+    return {
+        "confidence": confidence,
+        "passed": not failed,
+        "checks": checks,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: circuit_verify.py circuit.cir [ground_node]")
+        sys.exit(1)
+
+    circuit = Circuit.from_file(sys.argv[1], ground=sys.argv[2] if len(sys.argv) > 2 else None)
+    report = verify(circuit.solve())
+
+    for check in report["checks"]:
+        status = "PASS" if check["passed"] else "FAIL"
+        if check["warning"]:
+            status = "WARN"
+        print(f"  {status}  {check['name']:<6} max residual {check['max_residual']:.2e}")
+        for line in check["details"]:
+            print(f"        {line}")
+    print(f"Confidence: {report['confidence']} ({report['elapsed_ms']:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
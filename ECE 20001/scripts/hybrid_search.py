@@ -0,0 +1,285 @@
+"""
+ECE 20001 Hybrid Textbook Search
+Combines exact ID lookup, BM25 keyword search, vector search over the
+ingested textbook, and the course context_db.
+
+"Example 3.4" or "equation (2.15)" resolves straight from the extracted
+index. Everything else runs BM25, vector and context_db search in parallel
+and fuses the ranked lists with reciprocal rank fusion.
+
+Run: python3 hybrid_search.py "karnaugh map simplification"
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from extract_textbook import get_paths
+from ingest_textbook import CHUNK_MAP_FILE, CHUNKS_FILE, EMBEDDER_FILE, IDF_FILE, VECTORS_FILE, ChunkMap
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+from context_db_index import ContextDBIndex, get_context_db_path
+from embeddings import embedder_from_state, tokenize, top_k
+from query_cache import QueryCache
+
+RRF_K = 60
+CANDIDATES = 50
+QUERY_CACHE_FILE = "query_cache.json"
+
+EXAMPLE_RE = re.compile(r"\bex(?:ample|\.)?\s*(\d+\.\d+(?:\.\d+)?)", re.IGNORECASE)
+EQUATION_RE = re.compile(r"\b(?:eq(?:uation|n)?\.?\s*\(?(\d+\.\d+)\)?|\((\d+\.\d+)\))", re.IGNORECASE)
+
+
+def detect_ids(query):
+    """
+    Find textbook example and equation references in a query.
+
+    Returns:
+        {"examples": [...], "equations": [...]}
+    """
+    examples = EXAMPLE_RE.findall(query)
+    equations = [a or b for a, b in EQUATION_RE.findall(query)]
+    return {"examples": examples, "equations": [e for e in equations if e not in examples]}
+
+
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        """
+        Okapi BM25 over a list of texts with an inverted index.
+
+        Args:
+            texts: Documents, indexed by position
+            k1: Term frequency saturation
+            b: Length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.n = len(texts)
+        postings = {}
+        lengths = np.zeros(self.n, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[doc_id] = len(tokens)
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, count in counts.items():
+                postings.setdefault(tok, []).append((doc_id, count))
+
+        self.norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0)) if self.n else lengths
+        self.postings = {}
+        for tok, plist in postings.items():
+            docs = np.array([d for d, _ in plist], dtype=np.int64)
+            tf = np.array([c for _, c in plist], dtype=np.float32)
+            idf = math.log(1 + (self.n - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[tok] = (docs, tf, idf)
+
+    def search(self, query, k=CANDIDATES):
+        """Top-k (doc_id, score) pairs, best first."""
+        scores = np.zeros(self.n, dtype=np.float32)
+        for tok in set(tokenize(query)):
+            if tok not in self.postings:
+                continue
+            docs, tf, idf = self.postings[tok]
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self.norm[docs])
+        hits = np.flatnonzero(scores)
+        if hits.size > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+
+class TextbookIndex:
+    def __init__(self, output_dir):
+        """
+        Everything ingest_textbook.py and extract_textbook.py wrote for a book.
+
+        Args:
+            output_dir: The course's extracted folder
+        """
+        self.texts = []
+        digest = hashlib.sha256()
+        with open(output_dir / CHUNKS_FILE, "rb") as f:
+            for line in f:
+                digest.update(line)
+                self.texts.append(json.loads(line)["text"])
+        self.chunk_map = ChunkMap.load(output_dir / CHUNK_MAP_FILE)
+        self.vectors = np.load(output_dir / VECTORS_FILE, mmap_mode="r")
+
+        with open(output_dir / EMBEDDER_FILE) as f:
+            state = json.load(f)
+        idf_path = output_dir / IDF_FILE
+        self.embedder = embedder_from_state(state, np.load(idf_path) if idf_path.exists() else None)
+
+        digest.update(json.dumps(state, sort_keys=True).encode())
+        self.version = digest.hexdigest()[:16]
+
+        self.examples, self.equations = {}, {}
+        index_path = output_dir / "index.json"
+        if index_path.exists():
+            with open(index_path) as f:
+                index = json.load(f)
+            self.examples = {e["id"]: e for e in index.get("examples", [])}
+            self.equations = {e["id"]: e for e in index.get("equations", [])}
+
+        self.bm25 = BM25Index(self.texts)
+
+    def chunks_on_page(self, page):
+        """
+        Chunk indices covering a page: the chunk running into it from an
+        earlier page, if any, plus every chunk starting on it. Chunk pages
+        are non-decreasing, so this is two binary searches.
+        """
+        lo, hi = np.searchsorted(self.chunk_map.pages, [page, page + 1])
+        if lo > 0 and (lo == hi or self.chunk_map.offsets[lo] > 0):
+            lo -= 1
+        return range(int(lo), int(hi))
+
+    def vector_search(self, query, k=CANDIDATES):
+        idx, scores = top_k(self.vectors, self.embedder.embed([query]), k)
+        return [(int(i), float(s)) for i, s in zip(idx[0], scores[0])]
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """
+    Fuse ranked lists of keys: score(key) = sum of 1 / (k + rank).
+
+    Returns:
+        [(key, fused_score)], best first
+    """
+    fused = {}
+    for ranked in ranked_lists:
+        for rank, key in enumerate(ranked, 1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class HybridRetriever:
+    def __init__(self, textbook, context_db=None, workers=3, cache=None):
+        """
+        Args:
+            textbook: TextbookIndex for the course textbook
+            context_db: Optional ContextDBIndex for the course
+            workers: Threads for the parallel search legs
+            cache: Optional QueryCache; invalidated if either index changed
+        """
+        self.textbook = textbook
+        self.context_db = context_db
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.cache = cache
+        if cache is not None:
+            cache.invalidate(self.version)
+
+    @property
+    def version(self):
+        """Combined version of the textbook and context_db indexes."""
+        return self.textbook.version + (self.context_db.version if self.context_db else "")
+
+    def _chunk_result(self, chunk, score, source):
+        return {
+            "source": source,
+            "score": score,
+            "text": self.textbook.texts[chunk],
+            **self.textbook.chunk_map.lookup(chunk),
+        }
+
+    def lookup_ids(self, ids):
+        """Exact hits for detected example/equation IDs."""
+        results = []
+        for kind, table in (("examples", self.textbook.examples), ("equations", self.textbook.equations)):
+            for ref in ids[kind]:
+                entry = table.get(ref)
+                if not entry:
+                    continue
+                for chunk in self.textbook.chunks_on_page(entry["page"]):
+                    result = self._chunk_result(chunk, 1.0, kind)
+                    result["id"] = ref
+                    results.append(result)
+        return results
+
+    def search(self, query, k=5):
+        """
+        Answer a query from the fastest source that can.
+
+        Args:
+            query: Natural language query or a reference like "Example 3.4"
+            k: Number of results
+
+        Returns:
+            Result dicts with source, score, and either chunk citation fields
+            (page, offset, section, text) or the context_db entry
+        """
+        if self.cache is not None:
+            # A query naming an example or equation only reuses its own exact results
+            cached = self.cache.get(query, k, fuzzy=not any(detect_ids(query).values()))
+            if cached is not None:
+                return cached
+
+        results = self._search(query, k)
+        if self.cache is not None:
+            self.cache.put(query, k, results)
+        return results
+
+    def _search(self, query, k):
+        exact = self.lookup_ids(detect_ids(query))
+        if exact:
+            return exact[:k]
+
+        bm25 = self.pool.submit(self.textbook.bm25.search, query)
+        vector = self.pool.submit(self.textbook.vector_search, query)
+        context = self.pool.submit(self.context_db.search, query, CANDIDATES) if self.context_db else None
+
+        ranked = [
+            [("chunk", i) for i, _ in bm25.result()],
+            [("chunk", i) for i, _ in vector.result()],
+        ]
+        entries = {}
+        if context:
+            hits = context.result()
+            ranked.append([("context_db", n) for n in range(len(hits))])
+            entries = dict(enumerate(hits))
+
+        results = []
+        for (kind, key), score in reciprocal_rank_fusion(ranked)[:k]:
+            if kind == "chunk":
+                results.append(self._chunk_result(key, score, "textbook"))
+            else:
+                results.append({**entries[key], "source": "context_db", "score": score})
+        return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: hybrid_search.py "<query>" [k]')
+        sys.exit(1)
+
+    query = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    _, output_dir = get_paths()
+    if not (output_dir / CHUNKS_FILE).exists():
+        print(f"Error: no ingested textbook in {output_dir}")
+        print("Run ingest_textbook.py first.")
+        sys.exit(1)
+
+    db_path = get_context_db_path("ECE 20001")
+    context_db = ContextDBIndex.open(db_path) if db_path.exists() else None
+    textbook = TextbookIndex(output_dir)
+    retriever = HybridRetriever(textbook, context_db)
+    retriever.cache = QueryCache(retriever.version, textbook.embedder, output_dir / QUERY_CACHE_FILE)
+
+    for hit in retriever.search(query, k=k):
+        if hit["source"] == "context_db":
+            print(f"  [context_db] {hit.get('title', hit.get('id'))}  ({hit['score']:.4f})")
+        else:
+            print(f"  [{hit['source']}] page {hit['page']}, {hit['section'] or 'front matter'}  ({hit['score']:.4f})")
+
+
+if __name__ == "__main__":
+    main()
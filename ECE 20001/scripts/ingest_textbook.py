@@ -0,0 +1,312 @@
+"""
+ECE 20001 Textbook Ingest
+Splits the textbook into section-aware chunks, embeds them locally, and
+records exactly where each chunk came from, so a search hit's chunk index
+resolves to (page, char offset, section) with one array lookup.
+
+Embeddings are cached by chunk-text hash, so re-ingesting after a small
+edit or a new edition only embeds the chunks that changed.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import numpy as np
+
+from extract_textbook import ensure_output_dir, extract_page_text, extract_toc, get_paths
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+from embeddings import embedder_from_state, load_embedder
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SECTION_LEVEL = 2
+EMBED_BATCH_SIZE = 64
+EMBED_WORKERS = 4
+CHUNK_MAP_FILE = "chunk_map.npz"
+CHUNKS_FILE = "chunks.jsonl"
+VECTORS_FILE = "vectors.npy"
+CACHE_FILE = "embedding_cache.npz"
+EMBEDDER_FILE = "embedder.json"
+IDF_FILE = "embedder_idf.npy"
+
+
+def page_texts(doc):
+    """Text of every page, in page order."""
+    return [extract_page_text(doc, page_num) for page_num in range(1, len(doc) + 1)]
+
+
+def chunk_spans(text, start, end, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Split text[start:end] into overlapping spans, breaking on whitespace.
+
+    Returns:
+        List of (chunk_start, chunk_end) offsets into text
+    """
+    spans = []
+    pos = start
+    while pos < end:
+        stop = min(pos + chunk_size, end)
+        if stop < end:
+            space = text.rfind(" ", pos + chunk_size // 2, stop)
+            newline = text.rfind("\n", pos + chunk_size // 2, stop)
+            cut = max(space, newline)
+            if cut > pos:
+                stop = cut
+        if text[pos:stop].strip():
+            spans.append((pos, stop))
+        if stop >= end:
+            break
+        pos = max(stop - overlap, pos + 1)
+    return spans
+
+
+class ChunkMap:
+    def __init__(self, pages, offsets, lengths, sections, section_titles):
+        """
+        Row i describes chunk i.
+
+        Args:
+            pages: 1-indexed page where the chunk starts (int32)
+            offsets: Char offset of the chunk start within that page (int32)
+            lengths: Chunk length in chars (int32)
+            sections: Index into section_titles, -1 before the first TOC entry (int32)
+            section_titles: TOC titles
+        """
+        self.pages = np.asarray(pages, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.sections = np.asarray(sections, dtype=np.int32)
+        self.section_titles = list(section_titles)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def lookup(self, chunk_index):
+        """Citation for a chunk: page, offset, length and section title."""
+        section = int(self.sections[chunk_index])
+        return {
+            "chunk": int(chunk_index),
+            "page": int(self.pages[chunk_index]),
+            "offset": int(self.offsets[chunk_index]),
+            "length": int(self.lengths[chunk_index]),
+            "section": self.section_titles[section] if section >= 0 else None,
+        }
+
+    def save(self, path):
+        np.savez(
+            path,
+            pages=self.pages,
+            offsets=self.offsets,
+            lengths=self.lengths,
+            sections=self.sections,
+            section_titles=np.array(self.section_titles, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(
+            data["pages"],
+            data["offsets"],
+            data["lengths"],
+            data["sections"],
+            data["section_titles"].tolist(),
+        )
+
+
+def section_boundaries(pages_text, page_starts, toc, max_level=SECTION_LEVEL):
+    """
+    Char offsets in the joined book text where TOC sections begin.
+
+    A section starts where its title appears on its page, or at the top of
+    the page if the title isn't found in the extracted text.
+
+    Returns:
+        Sorted list of (offset, toc_index)
+    """
+    bounds = []
+    for toc_index, entry in enumerate(toc):
+        page = entry["page"]
+        if entry["level"] > max_level or not 1 <= page <= len(pages_text):
+            continue
+        found = pages_text[page - 1].find(entry["title"].strip())
+        offset = int(page_starts[page - 1]) + max(found, 0)
+        bounds.append((offset, toc_index))
+    bounds.sort()
+    return bounds
+
+
+def build_chunks(pages_text, toc, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Chunk the whole book and build its chunk map.
+
+    Chunks never cross a TOC section boundary, but may cross page breaks;
+    the page of a chunk is the page its first character is on.
+
+    Returns:
+        (chunk_texts, ChunkMap)
+    """
+    full_text = "".join(pages_text)
+    page_starts = np.cumsum([0] + [len(t) for t in pages_text[:-1]])
+
+    bounds = [(0, -1)] + section_boundaries(pages_text, page_starts, toc)
+    bounds.append((len(full_text), -1))
+
+    spans, sections = [], []
+    for (start, toc_index), (end, _) in zip(bounds, bounds[1:]):
+        section_spans = chunk_spans(full_text, start, end, chunk_size, overlap)
+        spans.extend(section_spans)
+        sections.extend([toc_index] * len(section_spans))
+
+    starts = np.array([s for s, _ in spans], dtype=np.int64)
+    page_idx = np.searchsorted(page_starts, starts, side="right") - 1
+
+    chunk_map = ChunkMap(
+        pages=page_idx + 1,
+        offsets=starts - page_starts[page_idx],
+        lengths=[e - s for s, e in spans],
+        sections=sections,
+        section_titles=[entry["title"] for entry in toc],
+    )
+    return [full_text[s:e] for s, e in spans], chunk_map
+
+
+def save_chunks(output_dir, chunk_texts, chunk_map):
+    """Write chunks.jsonl and chunk_map.npz next to the other extracted data."""
+    with open(output_dir / CHUNKS_FILE, "w") as f:
+        for i, text in enumerate(chunk_texts):
+            f.write(json.dumps({"chunk": i, "text": text}) + "\n")
+    chunk_map.save(output_dir / CHUNK_MAP_FILE)
+
+
+def chunk_key(text):
+    """Cache key for a chunk: SHA-256 of its text."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path):
+        """
+        Chunk embeddings keyed by chunk-text hash, stored as one .npz.
+
+        Args:
+            path: Location of the cache file
+        """
+        self.path = path
+        self.vectors = {}
+        if path.exists():
+            data = np.load(path)
+            for key, vector in zip(data["keys"], data["vectors"]):
+                self.vectors[key.tobytes()] = vector
+
+    def missing(self, keys):
+        return [i for i, key in enumerate(keys) if key not in self.vectors]
+
+    def update(self, keys, vectors):
+        for key, vector in zip(keys, vectors):
+            self.vectors[key] = vector
+
+    def matrix(self, keys):
+        """Contiguous float32 matrix of cached vectors in key order."""
+        return np.ascontiguousarray(np.stack([self.vectors[k] for k in keys]), dtype=np.float32)
+
+    def save(self, keep=None):
+        """Write the cache, optionally dropping keys not in keep."""
+        keys = [k for k in self.vectors if keep is None or k in keep]
+        vectors = np.stack([self.vectors[k] for k in keys]) if keys else np.zeros((0, 0), np.float32)
+        # Raw digest bytes as a (n, 32) uint8 array; fixed-width byte strings would strip trailing NULs
+        digests = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 32)
+        np.savez(self.path, keys=digests, vectors=vectors)
+
+
+def load_ingest_embedder(output_dir, texts):
+    """
+    Reuse the embedder from the last ingest, or create and save a new one.
+
+    The hashed TF-IDF fallback learns its idf on the first ingest and keeps
+    it, so cached vectors stay comparable across re-ingests. Delete
+    embedder.json to refit.
+    """
+    state_path = output_dir / EMBEDDER_FILE
+    idf_path = output_dir / IDF_FILE
+    if state_path.exists():
+        with open(state_path) as f:
+            state = json.load(f)
+        idf = np.load(idf_path) if idf_path.exists() else None
+        return embedder_from_state(state, idf), False
+
+    embedder = load_embedder()
+    embedder.fit(texts)
+    with open(state_path, "w") as f:
+        json.dump(embedder.state(), f)
+    if getattr(embedder, "idf", None) is not None:
+        np.save(idf_path, embedder.idf)
+    return embedder, True
+
+
+def embed_batched(embedder, texts, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS):
+    """Embed texts in fixed-size batches spread across a thread pool."""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return np.zeros((0, embedder.dim), dtype=np.float32)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return np.vstack(list(pool.map(embedder.embed, batches)))
+
+
+def embed_chunks(output_dir, chunk_texts):
+    """
+    Embed chunks, only calling the model for text not already cached.
+
+    Returns:
+        (vectors, number of chunks embedded this run)
+    """
+    embedder, fresh = load_ingest_embedder(output_dir, chunk_texts)
+    cache_path = output_dir / CACHE_FILE
+    if fresh and cache_path.exists():
+        cache_path.unlink()
+    cache = EmbeddingCache(cache_path)
+
+    keys = [chunk_key(text) for text in chunk_texts]
+    todo = cache.missing(keys)
+    if todo:
+        vectors = embed_batched(embedder, [chunk_texts[i] for i in todo])
+        cache.update([keys[i] for i in todo], vectors)
+    cache.save(keep=set(keys))
+
+    if not keys:
+        return np.zeros((0, embedder.dim), dtype=np.float32), 0
+    return cache.matrix(keys), len(todo)
+
+
+def main():
+    textbook_path, output_dir = get_paths()
+
+    if not textbook_path.exists():
+        print(f"Error: Textbook not found at {textbook_path}")
+        print("Check textbook_filename in config.json")
+        sys.exit(1)
+
+    ensure_output_dir(output_dir)
+    doc = fitz.open(str(textbook_path))
+
+    print("Chunking textbook...")
+    chunk_texts, chunk_map = build_chunks(page_texts(doc), extract_toc(doc))
+    save_chunks(output_dir, chunk_texts, chunk_map)
+
+    print("Embedding chunks...")
+    vectors, embedded = embed_chunks(output_dir, chunk_texts)
+    np.save(output_dir / VECTORS_FILE, vectors)
+
+    print(f"Chunks: {len(chunk_map)} ({embedded} embedded, {len(chunk_map) - embedded} cached)")
+    print(f"Vectors and chunk map saved to {output_dir}")
+
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Async Google Drive transport.
+
+An asyncio alternative to GoogleDriveAPI for bulk work. It calls the Drive
+v3 REST endpoints directly with aiohttp instead of going through the
+googleapiclient discovery service, so there is no discovery document to
+build at startup. One session carries any number of concurrent requests
+over a small pool of keep-alive connections; requests beyond the pool size
+wait for a free connection instead of opening new sockets. (aiohttp speaks
+HTTP/1.1, so there is no HTTP/2 multiplexing; keep-alive reuse gets most of
+the benefit.)
+
+Credentials are the same google.auth objects GoogleDriveAPI uses, and are
+refreshed once (in a worker thread) when they expire, however many
+requests are waiting on them.
+
+Usage:
+    drive = GoogleDriveAPI()
+    drive.authenticate()
+    async with AsyncDriveAPI(drive.creds) as adrive:
+        files = await adrive.list_files(folder_id=folder_id)
+        contents = await asyncio.gather(*(adrive.read_file(f["id"]) for f in files))
+
+base_url and upload_url can point at a local fake Drive server for testing.
+
+Needs aiohttp: pip install aiohttp
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from drive_query import DriveQuery
+
+BASE_URL = "https://www.googleapis.com/drive/v3"
+UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3"
+CONNECTIONS = 8
+RETRIES = 4
+UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # multiple of 256 KiB, as Drive requires
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, size, modifiedTime, md5Checksum)"
+FILE_FIELDS = "id, name, mimeType, size, modifiedTime, md5Checksum, parents"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncDriveAPI:
+    def __init__(
+        self,
+        credentials,
+        connections: int = CONNECTIONS,
+        base_url: str = BASE_URL,
+        upload_url: str = UPLOAD_URL,
+    ):
+        """
+        Args:
+            credentials: google.auth credentials (e.g. GoogleDriveAPI.creds)
+            connections: Most sockets open at once; further requests queue
+            base_url: Drive v3 endpoint
+            upload_url: Drive v3 upload endpoint
+        """
+        if aiohttp is None:
+            raise ImportError("The async Drive transport needs aiohttp: pip install aiohttp")
+        self.creds = credentials
+        self.connections = connections
+        self.base_url = base_url.rstrip("/")
+        self.upload_url = upload_url.rstrip("/")
+        self.session = None
+        self.refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncDriveAPI":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, raise_for_status=False)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _token(self, rejected: Optional[str] = None) -> str:
+        """Access token, refreshing the credentials if expired or if the server rejected this token."""
+
+        def stale():
+            return not self.creds.valid or (rejected is not None and self.creds.token == rejected)
+
+        if stale():
+            async with self.refresh_lock:
+                # Another request may have refreshed while this one waited
+                if stale():
+                    from google.auth.transport.requests import Request
+
+                    await asyncio.to_thread(self.creds.refresh, Request())
+        return self.creds.token
+
+    async def _request(self, method: str, url: str, read: str = "json", **kwargs):
+        """
+        Send a request, retrying rate limits and server errors with backoff
+        and refreshing the token once on 401.
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            read: "json", "bytes", or "response" (returns (status, headers, body))
+            **kwargs: Passed to aiohttp (params, data, json, headers)
+
+        Returns:
+            Parsed JSON, bytes, or (status, headers, body)
+
+        Raises:
+            aiohttp.ClientResponseError: on any other error status
+        """
+        headers = dict(kwargs.pop("headers", {}))
+        rejected = None
+        for attempt in range(RETRIES + 1):
+            token = await self._token(rejected)
+            headers["Authorization"] = f"Bearer {token}"
+            async with self.session.request(method, url, headers=headers, **kwargs) as resp:
+                body = await resp.read()
+                if resp.status == 401 and rejected is None:
+                    rejected = token
+                    continue
+                if resp.status in RETRY_STATUSES and attempt < RETRIES:
+                    await asyncio.sleep(0.5 * 2**attempt)
+                    continue
+                if read == "response":
+                    return resp.status, resp.headers, body
+                if resp.status >= 400:
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status,
+                        message=body.decode("utf-8", "replace")[:500], headers=resp.headers,
+                    )
+                return body if read == "bytes" else json.loads(body or b"{}")
+
+    async def list_files(
+        self,
+        page_size: int = 100,
+        query: Optional[str | DriveQuery] = None,
+        folder_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        List files, following pages until done or limit is reached.
+
+        Args:
+            page_size: Files per request (max 1000)
+            query: DriveQuery, or a raw query string (see Drive API query syntax)
+            folder_id: List files in a specific folder (combined with query)
+            limit: Stop after this many files
+
+        Returns:
+            List of file metadata dictionaries
+        """
+        if folder_id:
+            scoped = DriveQuery().in_parents(folder_id)
+            if isinstance(query, DriveQuery):
+                query = scoped.extend(query)
+            elif query:
+                query = f"{scoped.build()} and ({query})"
+            else:
+                query = scoped
+
+        params = {"pageSize": page_size, "fields": LIST_FIELDS}
+        q = query.build() if isinstance(query, DriveQuery) else query
+        if q:
+            params["q"] = q
+
+        files = []
+        while limit is None or len(files) < limit:
+            page = await self._request("GET", f"{self.base_url}/files", params=params)
+            files.extend(page.get("files", []))
+            if not page.get("nextPageToken"):
+                break
+            params["pageToken"] = page["nextPageToken"]
+
+        if isinstance(query, DriveQuery):
+            files = [f for f in files if query.size_ok(f)]
+        return files[:limit] if limit is not None else files
+
+    async def get_file_metadata(self, file_id: str, fields: str = FILE_FIELDS) -> dict:
+        """Get metadata for a file."""
+        return await self._request("GET", f"{self.base_url}/files/{file_id}", params={"fields": fields})
+
+    async def get_files_metadata(self, file_ids: list[str], fields: str = FILE_FIELDS) -> dict[str, Optional[dict]]:
+        """
+        Metadata for many files at once, requested concurrently.
+
+        Returns:
+            {file_id: metadata, or None if the file doesn't exist}
+        """
+
+        async def one(file_id):
+            try:
+                return await self.get_file_metadata(file_id, fields)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 404:
+                    return None
+                raise
+
+        results = await asyncio.gather(*(one(fid) for fid in file_ids))
+        return dict(zip(file_ids, results))
+
+    async def read_file(self, file_id: str) -> bytes:
+        """Download a (non-Google) file's content."""
+        return await self._request("GET", f"{self.base_url}/files/{file_id}", read="bytes", params={"alt": "media"})
+
+    async def export_google_doc(self, file_id: str, mime_type: str = "text/plain") -> bytes:
+        """Export a Google Doc/Sheet/Slides file to mime_type."""
+        return await self._request(
+            "GET", f"{self.base_url}/files/{file_id}/export", read="bytes", params={"mimeType": mime_type}
+        )
+
+    async def _upload(
+        self,
+        method: str,
+        url: str,
+        metadata: dict,
+        content: bytes,
+        mime_type: str,
+        fields: str,
+    ) -> dict:
+        """Resumable upload: open a session, then send content in chunks."""
+        status, headers, body = await self._request(
+            method,
+            url,
+            read="response",
+            params={"uploadType": "resumable", "fields": fields},
+            json=metadata,
+            headers={"X-Upload-Content-Type": mime_type, "X-Upload-Content-Length": str(len(content))},
+        )
+        if status >= 400 or "Location" not in headers:
+            raise RuntimeError(f"Could not start upload ({status}): {body[:200]!r}")
+        session_uri = headers["Location"]
+
+        offset = 0
+        while True:
+            end = min(offset + UPLOAD_CHUNK_SIZE, len(content))
+            if content:
+                content_range = f"bytes {offset}-{end - 1}/{len(content)}"
+            else:
+                content_range = "bytes */0"
+            status, headers, body = await self._request(
+                "PUT", session_uri, read="response",
+                data=content[offset:end], headers={"Content-Range": content_range},
+            )
+            if status in (200, 201):
+                return json.loads(body)
+            if status != 308:
+                raise RuntimeError(f"Upload failed ({status}): {body[:200]!r}")
+            received = headers.get("Range")
+            offset = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+
+    async def create_file(
+        self,
+        name: str,
+        content: bytes | str,
+        mime_type: str = "text/plain",
+        folder_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Create a new file with content.
+
+        Returns:
+            Created file metadata
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        metadata = {"name": name}
+        if folder_id:
+            metadata["parents"] = [folder_id]
+        return await self._upload(
+            "POST", f"{self.upload_url}/files", metadata, content, mime_type, "id, name, mimeType, md5Checksum"
+        )
+
+    async def upload_file(
+        self,
+        file_path: str,
+        name: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        mime_type: str = "application/octet-stream",
+    ) -> dict:
+        """
+        Upload a local file.
+
+        Returns:
+            Created file metadata
+        """
+        content = await asyncio.to_thread(Path(file_path).read_bytes)
+        return await self.create_file(name or os.path.basename(file_path), content, mime_type, folder_id)
+
+    async def update_file(
+        self,
+        file_id: str,
+        content: bytes | str,
+        mime_type: str = "text/plain",
+        new_name: Optional[str] = None,
+    ) -> dict:
+        """
+        Update an existing file's content.
+
+        Returns:
+            Updated file metadata
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        metadata = {"name": new_name} if new_name else {}
+        return await self._upload(
+            "PATCH", f"{self.upload_url}/files/{file_id}", metadata, content, mime_type,
+            "id, name, mimeType, modifiedTime, md5Checksum",
+        )
@@ -0,0 +1,201 @@
+"""
+Content-addressed store for synced files.
+
+Each distinct file is stored once under <workspace>/.blobs, keyed by its
+SHA-256, with an alias from its MD5 so the md5Checksum Drive reports for a
+file can be checked before downloading it. Course folders get reflinks
+(copy-on-write clones) where the filesystem supports them, otherwise plain
+copies, so editing one course's copy never touches another course's copy
+or the stored object. Hardlinks save more space but share one inode with
+the store, so they are opt-in (BlobStore(root, hardlink=True)). Stored
+objects are read-only, so only one that shares its inode with a hardlink
+can be edited in place; such objects are re-hashed on lookup (once per
+size and mtime), and one that no longer matches its digest is dropped and
+downloaded again. Placed copies take the object's mtime, so a later place
+recognizes an untouched copy by size and mtime without reading it.
+
+Other keys can be aliased to stored contents the same way, e.g. the export
+cache maps (file ID, modifiedTime, target MIME) to the exported contents.
+
+Layout:
+    .blobs/sha256/ab/abcdef...   file contents
+    .blobs/md5/12/123456...      text: the SHA-256 of the same contents
+    .blobs/<kind>/..             other aliases, keyed by SHA-256 of the key
+
+Usage:
+    store = BlobStore(workspace / ".blobs")
+    digest = store.lookup_md5(file_info["md5Checksum"])
+    if digest is None:
+        digest = store.put(drive.read_file(file_id))
+    store.place(digest, "ECE 20001/syllabus.pdf")
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import uuid
+from pathlib import Path
+
+BLOB_DIR = ".blobs"
+FICLONE = 0x40049409  # linux/fs.h
+
+
+def reflink(src, dst):
+    """Clone src to dst sharing extents (btrfs, XFS). Raises OSError if unsupported."""
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+class BlobStore:
+    def __init__(self, root, hardlink=False):
+        """
+        Args:
+            root: Store directory (created on first write)
+            hardlink: Fall back to hardlinks instead of copies when reflinks
+                      are unsupported (copies in course folders then share
+                      the stored object's inode)
+        """
+        self.root = Path(root)
+        self.hardlink = hardlink
+        self.verified = {}  # digest -> (size, mtime_ns) when last hashed
+
+    def _path(self, kind, digest):
+        return self.root / kind / digest[:2] / digest
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return path
+
+    def object_path(self, digest):
+        """Path of a stored object (SHA-256 hex)."""
+        return self._path("sha256", digest)
+
+    def verify(self, digest):
+        """
+        Whether a stored object still has the contents its digest names.
+
+        Objects are read-only, so only one with another hardlink can have
+        changed; those are re-hashed when their size or mtime differs from
+        the last check. A corrupted object is deleted so the next put stores
+        it afresh.
+        """
+        path = self.object_path(digest)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return False
+        stamp = (st.st_size, st.st_mtime_ns)
+        if st.st_nlink == 1 or self.verified.get(digest) == stamp:
+            return True
+        if hashlib.sha256(path.read_bytes()).hexdigest() == digest:
+            self.verified[digest] = stamp
+            return True
+        path.unlink()
+        self.verified.pop(digest, None)
+        return False
+
+    def _lookup_alias(self, path):
+        try:
+            digest = path.read_text().strip()
+        except FileNotFoundError:
+            return None
+        return digest if self.verify(digest) else None
+
+    def lookup_md5(self, md5):
+        """
+        SHA-256 of stored contents with this MD5, or None if not stored.
+
+        Args:
+            md5: MD5 hex digest (Drive's md5Checksum)
+        """
+        if not md5:
+            return None
+        return self._lookup_alias(self._path("md5", md5.lower()))
+
+    def _alias_path(self, kind, key):
+        return self._path(kind, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def lookup(self, kind, key):
+        """SHA-256 of the contents aliased to key, or None."""
+        return self._lookup_alias(self._alias_path(kind, key))
+
+    def alias(self, kind, key, digest):
+        """Alias key (any string) to stored contents."""
+        self._write_atomic(self._alias_path(kind, key), digest.encode())
+
+    def put(self, data):
+        """
+        Store contents (no-op if already stored).
+
+        Returns:
+            SHA-256 hex digest
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists() or not self.verify(digest):
+            self._write_atomic(path, data)
+            path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        alias = self._path("md5", hashlib.md5(data).hexdigest())
+        if not alias.exists():
+            self._write_atomic(alias, digest.encode())
+        return digest
+
+    def place(self, digest, target):
+        """
+        Put a stored object at target, replacing whatever is there.
+
+        Tries a reflink, then a hardlink if enabled, then a copy. Skips the
+        work when target already has the object's contents: a copy with the
+        object's size and mtime is taken as unchanged, anything else of the
+        right size is hashed.
+
+        Returns:
+            "reflink", "hardlink", "copy" or "unchanged"
+        """
+        src = self.object_path(digest)
+        src_stat = src.stat()
+        target = Path(target)
+        try:
+            target_stat = target.stat()
+            linked = os.path.samestat(src_stat, target_stat)
+            if linked and self.hardlink:
+                return "unchanged"
+            # With hardlinks off, an existing link to the object is replaced by a copy
+            if not linked and target_stat.st_size == src_stat.st_size:
+                if target_stat.st_mtime_ns == src_stat.st_mtime_ns:
+                    return "unchanged"
+                if hashlib.sha256(target.read_bytes()).hexdigest() == digest:
+                    os.utime(target, ns=(target_stat.st_atime_ns, src_stat.st_mtime_ns))
+                    return "unchanged"
+        except FileNotFoundError:
+            pass
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+        try:
+            try:
+                reflink(src, tmp)
+                tmp.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+                how = "reflink"
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                how = "copy"
+                if self.hardlink:
+                    try:
+                        os.link(src, tmp)
+                        how = "hardlink"
+                    except OSError:
+                        pass
+                if how == "copy":
+                    shutil.copyfile(src, tmp)
+            if how != "hardlink":
+                os.utime(tmp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return how
@@ -0,0 +1,256 @@
+"""
+Semantic index over a course's context_db entries.
+Embeds every entry with a local CPU model (or the hashed TF-IDF fallback),
+stores the vectors as one contiguous float32 matrix, and answers queries
+with batched cosine top-k.
+
+Run:
+    python3 scripts/context_db_index.py build "ECE 20001"
+    python3 scripts/context_db_index.py search "ECE 20001" "power in a resistor"
+"""
+
+import fnmatch
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from embeddings import embedder_from_state, load_embedder, top_k
+
+SCRIPT_DIR = Path(__file__).parent
+CONFIG_PATH = SCRIPT_DIR.parent / "config.json"
+SCHEMA_FILE = ".schema.json"
+INDEX_DIR = ".index"
+
+
+def load_config():
+    """Load configuration from config.json"""
+    if not CONFIG_PATH.exists():
+        print("Error: config.json not found.")
+        print("Copy config.example.json to config.json and fill in your values.")
+        sys.exit(1)
+
+    with open(CONFIG_PATH) as f:
+        return json.load(f)
+
+
+def get_context_db_path(course: str) -> Path:
+    """Resolve a course's context_db folder from config.json."""
+    config = load_config()
+    course_config = config["courses"].get(course, {})
+    local_folder = course_config.get("local_folder_name", course)
+    db_path = course_config.get("context_db_path", "context_db")
+    return Path(config["workspace_path"]) / local_folder / db_path
+
+
+def _category_for(file_name: str, schema: dict) -> str:
+    for category, spec in schema.get("categories", {}).items():
+        if fnmatch.fnmatch(file_name, spec.get("file_pattern", "")):
+            return category
+    return "other"
+
+
+def load_entries(db_path: Path) -> list[dict]:
+    """
+    Read every entry file in a context_db folder.
+
+    Entry files may hold a single entry, a list of entries, or
+    {"entries": [...]}. Each returned entry is tagged with its source
+    file and schema category.
+    """
+    schema = {}
+    schema_path = db_path / SCHEMA_FILE
+    if schema_path.exists():
+        with open(schema_path) as f:
+            schema = json.load(f)
+
+    entries = []
+    for path in sorted(db_path.glob("*.json")):
+        if path.name == SCHEMA_FILE:
+            continue
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("entries", [data])
+        category = _category_for(path.name, schema)
+        for entry in data:
+            entry = dict(entry)
+            entry["_file"] = path.name
+            entry["_category"] = category
+            entries.append(entry)
+    return entries
+
+
+def source_digest(db_path: Path) -> str:
+    """Hash of every entry file and the schema; changes whenever any of them is edited, added or removed."""
+    digest = hashlib.sha256()
+    for path in sorted(db_path.glob("*.json")):
+        digest.update(path.name.encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def entry_text(entry: dict) -> str:
+    """Text that gets embedded for an entry."""
+    parts = [
+        entry.get("title", ""),
+        entry.get("content", ""),
+        " ".join(entry.get("keywords", [])),
+        " ".join(entry.get("related_textbook_sections", [])),
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+class ContextDBIndex:
+    def __init__(self, entries: list[dict], vectors: np.ndarray, embedder, version: str, source: Optional[str] = None):
+        """
+        In-memory vector index over context_db entries.
+
+        Args:
+            entries: Entry dicts, row-aligned with vectors
+            vectors: (n, d) contiguous float32 matrix of L2-normalized rows
+            embedder: Embedder used for both entries and queries
+            version: Content hash; changes whenever entries or model change
+            source: source_digest of the entry files the index was built from
+        """
+        self.entries = entries
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.embedder = embedder
+        self.version = version
+        self.source = source
+
+    @classmethod
+    def build(cls, db_path: Path, embedder=None) -> "ContextDBIndex":
+        """Embed all entries in a context_db folder."""
+        source = source_digest(db_path)
+        entries = load_entries(db_path)
+        texts = [entry_text(e) for e in entries]
+        embedder = embedder or load_embedder()
+        embedder.fit(texts)
+        vectors = embedder.embed(texts) if texts else np.zeros((0, embedder.dim), np.float32)
+
+        digest = hashlib.sha256(embedder.state()["name"].encode())
+        for text in texts:
+            digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+        return cls(entries, vectors, embedder, digest.hexdigest()[:16], source)
+
+    def save(self, db_path: Path) -> Path:
+        """Write vectors and metadata under <context_db>/.index/."""
+        out = db_path / INDEX_DIR
+        out.mkdir(exist_ok=True)
+        np.save(out / "vectors.npy", self.vectors)
+        if getattr(self.embedder, "idf", None) is not None:
+            np.save(out / "idf.npy", self.embedder.idf)
+        with open(out / "meta.json", "w") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "source": self.source,
+                    "embedder": self.embedder.state(),
+                    "entries": self.entries,
+                },
+                f,
+                indent=2,
+            )
+        return out
+
+    @classmethod
+    def load(cls, db_path: Path) -> "ContextDBIndex":
+        """Load a saved index without re-embedding."""
+        src = db_path / INDEX_DIR
+        with open(src / "meta.json") as f:
+            meta = json.load(f)
+        idf_path = src / "idf.npy"
+        idf = np.load(idf_path) if idf_path.exists() else None
+        embedder = embedder_from_state(meta["embedder"], idf)
+        vectors = np.load(src / "vectors.npy", mmap_mode="r")
+        return cls(meta["entries"], vectors, embedder, meta["version"], meta.get("source"))
+
+    @staticmethod
+    def is_current(db_path: Path) -> bool:
+        """Whether a saved index exists and was built from the current entry files."""
+        meta_path = db_path / INDEX_DIR / "meta.json"
+        if not meta_path.exists():
+            return False
+        with open(meta_path) as f:
+            return json.load(f).get("source") == source_digest(db_path)
+
+    @classmethod
+    def open(cls, db_path: Path) -> "ContextDBIndex":
+        """Load the saved index, rebuilding it if missing or if any entry file changed."""
+        if cls.is_current(db_path):
+            return cls.load(db_path)
+        index = cls.build(db_path)
+        index.save(db_path)
+        return index
+
+    def search_batch(
+        self,
+        queries: list[str],
+        k: int = 5,
+        category: Optional[str] = None,
+    ) -> list[list[dict]]:
+        """
+        Cosine top-k for many queries in one matrix multiply.
+
+        Args:
+            queries: Query strings
+            k: Results per query
+            category: Only return entries from this schema category
+
+        Returns:
+            One result list per query; each result is the entry plus "score"
+        """
+        if category:
+            rows = np.array([i for i, e in enumerate(self.entries) if e["_category"] == category], dtype=np.int64)
+            matrix = self.vectors[rows]
+        else:
+            rows = None
+            matrix = self.vectors
+
+        idx, scores = top_k(matrix, self.embedder.embed(queries), k)
+        if rows is not None and rows.size:
+            idx = rows[idx]
+
+        results = []
+        for q_idx, q_scores in zip(idx, scores):
+            results.append([
+                {**self.entries[i], "score": float(s)} for i, s in zip(q_idx, q_scores)
+            ])
+        return results
+
+    def search(self, query: str, k: int = 5, category: Optional[str] = None) -> list[dict]:
+        """Cosine top-k for a single query."""
+        return self.search_batch([query], k=k, category=category)[0]
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "search"):
+        print('Usage: context_db_index.py build "<course>"')
+        print('       context_db_index.py search "<course>" "<query>" [k]')
+        sys.exit(1)
+
+    db_path = get_context_db_path(sys.argv[2])
+    if not db_path.exists():
+        print(f"Error: context_db not found at {db_path}")
+        sys.exit(1)
+
+    if sys.argv[1] == "build":
+        index = ContextDBIndex.build(db_path)
+        out = index.save(db_path)
+        print(f"Indexed {len(index.entries)} entries with {index.embedder.state()['name']}")
+        print(f"Index saved to {out}")
+        return
+
+    query = sys.argv[3]
+    k = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+    index = ContextDBIndex.open(db_path)
+    for hit in index.search(query, k=k):
+        print(f"  {hit['score']:.3f}  [{hit['_category']}] {hit.get('title', hit.get('id'))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Drive search query builder.
+
+Builds the q string for files.list with every value quoted and escaped, so
+names with apostrophes or backslashes can't break (or change) the query,
+and pushes filtering down to Drive instead of filtering after the listing.
+
+    q = (DriveQuery()
+         .in_parents(folder_id)
+         .not_trashed()
+         .exclude_mime_types(FOLDER_MIME)
+         .modified_after("2025-01-01T00:00:00Z"))
+    drive.list_files(query=q)
+
+Drive's query language has no size operator, so min_size/max_size are not
+part of the q string; list_files applies them to the returned metadata
+(DriveQuery.size_ok), which still avoids downloading anything.
+"""
+
+from datetime import datetime, timezone
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+
+
+def quote(value):
+    """Quote a string literal for a Drive query."""
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def rfc3339(value):
+    """RFC 3339 UTC timestamp for a datetime or an already formatted string."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    return str(value)
+
+
+def parse_time(value):
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class DriveQuery:
+    def __init__(self):
+        """Empty query (matches everything); add clauses with the methods below."""
+        self.clauses = []
+        self.min_size = None
+        self.max_size = None
+
+    def _add(self, clause, test):
+        self.clauses.append((clause, test))
+        return self
+
+    def name_equals(self, name):
+        return self._add(f"name = {quote(name)}", lambda f: f.get("name") == name)
+
+    def name_contains(self, text):
+        return self._add(
+            f"name contains {quote(text)}",
+            lambda f: text.lower() in f.get("name", "").lower(),
+        )
+
+    def in_parents(self, folder_id):
+        return self._add(f"{quote(folder_id)} in parents", lambda f: folder_id in f.get("parents", [folder_id]))
+
+    def mime_types(self, *types):
+        """Only these MIME types."""
+        clause = " or ".join(f"mimeType = {quote(t)}" for t in types)
+        return self._add(f"({clause})" if len(types) > 1 else clause, lambda f: f.get("mimeType") in types)
+
+    def exclude_mime_types(self, *types):
+        """None of these MIME types."""
+        for t in types:
+            self._add(f"mimeType != {quote(t)}", lambda f, t=t: f.get("mimeType") != t)
+        return self
+
+    def modified_after(self, when):
+        """Modified strictly after a datetime or RFC 3339 string."""
+        stamp = rfc3339(when)
+        return self._add(
+            f"modifiedTime > {quote(stamp)}",
+            lambda f: "modifiedTime" not in f or parse_time(f["modifiedTime"]) > parse_time(stamp),
+        )
+
+    def not_trashed(self):
+        return self._add("trashed = false", lambda f: not f.get("trashed", False))
+
+    def size_between(self, min_size=None, max_size=None):
+        """Size limits in bytes (applied to listed metadata; see module docstring)."""
+        self.min_size, self.max_size = min_size, max_size
+        return self
+
+    def build(self):
+        """The q string, or None for an empty query."""
+        return " and ".join(clause for clause, _ in self.clauses) or None
+
+    def __str__(self):
+        return self.build() or ""
+
+    def matches(self, file_info):
+        """
+        Whether a file's metadata satisfies every clause and the size limits.
+
+        Files without a size (Google Docs, folders) pass the size limits.
+        """
+        return all(test(file_info) for _, test in self.clauses) and self.size_ok(file_info)
+
+    def size_ok(self, file_info):
+        """Whether a file's metadata is within the size limits."""
+        if "size" not in file_info:
+            return True
+        size = int(file_info["size"])
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        return True
+
+    @classmethod
+    def from_filters(cls, filters):
+        """
+        Query from a course's "drive_filters" config.
+
+        Args:
+            filters: Dict with any of include_mime, exclude_mime (lists),
+                     modified_after (RFC 3339), min_size, max_size (bytes)
+        """
+        q = cls()
+        filters = filters or {}
+        if filters.get("include_mime"):
+            q.mime_types(*filters["include_mime"])
+        if filters.get("exclude_mime"):
+            q.exclude_mime_types(*filters["exclude_mime"])
+        if filters.get("modified_after"):
+            q.modified_after(filters["modified_after"])
+        q.size_between(filters.get("min_size"), filters.get("max_size"))
+        return q
+
+    def extend(self, other):
+        """Add another query's clauses and size limits to this one."""
+        self.clauses.extend(other.clauses)
+        if other.min_size is not None:
+            self.min_size = other.min_size
+        if other.max_size is not None:
+            self.max_size = other.max_size
+        return self
@@ -0,0 +1,183 @@
+"""
+Local Text Embeddings
+CPU-only embedding models shared by context_db and textbook search.
+
+Uses a sentence-transformers model if one is installed and cached locally,
+otherwise falls back to a hashed TF-IDF embedder that needs no network and
+no model download.
+
+Install (optional): pip install sentence-transformers
+"""
+
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HASH_DIM = 4096
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "of", "on", "or", "that", "the",
+    "this", "to", "what", "when", "where", "which", "why", "with", "work",
+    "works", "explain", "describe",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and plural 's'."""
+    tokens = []
+    for tok in TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _features(text: str) -> list[str]:
+    """Unigrams plus adjacent-word bigrams."""
+    tokens = tokenize(text)
+    return tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    """Stable hash of a feature to (bucket, sign)."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, (1.0 if (h >> 31) & 1 == 0 else -1.0)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place and return a contiguous float32 matrix."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class HashedTfidfEmbedder:
+    """Feature-hashed TF-IDF vectors. Deterministic and network free."""
+
+    name = "hashed-tfidf"
+
+    def __init__(self, dim: int = HASH_DIM, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    def fit(self, texts: list[str]) -> "HashedTfidfEmbedder":
+        """Learn inverse document frequencies from a corpus."""
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            buckets = {_bucket(f, self.dim)[0] for f in _features(text)}
+            df[list(buckets)] += 1
+        n = max(len(texts), 1)
+        self.idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of texts as an (n, dim) L2-normalized float32 matrix."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: dict[int, float] = {}
+            for feature in _features(text):
+                bucket, sign = _bucket(feature, self.dim)
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            if counts:
+                idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                out[row, idx] = np.sign(tf) * (1 + np.log(np.abs(tf) + 1e-12))
+        out *= self.idf
+        return normalize_rows(out)
+
+    def state(self) -> dict:
+        """Serializable parameters (the idf vector is saved separately)."""
+        return {"name": self.name, "dim": self.dim}
+
+
+class SentenceTransformerEmbedder:
+    """Wraps a locally cached sentence-transformers model on CPU."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu", local_files_only=True)
+        self.name = f"st:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+
+    def fit(self, texts: list[str]) -> "SentenceTransformerEmbedder":
+        return self
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return normalize_rows(vectors)
+
+    def state(self) -> dict:
+        return {"name": self.name, "dim": self.dim}
+
+
+def load_embedder(model_name: Optional[str] = None, prefer_model: bool = True):
+    """
+    Load the best available local embedder.
+
+    Args:
+        model_name: sentence-transformers model name (default: all-MiniLM-L6-v2)
+        prefer_model: If False, always use the hashed TF-IDF fallback
+
+    Returns:
+        An embedder with fit(texts), embed(texts) and state()
+    """
+    if prefer_model:
+        try:
+            return SentenceTransformerEmbedder(model_name or DEFAULT_MODEL)
+        except Exception:
+            pass
+    return HashedTfidfEmbedder()
+
+
+def embedder_from_state(state: dict, idf: Optional[np.ndarray] = None):
+    """Recreate the embedder an index was built with."""
+    name = state.get("name", HashedTfidfEmbedder.name)
+    if name.startswith("st:"):
+        return SentenceTransformerEmbedder(name[3:])
+    return HashedTfidfEmbedder(dim=state.get("dim", HASH_DIM), idf=idf)
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Batched cosine top-k over L2-normalized rows.
+
+    Args:
+        matrix: (n, d) float32 corpus matrix
+        queries: (q, d) float32 query matrix
+        k: Number of results per query
+
+    Returns:
+        (indices, scores), each shaped (q, k), best first
+    """
+    n = matrix.shape[0]
+    k = min(k, n)
+    if k == 0:
+        empty = np.zeros((queries.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    scores = queries @ matrix.T
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n), (scores.shape[0], n))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx, np.take_along_axis(part_scores, order, axis=1)
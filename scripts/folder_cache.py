@@ -0,0 +1,144 @@
+"""
+Persistent cache of course folder IDs.
+
+Resolving a course folder by name is a search over the whole Drive, and
+when several folders share a name the search can return a different one
+from run to run. Once a name is resolved, its folder ID and ancestry
+(e.g. "My Drive/Purdue/Fall/ECE 270") are kept in
+<workspace>/.folder_cache.json. Each run checks every cached ID with one
+batched metadata request and searches again only for folders that are gone
+(404) or trashed.
+
+A course can pin its folder with "drive_folder_id" in config.json, which
+skips the search entirely.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from drive_query import DriveQuery, FOLDER_MIME
+
+CACHE_FILE = ".folder_cache.json"
+MAX_DEPTH = 32
+
+
+def find_folders(drive, name):
+    """All non-trashed folders with exactly this name."""
+    query = DriveQuery().name_equals(name).mime_types(FOLDER_MIME).not_trashed()
+    return drive.list_files(query=query, page_size=10)
+
+
+class FolderCache:
+    def __init__(self, drive, path):
+        """
+        Args:
+            drive: Authenticated client with list_files and get_files_metadata
+            path: Cache file (usually <workspace>/.folder_cache.json)
+        """
+        self.drive = drive
+        self.path = Path(path)
+        self.entries = json.loads(self.path.read_text()) if self.path.exists() else {}
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2))
+        os.replace(tmp, self.path)
+
+    def ancestry(self, metadata):
+        """
+        Ancestor chains for folders, fetching each level in one batch.
+
+        Args:
+            metadata: {folder_id: metadata with name and parents}
+
+        Returns:
+            {folder_id: (path, ancestor_ids)} with path like "My Drive/Purdue/ECE 270"
+        """
+        known = dict(metadata)
+        chains = {fid: ([meta["name"]], []) for fid, meta in metadata.items()}
+        parent_of = {fid: (meta.get("parents") or [None])[0] for fid, meta in metadata.items()}
+
+        for _ in range(MAX_DEPTH):
+            missing = [p for p in set(parent_of.values()) if p and p not in known]
+            if missing:
+                known.update(self.drive.get_files_metadata(missing, fields="id, name, parents"))
+            if not any(parent_of.values()):
+                break
+            for fid, parent in parent_of.items():
+                if parent and known.get(parent):
+                    names, ids = chains[fid]
+                    names.insert(0, known[parent]["name"])
+                    ids.insert(0, parent)
+                    parent_of[fid] = (known[parent].get("parents") or [None])[0]
+                else:
+                    parent_of[fid] = None
+
+        return {fid: ("/".join(names), ids) for fid, (names, ids) in chains.items()}
+
+    def resolve_all(self, names, pinned=None):
+        """
+        Folder IDs for course folder names.
+
+        Args:
+            names: Drive folder names to resolve
+            pinned: {name: folder_id} to use instead of searching
+
+        Returns:
+            {name: folder_id or None if not found}
+        """
+        pinned = pinned or {}
+        cached = {n: self.entries[n]["id"] for n in names if n in self.entries and n not in pinned}
+
+        # One batched request validates every cached and pinned folder
+        ids = list(cached.values()) + list(pinned.values())
+        metadata = self.drive.get_files_metadata(ids) if ids else {}
+
+        resolved = {}
+        for name in names:
+            if name in pinned:
+                meta = metadata.get(pinned[name])
+                if meta is None or meta.get("trashed"):
+                    print(f"Pinned folder {pinned[name]} for '{name}' was not found.")
+                    resolved[name] = None
+                else:
+                    resolved[name] = pinned[name]
+                continue
+
+            if name in cached:
+                meta = metadata.get(cached[name])
+                if meta is not None and not meta.get("trashed"):
+                    resolved[name] = cached[name]
+                    continue
+                print(f"Cached folder for '{name}' is gone; searching again...")
+                del self.entries[name]
+
+            resolved[name] = self._search(name)
+
+        self.save()
+        return resolved
+
+    def _search(self, name):
+        """Search for a folder by name and cache it with its ancestry."""
+        candidates = find_folders(self.drive, name)
+        if not candidates:
+            return None
+
+        metadata = self.drive.get_files_metadata([c["id"] for c in candidates], fields="id, name, parents")
+        paths = self.ancestry({fid: meta for fid, meta in metadata.items() if meta})
+        chosen = candidates[0]["id"]
+        if len(candidates) > 1:
+            print(f"Found {len(candidates)} folders named '{name}':")
+            for c in candidates:
+                print(f"  {paths.get(c['id'], (name,))[0]} (ID: {c['id']})")
+            print(f"Using {chosen}; set drive_folder_id in config.json to choose another.")
+
+        path, ancestors = paths.get(chosen, (name, []))
+        self.entries[name] = {
+            "id": chosen,
+            "path": path,
+            "ancestors": ancestors,
+            "resolved": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        return chosen
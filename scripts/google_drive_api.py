@@ -11,16 +11,25 @@ Setup:
 6. Install dependencies: pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib
 """
 
+import hashlib
 import io
 import json
+import mimetypes
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Optional
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+
+from drive_query import DriveQuery
 
 
 SCOPES = [
@@ -34,6 +43,96 @@ TOKEN_FILE = "token.json"
 TOKEN_ENV_VAR = "GOOGLE_DRIVE_TOKEN"
 CREDENTIALS_FILE = "credentials.json"
 CREDENTIALS_ENV_VAR = "GOOGLE_DRIVE_CREDENTIALS"
+UPLOAD_SESSIONS_FILE = ".upload_sessions.json"
+
+# Resumable upload sessions last a week on Drive's side; drop ours a day earlier
+UPLOAD_SESSION_TTL = 6 * 24 * 3600
+# Chunks must be multiples of 256 KiB. Larger chunks mean fewer round trips;
+# smaller ones mean less to resend after an interruption.
+CHUNK_UNIT = 256 * 1024
+MIN_CHUNK_SIZE = 32 * CHUNK_UNIT
+MAX_CHUNK_SIZE = 256 * CHUNK_UNIT
+UPLOAD_WORKERS = 4
+
+
+def chunk_size_for(size: int) -> int:
+    """
+    Upload chunk size for a file: about an eighth of the file, between
+    8 MiB and 64 MiB, so small files go in one request and large ones
+    keep a bounded amount to resend.
+    """
+    target = -(-max(size, 1) // 8 // CHUNK_UNIT) * CHUNK_UNIT
+    return min(max(target, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+
+def content_md5(file_path: Optional[str] = None, content: bytes | str | None = None) -> tuple[int, str]:
+    """Size and MD5 hex digest of a local file or in-memory content (Drive's md5Checksum)."""
+    md5 = hashlib.md5()
+    if file_path is not None:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        return os.path.getsize(file_path), md5.hexdigest()
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    md5.update(content)
+    return len(content), md5.hexdigest()
+
+
+class UploadSessions:
+    def __init__(self, path: str = UPLOAD_SESSIONS_FILE):
+        """
+        Saved resumable upload session URIs, so an interrupted upload can
+        continue from the last chunk Drive received. Thread-safe. The file
+        is read on first use, and an unreadable one is treated as empty.
+
+        Args:
+            path: JSON file the sessions are kept in
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.sessions = None
+
+    def _load(self) -> None:
+        """Read the sessions file once, dropping expired sessions (call with lock held)."""
+        if self.sessions is not None:
+            return
+        self.sessions = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return
+        if not isinstance(data, dict):
+            return
+        cutoff = time.time() - UPLOAD_SESSION_TTL
+        for key, session in data.items():
+            if isinstance(session, dict) and "uri" in session and session.get("created", 0) > cutoff:
+                self.sessions[key] = session
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.sessions, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            self._load()
+            session = self.sessions.get(key)
+            return session["uri"] if session else None
+
+    def put(self, key: str, uri: str) -> None:
+        with self.lock:
+            self._load()
+            self.sessions[key] = {"uri": uri, "created": time.time()}
+            self._save()
+
+    def drop(self, key: str) -> None:
+        with self.lock:
+            self._load()
+            if self.sessions.pop(key, None) is not None:
+                self._save()
 
 
 class GoogleDriveAPI:
@@ -57,6 +156,7 @@ class GoogleDriveAPI:
         self.use_env_vars = use_env_vars
         self.creds = None
         self.service = None
+        self.sessions = UploadSessions(os.path.join(os.path.dirname(token_file), UPLOAD_SESSIONS_FILE))
 
     def _load_token_from_env(self) -> Optional[Credentials]:
         """Load token from environment variable."""
@@ -138,10 +238,26 @@ class GoogleDriveAPI:
 
         self.service = build("drive", "v3", credentials=self.creds)
 
+    def fork(self) -> "GoogleDriveAPI":
+        """
+        A client sharing these credentials with its own service object.
+
+        googleapiclient services are not thread-safe, so each worker thread
+        should use its own fork instead of the shared client.
+
+        Returns:
+            Authenticated GoogleDriveAPI
+        """
+        clone = GoogleDriveAPI(self.credentials_file, self.token_file, self.use_env_vars)
+        clone.creds = self.creds
+        clone.service = build("drive", "v3", credentials=self.creds)
+        clone.sessions = self.sessions
+        return clone
+
     def list_files(
         self,
         page_size: int = 10,
-        query: Optional[str] = None,
+        query: Optional[str | DriveQuery] = None,
         folder_id: Optional[str] = None,
     ) -> list[dict]:
         """
@@ -149,25 +265,34 @@ class GoogleDriveAPI:
 
         Args:
             page_size: Number of files to return (max 1000)
-            query: Custom query string (see Drive API query syntax)
-            folder_id: List files in a specific folder
+            query: DriveQuery, or a raw query string (see Drive API query syntax)
+            folder_id: List files in a specific folder (combined with query)
 
         Returns:
             List of file metadata dictionaries
         """
         if folder_id:
-            query = f"'{folder_id}' in parents"
+            scoped = DriveQuery().in_parents(folder_id)
+            if isinstance(query, DriveQuery):
+                query = scoped.extend(query)
+            elif query:
+                query = f"{scoped.build()} and ({query})"
+            else:
+                query = scoped
 
         results = (
             self.service.files()
             .list(
                 pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)",
-                q=query,
+                fields="nextPageToken, files(id, name, mimeType, size, modifiedTime, md5Checksum)",
+                q=query.build() if isinstance(query, DriveQuery) else query,
             )
             .execute()
         )
-        return results.get("files", [])
+        files = results.get("files", [])
+        if isinstance(query, DriveQuery):
+            files = [f for f in files if query.size_ok(f)]
+        return files
 
     def get_file_metadata(self, file_id: str) -> dict:
         """
@@ -181,10 +306,85 @@ class GoogleDriveAPI:
         """
         return (
             self.service.files()
-            .get(fileId=file_id, fields="id, name, mimeType, size, modifiedTime, parents")
+            .get(fileId=file_id, fields="id, name, mimeType, size, modifiedTime, md5Checksum, parents")
             .execute()
         )
 
+    def get_files_metadata(
+        self,
+        file_ids: list[str],
+        fields: str = "id, name, mimeType, modifiedTime, parents, trashed",
+    ) -> dict[str, Optional[dict]]:
+        """
+        Metadata for many files in batched requests (100 per HTTP call).
+
+        Args:
+            file_ids: IDs to fetch
+            fields: Fields to return for each file
+
+        Returns:
+            {file_id: metadata}, with None for files that no longer exist (404)
+        """
+        results, errors = {}, []
+
+        def collect(request_id, response, exception):
+            if exception is None:
+                results[request_id] = response
+            elif isinstance(exception, HttpError) and exception.resp.status == 404:
+                results[request_id] = None
+            else:
+                errors.append(exception)
+
+        unique = list(dict.fromkeys(file_ids))
+        for start in range(0, len(unique), 100):
+            batch = self.service.new_batch_http_request(callback=collect)
+            for file_id in unique[start:start + 100]:
+                batch.add(self.service.files().get(fileId=file_id, fields=fields), request_id=file_id)
+            batch.execute()
+        if errors:
+            raise errors[0]
+        return results
+
+    def get_start_page_token(self) -> str:
+        """
+        Token for the current position in the Drive changes feed.
+
+        Returns:
+            Page token to pass to list_changes later
+        """
+        return self.service.changes().getStartPageToken().execute()["startPageToken"]
+
+    def list_changes(self, page_token: str) -> tuple[list[dict], str]:
+        """
+        All changes since a page token.
+
+        Args:
+            page_token: From get_start_page_token or a previous list_changes
+
+        Returns:
+            (changes, new_page_token); each change has fileId, removed and
+            file (id, name, mimeType, size, modifiedTime, md5Checksum,
+            parents, trashed)
+        """
+        changes = []
+        while True:
+            results = (
+                self.service.changes()
+                .list(
+                    pageToken=page_token,
+                    pageSize=1000,
+                    fields=(
+                        "nextPageToken, newStartPageToken, changes(fileId, removed, "
+                        "file(id, name, mimeType, size, modifiedTime, md5Checksum, parents, trashed))"
+                    ),
+                )
+                .execute()
+            )
+            changes.extend(results.get("changes", []))
+            if "newStartPageToken" in results:
+                return changes, results["newStartPageToken"]
+            page_token = results["nextPageToken"]
+
     def read_file(self, file_id: str) -> bytes:
         """
         Read/download a file's content.
@@ -242,12 +442,78 @@ class GoogleDriveAPI:
         file_stream.seek(0)
         return file_stream.read()
 
+    @contextmanager
+    def _media(self, mime_type: Optional[str], file_path: Optional[str] = None, content: bytes | str | None = None):
+        """
+        Resumable media with a chunk size tuned to the file. A local file is
+        streamed from disk and closed when the block exits.
+
+        Yields:
+            (media, size, md5 hex digest)
+        """
+        size, md5 = content_md5(file_path, content)
+        if file_path is not None:
+            mime_type = mime_type or mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+            with open(file_path, "rb") as f:
+                yield MediaIoBaseUpload(f, mimetype=mime_type, chunksize=chunk_size_for(size), resumable=True), size, md5
+            return
+
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        media = MediaIoBaseUpload(
+            io.BytesIO(content), mimetype=mime_type, chunksize=chunk_size_for(size), resumable=True
+        )
+        yield media, size, md5
+
+    def _resume(self, request, uri: str, size: int) -> Optional[dict]:
+        """
+        Point a request at a saved session and ask Drive how much it has.
+
+        Returns:
+            File metadata if the upload had already finished, else None
+            (request then continues from the next missing byte, or starts a
+            new session if the saved one has expired)
+        """
+        resp, body = request.http.request(
+            uri, "PUT", headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"}
+        )
+        if resp.status in (200, 201):
+            return request.postproc(resp, body)
+        if resp.status == 308:
+            request.resumable_uri = uri
+            received = resp.get("range")
+            request.resumable_progress = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+        return None
+
+    def _send(self, request, session_key: str, size: int) -> dict:
+        """Run a resumable upload, saving its session URI until it completes."""
+        saved = self.sessions.get(session_key)
+        if saved:
+            done = self._resume(request, saved, size)
+            if done is not None:
+                self.sessions.drop(session_key)
+                return done
+
+        response = None
+        while response is None:
+            _, response = request.next_chunk()
+            if request.resumable_uri and request.resumable_uri != saved:
+                saved = request.resumable_uri
+                self.sessions.put(session_key, saved)
+        self.sessions.drop(session_key)
+        return response
+
+    @staticmethod
+    def _session_key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
     def update_file(
         self,
         file_id: str,
-        content: bytes | str,
+        content: bytes | str | None = None,
         mime_type: str = "text/plain",
         new_name: Optional[str] = None,
+        file_path: Optional[str] = None,
     ) -> dict:
         """
         Update an existing file's content.
@@ -257,29 +523,24 @@ class GoogleDriveAPI:
             content: New file content (bytes or string)
             mime_type: MIME type of the content
             new_name: Optional new name for the file
+            file_path: Local file to upload instead of content (streamed, not
+                       read into memory)
 
         Returns:
             Updated file metadata
         """
-        if isinstance(content, str):
-            content = content.encode("utf-8")
-
-        media = MediaIoBaseUpload(io.BytesIO(content), mimetype=mime_type, resumable=True)
-
         file_metadata = {}
         if new_name:
             file_metadata["name"] = new_name
 
-        return (
-            self.service.files()
-            .update(
+        with self._media(mime_type, file_path=file_path, content=content) as (media, size, md5):
+            request = self.service.files().update(
                 fileId=file_id,
                 body=file_metadata if file_metadata else None,
                 media_body=media,
-                fields="id, name, mimeType, modifiedTime",
+                fields="id, name, mimeType, modifiedTime, md5Checksum",
             )
-            .execute()
-        )
+            return self._send(request, self._session_key("update", file_id, md5, size), size)
 
     def upload_file(
         self,
@@ -305,13 +566,12 @@ class GoogleDriveAPI:
         if folder_id:
             file_metadata["parents"] = [folder_id]
 
-        media = MediaFileUpload(file_path, mimetype=mime_type, resumable=True)
-
-        return (
-            self.service.files()
-            .create(body=file_metadata, media_body=media, fields="id, name, mimeType")
-            .execute()
-        )
+        with self._media(mime_type, file_path=file_path) as (media, size, md5):
+            request = self.service.files().create(
+                body=file_metadata, media_body=media, fields="id, name, mimeType, md5Checksum"
+            )
+            key = self._session_key("create", folder_id, file_metadata["name"], md5, size)
+            return self._send(request, key, size)
 
     def create_file(
         self,
@@ -332,20 +592,93 @@ class GoogleDriveAPI:
         Returns:
             Created file metadata
         """
-        if isinstance(content, str):
-            content = content.encode("utf-8")
-
         file_metadata = {"name": name}
         if folder_id:
             file_metadata["parents"] = [folder_id]
 
-        media = MediaIoBaseUpload(io.BytesIO(content), mimetype=mime_type, resumable=True)
+        with self._media(mime_type, content=content) as (media, size, md5):
+            request = self.service.files().create(
+                body=file_metadata, media_body=media, fields="id, name, mimeType, md5Checksum"
+            )
+            return self._send(request, self._session_key("create", folder_id, name, md5, size), size)
+
+    def _remote_match(self, job: dict, md5: str) -> Optional[dict]:
+        """The remote file a job would write, if its content already has this md5."""
+        if job.get("file_id"):
+            meta = self.get_file_metadata(job["file_id"])
+            return meta if meta.get("md5Checksum") == md5 else None
+        # Without a folder the new file would land in My Drive's root, so only look there
+        query = DriveQuery().name_equals(job["name"]).not_trashed()
+        for f in self.list_files(query=query, folder_id=job.get("folder_id") or "root", page_size=10):
+            if f.get("md5Checksum") == md5:
+                return f
+        return None
 
-        return (
-            self.service.files()
-            .create(body=file_metadata, media_body=media, fields="id, name, mimeType")
-            .execute()
-        )
+    def upload_many(
+        self,
+        jobs: list[dict],
+        workers: int = UPLOAD_WORKERS,
+        skip_unchanged: bool = True,
+    ) -> list[dict]:
+        """
+        Upload many files concurrently, each as its own resumable session.
+
+        Interrupted uploads resume from their saved session on the next
+        call with the same job, and with skip_unchanged a job whose target
+        already has the same md5 is not uploaded at all.
+
+        Args:
+            jobs: Dicts with "path" (local file) or "content" (bytes/str),
+                  plus optional "name" (defaults to the file name),
+                  "folder_id", "mime_type", and "file_id" to update an
+                  existing file instead of creating one
+            workers: Concurrent uploads
+            skip_unchanged: Skip jobs whose remote md5 already matches
+
+        Returns:
+            One dict per job, in order: {"name", "status", "file", "error"}
+            with status "created", "updated", "skipped" or "failed"
+        """
+        local = threading.local()
+
+        def client():
+            if not hasattr(local, "drive"):
+                local.drive = self.fork()
+            return local.drive
+
+        def run(job):
+            name = job.get("name") or (os.path.basename(job["path"]) if "path" in job else None)
+            job = {**job, "name": name}
+            try:
+                if not name and not job.get("file_id"):
+                    raise ValueError("a content job needs a 'name' (or a 'file_id' to update)")
+                drive = client()
+                if skip_unchanged:
+                    _, md5 = content_md5(job.get("path"), job.get("content"))
+                    existing = drive._remote_match(job, md5)
+                    if existing is not None:
+                        return {"name": name, "status": "skipped", "file": existing, "error": None}
+
+                if job.get("file_id"):
+                    result = drive.update_file(
+                        job["file_id"],
+                        job.get("content"),
+                        job.get("mime_type") or (None if "path" in job else "application/octet-stream"),
+                        file_path=job.get("path"),
+                    )
+                    status = "updated"
+                elif "path" in job:
+                    result = drive.upload_file(job["path"], name, job.get("folder_id"), job.get("mime_type"))
+                    status = "created"
+                else:
+                    result = drive.create_file(name, job["content"], job.get("mime_type") or "text/plain", job.get("folder_id"))
+                    status = "created"
+                return {"name": name, "status": status, "file": result, "error": None}
+            except Exception as e:
+                return {"name": name, "status": "failed", "file": None, "error": f"{type(e).__name__}: {e}"}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, jobs))
 
     def delete_file(self, file_id: str) -> None:
         """
@@ -366,7 +699,7 @@ class GoogleDriveAPI:
         Returns:
             List of matching files
         """
-        query = f"name contains '{name_contains}'"
+        query = DriveQuery().name_contains(name_contains).not_trashed()
         return self.list_files(query=query, page_size=100)
 
 
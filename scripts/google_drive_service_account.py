@@ -21,6 +21,8 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
 
+from drive_query import DriveQuery
+
 
 SCOPES = [
     "https://www.googleapis.com/auth/drive.readonly",
@@ -67,29 +69,38 @@ class GoogleDriveServiceAccount:
     def list_files(
         self,
         page_size: int = 10,
-        query: Optional[str] = None,
+        query: Optional[str | DriveQuery] = None,
         folder_id: Optional[str] = None,
     ) -> list[dict]:
         """List files accessible to the service account."""
         if folder_id:
-            query = f"'{folder_id}' in parents"
+            scoped = DriveQuery().in_parents(folder_id)
+            if isinstance(query, DriveQuery):
+                query = scoped.extend(query)
+            elif query:
+                query = f"{scoped.build()} and ({query})"
+            else:
+                query = scoped
 
         results = (
             self.service.files()
             .list(
                 pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)",
-                q=query,
+                fields="nextPageToken, files(id, name, mimeType, size, modifiedTime, md5Checksum)",
+                q=query.build() if isinstance(query, DriveQuery) else query,
             )
             .execute()
         )
-        return results.get("files", [])
+        files = results.get("files", [])
+        if isinstance(query, DriveQuery):
+            files = [f for f in files if query.size_ok(f)]
+        return files
 
     def get_file_metadata(self, file_id: str) -> dict:
         """Get metadata for a specific file."""
         return (
             self.service.files()
-            .get(fileId=file_id, fields="id, name, mimeType, size, modifiedTime, parents")
+            .get(fileId=file_id, fields="id, name, mimeType, size, modifiedTime, md5Checksum, parents")
             .execute()
         )
 
@@ -201,7 +212,7 @@ class GoogleDriveServiceAccount:
 
     def search_files(self, name_contains: str) -> list[dict]:
         """Search for files by name."""
-        query = f"name contains '{name_contains}'"
+        query = DriveQuery().name_contains(name_contains).not_trashed()
         return self.list_files(query=query, page_size=100)
 
 
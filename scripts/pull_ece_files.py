@@ -6,8 +6,13 @@ Syncs all configured course folders.
 import os
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from google_drive_api import GoogleDriveAPI
+from blob_store import BlobStore, BLOB_DIR
+from drive_query import DriveQuery, FOLDER_MIME
+from folder_cache import CACHE_FILE, FolderCache, find_folders
 
 SCRIPT_DIR = Path(__file__).parent
 CONFIG_PATH = SCRIPT_DIR.parent / "config.json"
@@ -24,71 +29,220 @@ def load_config():
         return json.load(f)
 
 
-def sync_folder(drive, drive_folder_name, local_folder_path):
-    """Sync a single Google Drive folder to local folder."""
-    print(f"\nSearching for folder '{drive_folder_name}' on Google Drive...")
-
-    query = f"name = '{drive_folder_name}' and mimeType = 'application/vnd.google-apps.folder'"
-    folders = drive.list_files(query=query, page_size=10)
-
-    if not folders:
-        print(f"Folder '{drive_folder_name}' not found on Google Drive.")
-        return False
-
-    folder_id = folders[0]['id']
-    print(f"Found folder with ID: {folder_id}")
+# Google Workspace MIME type -> kind used in export profiles
+GOOGLE_TYPES = {
+    'application/vnd.google-apps.document': 'document',
+    'application/vnd.google-apps.spreadsheet': 'spreadsheet',
+    'application/vnd.google-apps.presentation': 'presentation',
+}
+
+# Export format name -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    'pdf': ('application/pdf', '.pdf'),
+    'md': ('text/markdown', '.md'),
+    'txt': ('text/plain', '.txt'),
+    'docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', '.docx'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'csv': ('text/csv', '.csv'),
+    'pptx': ('application/vnd.openxmlformats-officedocument.presentationml.presentation', '.pptx'),
+}
+
+# Named profiles: kind -> formats to export. A course picks one with
+# "export_profile" in config.json, or gives its own {kind: [formats]}.
+EXPORT_PROFILES = {
+    'pdf': {'document': ['pdf'], 'spreadsheet': ['xlsx'], 'presentation': ['pdf']},
+    'rag': {'document': ['md'], 'spreadsheet': ['csv'], 'presentation': ['txt']},
+    'both': {'document': ['pdf', 'md'], 'spreadsheet': ['xlsx', 'csv'], 'presentation': ['pdf', 'txt']},
+}
+DEFAULT_PROFILE = 'pdf'
+DOWNLOAD_WORKERS = 4
+
+
+def course_profile(course_config):
+    """Export profile {kind: [formats]} for a course config."""
+    profile = course_config.get('export_profile', DEFAULT_PROFILE)
+    if isinstance(profile, str):
+        if profile not in EXPORT_PROFILES:
+            raise ValueError(f"Unknown export_profile '{profile}' (choose from {', '.join(EXPORT_PROFILES)})")
+        return EXPORT_PROFILES[profile]
+    return {**EXPORT_PROFILES[DEFAULT_PROFILE], **profile}
+
+
+def find_folder(drive, drive_folder_name):
+    """ID of the Drive folder with this name, or None."""
+    folders = find_folders(drive, drive_folder_name)
+    return folders[0]['id'] if folders else None
+
+
+def resolve_course_folders(drive, config):
+    """
+    Folder IDs for every Drive course, via the persistent FolderCache.
+
+    Returns:
+        {drive_folder_name: folder_id or None}
+    """
+    courses = [c for c in config["courses"].values() if "drive_folder_name" in c]
+    pinned = {c["drive_folder_name"]: c["drive_folder_id"] for c in courses if "drive_folder_id" in c}
+    cache = FolderCache(drive, os.path.join(config["workspace_path"], CACHE_FILE))
+    return cache.resolve_all([c["drive_folder_name"] for c in courses], pinned)
+
+
+def export_file(drive, file_info, local_path, fmt, store=None):
+    """
+    Export a Google Workspace file in one format.
+
+    With a BlobStore, exports are cached by (file ID, modifiedTime, target
+    MIME), so an unchanged document is never converted twice.
+
+    Returns:
+        (outcome, local_path) with outcome "saved" or "cached"
+    """
+    export_mime, extension = EXPORT_FORMATS[fmt]
+    local_path = local_path + extension if not local_path.endswith(extension) else local_path
+    modified = file_info.get('modifiedTime')
+    key = f"{file_info['id']}\0{modified}\0{export_mime}"
+
+    digest = store.lookup('exports', key) if store and modified else None
+    if digest:
+        store.place(digest, local_path)
+        print(f"  Export cached: {os.path.basename(local_path)}")
+        return "cached", local_path
+
+    print(f"  Exporting: {os.path.basename(local_path)}")
+    content = drive.export_google_doc(file_info['id'], export_mime)
+    if store:
+        digest = store.put(content)
+        store.place(digest, local_path)
+        if modified:
+            store.alias('exports', key, digest)
+    else:
+        with open(local_path, 'wb') as f:
+            f.write(content)
+    print(f"    Saved to: {local_path}")
+    return "saved", local_path
+
+
+def sync_file(drive, file_info, local_folder_path, store=None, profile=None):
+    """
+    Download one Drive file into a local folder.
+
+    Google Docs/Sheets/Slides are exported in every format the course's
+    export profile lists. With a BlobStore, contents are stored once across
+    all courses and linked into place, files whose md5Checksum is already
+    stored are not downloaded, and exports are cached.
+
+    Returns:
+        (outcome, local_paths) with outcome "saved", "deduplicated",
+        "cached" or "skipped" (subfolders)
+    """
+    file_name = file_info['name']
+    file_id = file_info['id']
+    mime_type = file_info['mimeType']
+    local_path = os.path.join(local_folder_path, file_name)
+
+    if mime_type == FOLDER_MIME:
+        print(f"    Skipping subfolder: {file_name}")
+        return "skipped", []
+
+    if mime_type in GOOGLE_TYPES:
+        formats = (profile or EXPORT_PROFILES[DEFAULT_PROFILE])[GOOGLE_TYPES[mime_type]]
+        results = [export_file(drive, file_info, local_path, fmt, store) for fmt in formats]
+        outcome = "saved" if any(o == "saved" for o, _ in results) else "cached"
+        return outcome, [path for _, path in results]
+
+    digest = store.lookup_md5(file_info.get('md5Checksum')) if store else None
+    if digest:
+        how = store.place(digest, local_path)
+        print(f"  Already stored: {file_name} ({how})")
+        return "deduplicated", [local_path]
+
+    print(f"  Downloading: {file_name}")
+    content = drive.read_file(file_id)
+    if store:
+        store.place(store.put(content), local_path)
+    else:
+        with open(local_path, 'wb') as f:
+            f.write(content)
+    print(f"    Saved to: {local_path}")
+    return "saved", [local_path]
+
+
+def sync_folder(drive, drive_folder_name, local_folder_path, store=None, profile=None,
+                filters=None, workers=DOWNLOAD_WORKERS, folder_id=None, synced=None):
+    """
+    Sync a single Google Drive folder to local folder.
+
+    Trashed files and subfolders are filtered out by Drive, along with
+    anything excluded by the course's "drive_filters" (include_mime,
+    exclude_mime, modified_after, min_size, max_size).
+
+    Files are downloaded and exported on a thread pool; each worker uses its
+    own fork of the Drive client when it has one, since googleapiclient
+    services are not thread-safe.
+
+    Pass folder_id (from resolve_course_folders) to skip the name search.
+    Pass a dict as synced to have it filled with {file_id: local paths},
+    or None for files that failed.
+
+    Returns:
+        Counts {"files", "saved", "deduplicated", "cached", "skipped",
+        "errors"}, or None if the folder was not found
+    """
+    if not folder_id:
+        print(f"\nSearching for folder '{drive_folder_name}' on Google Drive...")
+        folder_id = find_folder(drive, drive_folder_name)
+        if not folder_id:
+            print(f"Folder '{drive_folder_name}' not found on Google Drive.")
+            return None
+        print(f"Found folder with ID: {folder_id}")
 
     print(f"Listing files in '{drive_folder_name}'...")
-    files = drive.list_files(folder_id=folder_id, page_size=100)
+    query = DriveQuery().not_trashed().exclude_mime_types(FOLDER_MIME).extend(DriveQuery.from_filters(filters))
+    files = drive.list_files(query=query, folder_id=folder_id, page_size=100)
 
+    counts = {"files": len(files), "saved": 0, "deduplicated": 0, "cached": 0, "skipped": 0, "errors": 0}
     if not files:
         print("No files found in the folder.")
-        return True
+        return counts
 
     print(f"Found {len(files)} files.")
 
     os.makedirs(local_folder_path, exist_ok=True)
 
-    for file_info in files:
-        file_name = file_info['name']
-        file_id = file_info['id']
-        mime_type = file_info['mimeType']
-
-        print(f"  Downloading: {file_name}")
-
-        local_path = os.path.join(local_folder_path, file_name)
+    parallel = workers > 1 and len(files) > 1 and hasattr(drive, 'fork')
+    local = threading.local()
 
+    def run(file_info):
+        client = drive
+        if parallel:
+            if not hasattr(local, 'drive'):
+                local.drive = drive.fork()
+            client = local.drive
         try:
-            if mime_type == 'application/vnd.google-apps.document':
-                content = drive.export_google_doc(file_id, 'application/pdf')
-                local_path = local_path + '.pdf' if not local_path.endswith('.pdf') else local_path
-            elif mime_type == 'application/vnd.google-apps.spreadsheet':
-                content = drive.export_google_doc(file_id, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                local_path = local_path + '.xlsx' if not local_path.endswith('.xlsx') else local_path
-            elif mime_type == 'application/vnd.google-apps.presentation':
-                content = drive.export_google_doc(file_id, 'application/pdf')
-                local_path = local_path + '.pdf' if not local_path.endswith('.pdf') else local_path
-            elif mime_type == 'application/vnd.google-apps.folder':
-                print(f"    Skipping subfolder: {file_name}")
-                continue
-            else:
-                content = drive.read_file(file_id)
-
-            with open(local_path, 'wb') as f:
-                f.write(content)
-            print(f"    Saved to: {local_path}")
-
+            outcome, paths = sync_file(client, file_info, local_folder_path, store, profile)
         except Exception as e:
-            print(f"    Error downloading {file_name}: {e}")
+            print(f"    Error downloading {file_info['name']}: {e}")
+            outcome, paths = "errors", None
+        if synced is not None:
+            synced[file_info['id']] = paths
+        return outcome
+
+    if parallel:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(run, files))
+    else:
+        outcomes = [run(file_info) for file_info in files]
+    for outcome in outcomes:
+        counts[outcome] += 1
 
-    return True
+    return counts
 
 
 def list_available_folders(drive):
     """List all available folders on Google Drive."""
     print("\nAvailable folders on Google Drive:")
     all_folders = drive.list_files(
-        query="mimeType = 'application/vnd.google-apps.folder'",
+        query=DriveQuery().mime_types(FOLDER_MIME).not_trashed(),
         page_size=50
     )
     for f in all_folders:
@@ -105,7 +259,9 @@ def main():
         if "drive_folder_name" in course_config:
             folder_mappings.append({
                 "drive_name": course_config["drive_folder_name"],
-                "local_name": course_config["local_folder_name"]
+                "local_name": course_config["local_folder_name"],
+                "profile": course_profile(course_config),
+                "filters": course_config.get("drive_filters"),
             })
 
     if not folder_mappings:
@@ -115,6 +271,8 @@ def main():
 
     drive = GoogleDriveAPI()
     drive.authenticate()
+    store = BlobStore(os.path.join(base_path, BLOB_DIR))
+    folder_ids = resolve_course_folders(drive, config)
 
     print("Syncing Google Drive folders to local storage...")
     print(f"Configured folders: {len(folder_mappings)}")
@@ -124,7 +282,12 @@ def main():
         drive_name = mapping["drive_name"]
         local_path = os.path.join(base_path, mapping["local_name"])
 
-        if sync_folder(drive, drive_name, local_path):
+        if not folder_ids.get(drive_name):
+            print(f"\nFolder '{drive_name}' not found on Google Drive.")
+            continue
+        counts = sync_folder(drive, drive_name, local_path, store, mapping["profile"], mapping["filters"],
+                             folder_id=folder_ids[drive_name])
+        if counts is not None:
             success_count += 1
 
     print(f"\nSync complete. {success_count}/{len(folder_mappings)} folders synced successfully.")
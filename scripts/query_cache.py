@@ -0,0 +1,198 @@
+"""
+Query Result Cache
+LRU plus on-disk cache for textbook and context_db search results.
+
+A lookup first tries the normalized query text (lowercased, stopwords and
+punctuation dropped), then falls back to the most similar cached query by
+embedding cosine similarity. The fallback only considers cached queries
+with the same numbers in the same order, since "Example 3.4" and
+"Example 3.5" (or a 6 ohm and a 4 ohm resistor) embed almost identically
+but want different answers. The whole cache is dropped when the version of
+the index it was built against changes.
+
+Writes to disk are batched: each put marks the cache dirty, and the file
+is rewritten after save_every puts or save_interval seconds, and on
+close() or interpreter exit.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from embeddings import tokenize
+
+DEFAULT_CAPACITY = 512
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_SAVE_EVERY = 32
+DEFAULT_SAVE_INTERVAL = 60.0
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form used as the exact-match cache key."""
+    return " ".join(tokenize(query))
+
+
+def numbers(key: str) -> list[str]:
+    """Tokens of a normalized query that contain digits, in order."""
+    return [tok for tok in key.split() if any(c.isdigit() for c in tok)]
+
+
+class QueryCache:
+    def __init__(
+        self,
+        version: str,
+        embedder=None,
+        path: Optional[Path] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        threshold: float = DEFAULT_THRESHOLD,
+        save_every: int = DEFAULT_SAVE_EVERY,
+        save_interval: float = DEFAULT_SAVE_INTERVAL,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            version: Version of the index the results come from
+            embedder: Embedder for near-duplicate matching (None = exact only)
+            path: JSON file to persist the cache in (None = memory only)
+            capacity: Maximum number of cached queries
+            threshold: Minimum cosine similarity for a near-duplicate hit
+            save_every: Unsaved puts that trigger a write
+            save_interval: Seconds after which a put with unsaved changes writes
+        """
+        self.version = version
+        self.embedder = embedder
+        self.path = Path(path) if path else None
+        self.capacity = capacity
+        self.threshold = threshold
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self._keys: list[str] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        self._load()
+        if self.path:
+            atexit.register(self.close)
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        if data.get("version") != self.version:
+            return
+        for key, entry in data.get("entries", []):
+            self.entries[key] = entry
+        self._rebuild_vectors()
+
+    def _rebuild_vectors(self) -> None:
+        self._keys = list(self.entries)
+        if self.embedder is None or not self._keys:
+            self._vectors = None
+            return
+        self._vectors = self.embedder.embed(self._keys)
+
+    def save(self) -> None:
+        """Atomically write the cache to disk."""
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": self.version, "entries": list(self.entries.items())}, f)
+        os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        """Write any unsaved entries."""
+        if self._unsaved:
+            self.save()
+
+    def invalidate(self, version: str) -> None:
+        """Drop everything if the index version changed."""
+        if version == self.version:
+            return
+        self.version = version
+        self.entries.clear()
+        self._rebuild_vectors()
+        self.save()
+
+    def get(self, query: str, k: int, fuzzy: bool = True) -> Optional[list]:
+        """
+        Cached results for a query, or None.
+
+        Args:
+            query: Raw query text
+            k: Number of results wanted; entries cached with fewer miss
+            fuzzy: Allow near-duplicate matches (pass False for queries that
+                   name a specific example, equation, etc.)
+        """
+        key = normalize_query(query)
+        entry = self.entries.get(key)
+
+        if entry is None and fuzzy and self._vectors is not None:
+            scores = self._vectors @ self.embedder.embed([key])[0]
+            wanted = numbers(key)
+            for best in np.argsort(-scores):
+                if scores[best] < self.threshold:
+                    break
+                if numbers(self._keys[best]) == wanted:
+                    key = self._keys[best]
+                    entry = self.entries.get(key)
+                    break
+
+        if entry is None or entry["k"] < k:
+            return None
+        self.entries.move_to_end(key)
+        return entry["results"][:k]
+
+    def put(self, query: str, k: int, results: list) -> None:
+        """Cache results for a query, evicting the least recently used."""
+        key = normalize_query(query)
+        is_new = key not in self.entries
+        self.entries[key] = {"k": k, "results": results}
+        self.entries.move_to_end(key)
+
+        if is_new and self.embedder is not None:
+            vector = self.embedder.embed([key])
+            self._keys.append(key)
+            self._vectors = vector if self._vectors is None else np.vstack([self._vectors, vector])
+
+        evicted = set()
+        while len(self.entries) > self.capacity:
+            evicted.add(self.entries.popitem(last=False)[0])
+        if evicted and self._vectors is not None:
+            keep = [i for i, key in enumerate(self._keys) if key not in evicted]
+            self._keys = [self._keys[i] for i in keep]
+            self._vectors = self._vectors[keep]
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every or time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def cached(self, search: Callable[..., list]) -> Callable[..., list]:
+        """Wrap a search(query, k) function with this cache."""
+
+        def wrapper(query: str, k: int = 5, **kwargs) -> list:
+            if kwargs:
+                return search(query, k, **kwargs)
+            results = self.get(query, k)
+            if results is None:
+                results = search(query, k)
+                self.put(query, k, results)
+            return results
+
+        return wrapper
@@ -0,0 +1,215 @@
+"""
+Sync the whole workspace: every Google Drive folder and git-hosted lab repo
+configured in config.json, run as concurrent jobs on one worker pool.
+
+config.json is read once and Drive is authenticated once; each worker thread
+gets its own fork of that client (googleapiclient is not thread-safe). A
+course gets a Drive job if it has drive_folder_name, and a labs job if it
+has repo_url (ECE 270 always has one, defaulting to the course repo).
+
+Lab jobs that share a mirror (same repo) run one after another, since git
+fetches into the same bare repo would fight over ref locks. Drive jobs split
+the worker budget for their downloads, so the total number of download
+threads (and forked clients) stays around --workers.
+
+Run: python3 sync_all.py [--workers N] [COURSE ...]
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from google_drive_api import GoogleDriveAPI
+from blob_store import BlobStore, BLOB_DIR
+from pull_ece_files import (
+    course_profile, list_available_folders, load_config, resolve_course_folders, sync_folder,
+)
+from sync_ece270_labs import lab_mirror_path, sync_labs
+
+DEFAULT_WORKERS = 8
+
+
+def plan_jobs(config, courses=None):
+    """
+    Jobs to run for the configured courses.
+
+    Args:
+        config: Parsed config.json
+        courses: Only these course names (default: all)
+
+    Returns:
+        List of (course_name, source) with source "drive" or "labs"
+    """
+    jobs = []
+    for name, course in config["courses"].items():
+        if courses and name not in courses:
+            continue
+        if "drive_folder_name" in course:
+            jobs.append((name, "drive"))
+        if "repo_url" in course or name == "ECE 270":
+            jobs.append((name, "labs"))
+    return jobs
+
+
+class SyncAll:
+    def __init__(self, config, workers=DEFAULT_WORKERS):
+        """
+        Args:
+            config: Parsed config.json
+            workers: Size of the shared worker pool
+        """
+        self.config = config
+        self.base_path = Path(config["workspace_path"])
+        self.workers = workers
+        self.drive = None
+        self.folder_ids = {}
+        self.store = BlobStore(self.base_path / BLOB_DIR)
+        self.download_workers = 1
+        self._local = threading.local()
+
+    def drive_client(self):
+        """This thread's Drive client, forked from the shared one."""
+        if not hasattr(self._local, "drive"):
+            self._local.drive = self.drive.fork()
+        return self._local.drive
+
+    def run_job(self, course_name, source):
+        """
+        Run one job, never raising.
+
+        Returns:
+            Dict with course, source, ok, detail, seconds
+        """
+        course = self.config["courses"][course_name]
+        start = time.perf_counter()
+        try:
+            if source == "drive":
+                folder_id = self.folder_ids.get(course["drive_folder_name"])
+                if not folder_id:
+                    raise LookupError(f"folder '{course['drive_folder_name']}' not found")
+                counts = sync_folder(
+                    self.drive_client(),
+                    course["drive_folder_name"],
+                    str(self.base_path / course["local_folder_name"]),
+                    self.store,
+                    course_profile(course),
+                    course.get("drive_filters"),
+                    workers=self.download_workers,
+                    folder_id=folder_id,
+                )
+                ok = counts is not None
+                detail = (
+                    f"{counts['saved']} saved, {counts['deduplicated']} deduplicated, "
+                    f"{counts['cached']} cached, "
+                    f"{counts['errors']} errors"
+                    if ok else f"folder '{course['drive_folder_name']}' not found"
+                )
+            else:
+                result = sync_labs(self.base_path, course_name, course)
+                ok = result is not None
+                detail = (
+                    ", ".join(f"{len(paths)} {outcome}" for outcome, paths in result.items())
+                    if ok else "mirror update failed"
+                )
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        return {
+            "course": course_name,
+            "source": source,
+            "ok": ok,
+            "detail": detail,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def group_jobs(self, jobs):
+        """
+        Units of work for the pool: each Drive job alone, and lab jobs
+        grouped by mirror so no two fetch into the same bare repo at once.
+
+        Returns:
+            List of lists of job indexes, each run in order by one worker
+        """
+        units, by_mirror = [], {}
+        for i, (course_name, source) in enumerate(jobs):
+            if source != "labs":
+                units.append([i])
+                continue
+            mirror = lab_mirror_path(self.base_path, self.config["courses"][course_name])
+            if mirror not in by_mirror:
+                by_mirror[mirror] = []
+                units.append(by_mirror[mirror])
+            by_mirror[mirror].append(i)
+        return units
+
+    def run(self, jobs):
+        """
+        Run jobs concurrently.
+
+        Args:
+            jobs: List of (course_name, source) from plan_jobs
+
+        Returns:
+            List of job results, in job order
+        """
+        if self.drive is None and any(source == "drive" for _, source in jobs):
+            # Authenticate up front, in the main thread (may open a browser)
+            self.drive = GoogleDriveAPI()
+            self.drive.authenticate()
+        if self.drive is not None:
+            self.folder_ids = resolve_course_folders(self.drive, self.config)
+
+        drive_jobs = sum(source == "drive" for _, source in jobs)
+        self.download_workers = max(1, self.workers // max(1, min(drive_jobs, self.workers)))
+
+        results = [None] * len(jobs)
+
+        def run_unit(unit):
+            for i in unit:
+                results[i] = self.run_job(*jobs[i])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(run_unit, self.group_jobs(jobs)))
+        return results
+
+
+def print_summary(results, elapsed):
+    print("\n" + "=" * 60)
+    print("SYNC SUMMARY")
+    print("=" * 60)
+    for r in results:
+        status = "ok" if r["ok"] else "FAILED"
+        print(f"  {r['course']:<20} {r['source']:<6} {status:<7} {r['seconds']:6.1f}s  {r['detail']}")
+    ok = sum(r["ok"] for r in results)
+    total = sum(r["seconds"] for r in results)
+    print(f"\n{ok}/{len(results)} jobs succeeded in {elapsed:.1f}s "
+          f"({total:.1f}s of work).")
+
+
+def main():
+    args = sys.argv[1:]
+    workers = DEFAULT_WORKERS
+    if "--workers" in args:
+        at = args.index("--workers")
+        workers = int(args[at + 1])
+        args = args[:at] + args[at + 2:]
+
+    config = load_config()
+    jobs = plan_jobs(config, args or None)
+    if not jobs:
+        print("Nothing to sync. Add drive_folder_name or repo_url to courses in config.json.")
+        return
+
+    print(f"Syncing {len(jobs)} job(s) with {workers} workers...")
+    orchestrator = SyncAll(config, workers)
+    start = time.perf_counter()
+    results = orchestrator.run(jobs)
+    print_summary(results, time.perf_counter() - start)
+
+    if orchestrator.drive and any(not r["ok"] and r["source"] == "drive" for r in results):
+        list_available_folders(orchestrator.drive)
+
+
+if __name__ == "__main__":
+    main()
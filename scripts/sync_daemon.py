@@ -0,0 +1,410 @@
+"""
+Continuous course sync.
+
+Polls the Google Drive changes feed and each course's lab repo mirror on a
+schedule, applies only what changed, and re-indexes only the courses whose
+textbook or context_db files changed. context_db entries are edited locally,
+so they are their own source: each poll rebuilds the index of any course
+whose entry files no longer match it. A source that fails backs off
+exponentially (interval * 2^failures, capped at --max-backoff) and recovers
+on its next success.
+
+The first Drive poll does a full sync of every course folder and records a
+changes-feed token; every later poll downloads just the files the feed
+reports in a course folder. Files that are deleted, trashed or moved out of
+a course folder are removed locally, and renamed files replace their old
+local copies. A file that fails to sync is reported in the status and
+retried on the next poll, without holding back the rest of the feed. The
+token, the local paths written for each Drive file, the retry list, and the
+courses whose textbook still needs re-ingesting are kept in
+<workspace>/.sync_state.json so a restart resumes where it stopped; a
+failed re-ingest is retried on every poll until it succeeds.
+
+Status is written to <workspace>/.sync_status.json after every poll, and
+with --port it is also served as JSON at http://127.0.0.1:PORT/.
+
+Run: python3 sync_daemon.py [--interval SECONDS] [--max-backoff SECONDS] [--port PORT] [--once]
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from blob_store import BlobStore, BLOB_DIR
+from context_db_index import ContextDBIndex
+from drive_query import FOLDER_MIME, DriveQuery
+from google_drive_api import GoogleDriveAPI
+from pull_ece_files import course_profile, load_config, resolve_course_folders, sync_file, sync_folder
+from sync_ece270_labs import sync_labs
+
+DEFAULT_INTERVAL = 300
+DEFAULT_MAX_BACKOFF = 3600
+STATE_FILE = ".sync_state.json"
+STATUS_FILE = ".sync_status.json"
+INGEST_SCRIPT = Path("scripts") / "ingest_textbook.py"
+CHANGE_FIELDS = "id, name, mimeType, size, modifiedTime, md5Checksum, parents, trashed"
+MAX_FILE_ERRORS = 20
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def folder_digests(path):
+    """{file: sha256} for the files directly inside a folder."""
+    path = Path(path)
+    if not path.is_dir():
+        return {}
+    digests = {}
+    for p in path.iterdir():
+        if p.is_file():
+            digests[p] = hashlib.sha256(p.read_bytes()).hexdigest()
+    return digests
+
+
+def write_json(path, data):
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+class SyncDaemon:
+    def __init__(self, config, interval=DEFAULT_INTERVAL, max_backoff=DEFAULT_MAX_BACKOFF, drive=None):
+        """
+        Args:
+            config: Parsed config.json
+            interval: Seconds between polls of a healthy source
+            max_backoff: Longest wait after repeated failures
+            drive: Authenticated Drive client (authenticated here if needed)
+        """
+        self.config = config
+        self.base_path = Path(config["workspace_path"])
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.store = BlobStore(self.base_path / BLOB_DIR)
+        self.state_path = self.base_path / STATE_FILE
+        self.status_path = self.base_path / STATUS_FILE
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+
+        courses = config["courses"]
+        self.drive_courses = [name for name, c in courses.items() if "drive_folder_name" in c]
+        self.lab_courses = [name for name, c in courses.items() if "repo_url" in c or name == "ECE 270"]
+
+        self.drive = drive
+        if self.drive_courses and self.drive is None:
+            self.drive = GoogleDriveAPI()
+            self.drive.authenticate()
+        self.folder_ids = {}
+
+        sources = (["drive"] if self.drive_courses else []) + [f"labs:{c}" for c in self.lab_courses] + ["context_db"]
+        self.status = {
+            "pid": os.getpid(),
+            "started": now_iso(),
+            "updated": now_iso(),
+            "sources": {
+                name: {"last_poll": None, "last_success": None, "last_error": None,
+                       "failures": 0, "next_poll": time.time(), "changes": 0}
+                for name in sources
+            },
+            "reindexed": [],
+        }
+        if self.drive_courses:
+            self.status["sources"]["drive"].update(file_errors=[], retrying=0)
+        self.snapshot = b"{}"
+
+    def course_path(self, course_name):
+        course = self.config["courses"][course_name]
+        return self.base_path / course.get("local_folder_name", course_name)
+
+    def poll_drive(self):
+        """
+        Apply Drive changes since the last poll.
+
+        Returns:
+            {course_name: [changed local paths]}
+        """
+        token = self.state.get("drive_page_token")
+        files = self.state.setdefault("drive_files", {})
+        changed = {}
+        errors = []
+        if token is None:
+            # Take the token first so changes made during the full sync are not lost
+            token = self.drive.get_start_page_token()
+            folder_of = {name: fid for fid, name in self.resolve_folders().items()}
+            failed = []
+            for name in self.drive_courses:
+                course = self.config["courses"][name]
+                if name not in folder_of:
+                    raise RuntimeError(f"Drive folder '{course['drive_folder_name']}' not found")
+                before = folder_digests(self.course_path(name))
+                synced = {}
+                sync_folder(self.drive, course["drive_folder_name"], str(self.course_path(name)),
+                            self.store, course_profile(course), course.get("drive_filters"),
+                            folder_id=folder_of[name], synced=synced)
+                for file_id, paths in synced.items():
+                    if paths is None:
+                        failed.append(file_id)
+                        errors.append({"file_id": file_id, "course": name, "error": "download failed", "at": now_iso()})
+                    else:
+                        files[file_id] = {"course": name, "paths": [self.relative(p) for p in paths]}
+                after = folder_digests(self.course_path(name))
+                changed[name] = [p for p, digest in after.items() if before.get(p) != digest]
+        else:
+            changes, token = self.drive.list_changes(token)
+            by_folder = self.resolve_folders()
+
+            # Files that failed last time are fetched again unless the feed has them
+            seen = {change["fileId"] for change in changes}
+            retry = [file_id for file_id in self.state.get("drive_retry", []) if file_id not in seen]
+            if retry:
+                metadata = self.drive.get_files_metadata(retry, fields=CHANGE_FIELDS)
+                changes += [{"fileId": fid, "removed": meta is None, "file": meta} for fid, meta in metadata.items()]
+
+            failed = []
+            for change in changes:
+                try:
+                    self.apply_change(change, by_folder, changed)
+                except Exception as e:
+                    name = (change.get("file") or {}).get("name", change["fileId"])
+                    print(f"  Error syncing {name}: {e}")
+                    failed.append(change["fileId"])
+                    errors.append({"file_id": change["fileId"], "name": name,
+                                   "error": f"{type(e).__name__}: {e}", "at": now_iso()})
+
+        # Queued with the token so a consumed textbook change is never lost
+        self.queue_reindex(changed)
+        self.state["drive_page_token"] = token
+        self.state["drive_retry"] = failed
+        write_json(self.state_path, self.state)
+        info = self.status["sources"]["drive"]
+        info["file_errors"] = (info["file_errors"] + errors)[-MAX_FILE_ERRORS:]
+        info["retrying"] = len(failed)
+        return changed
+
+    def relative(self, path):
+        return str(Path(path).relative_to(self.base_path))
+
+    def apply_change(self, change, by_folder, changed):
+        """
+        Apply one changes-feed entry: download the file if it is in a course
+        folder, and remove local copies it no longer has (deleted, trashed,
+        moved away, or renamed).
+        """
+        file_id = change["fileId"]
+        file_info = change.get("file")
+        record = self.state["drive_files"].get(file_id)
+
+        course_name = None
+        if (not change.get("removed") and file_info and not file_info.get("trashed")
+                and file_info["mimeType"] != FOLDER_MIME):
+            for parent in file_info.get("parents", []):
+                if parent in by_folder:
+                    name = by_folder[parent]
+                    if DriveQuery.from_filters(self.config["courses"][name].get("drive_filters")).matches(file_info):
+                        course_name = name
+                    break
+
+        paths = []
+        if course_name is not None:
+            course = self.config["courses"][course_name]
+            _, synced = sync_file(self.drive, file_info, str(self.course_path(course_name)),
+                                  self.store, course_profile(course))
+            paths = [Path(p) for p in synced]
+            changed.setdefault(course_name, []).extend(paths)
+
+        if record is not None:
+            # Paths another Drive file still maps to (same name) are left alone
+            owned = {p for fid, r in self.state["drive_files"].items() if fid != file_id for p in r["paths"]}
+            keep = {self.relative(p) for p in paths} | owned
+            for old in record["paths"]:
+                if old not in keep:
+                    path = self.base_path / old
+                    if path.exists():
+                        print(f"  Removing: {old}")
+                        path.unlink()
+                        changed.setdefault(record["course"], []).append(path)
+
+        if paths:
+            self.state["drive_files"][file_id] = {"course": course_name, "paths": [self.relative(p) for p in paths]}
+        else:
+            self.state["drive_files"].pop(file_id, None)
+
+    def resolve_folders(self):
+        """{folder_id: course_name} for the Drive courses, resolved once per run."""
+        if not self.folder_ids:
+            by_name = resolve_course_folders(self.drive, self.config)
+            for name in self.drive_courses:
+                folder_id = by_name.get(self.config["courses"][name]["drive_folder_name"])
+                if folder_id:
+                    self.folder_ids[folder_id] = name
+        return self.folder_ids
+
+    def poll_labs(self, course_name):
+        """Sync one course's labs. Returns {course_name: [changed local paths]}."""
+        course = self.config["courses"][course_name]
+        result = sync_labs(self.base_path, course_name, course)
+        if result is None:
+            raise RuntimeError("mirror update failed")
+        labs_path = self.course_path(course_name) / course.get("labs_path", "student-labs-main")
+        paths = [labs_path / p for key in ("added", "updated", "removed") for p in result[key]]
+        return {course_name: paths} if paths else {}
+
+    def queue_reindex(self, changed):
+        """
+        Mark courses whose textbook is among their changed paths as needing
+        a re-ingest. Returns True if any course was added.
+        """
+        pending = self.state.setdefault("reindex_pending", [])
+        added = False
+        for course_name, paths in changed.items():
+            textbook = self.config["courses"][course_name].get("textbook_filename")
+            ingest = self.course_path(course_name) / INGEST_SCRIPT
+            if (textbook and any(Path(p).name == textbook for p in paths) and ingest.exists()
+                    and course_name not in pending):
+                pending.append(course_name)
+                added = True
+        return added
+
+    def reindex(self):
+        """Re-ingest every pending textbook, dropping each from the queue once it succeeds."""
+        for course_name in list(self.state.get("reindex_pending", [])):
+            ingest = self.course_path(course_name) / INGEST_SCRIPT
+            if ingest.exists():
+                print(f"[{course_name}] textbook changed, re-ingesting...")
+                subprocess.run([sys.executable, ingest.name], cwd=ingest.parent, check=True)
+                self.record_reindex(course_name, "textbook")
+            self.state["reindex_pending"].remove(course_name)
+            write_json(self.state_path, self.state)
+
+    def poll_context_dbs(self):
+        """Rebuild the index of every course whose context_db entry files changed."""
+        for course_name, course in self.config["courses"].items():
+            db_path = self.course_path(course_name) / course.get("context_db_path", "context_db")
+            if db_path.is_dir() and not ContextDBIndex.is_current(db_path):
+                print(f"[{course_name}] context_db changed, rebuilding index...")
+                ContextDBIndex.build(db_path).save(db_path)
+                self.record_reindex(course_name, "context_db")
+        return {}
+
+    def record_reindex(self, course_name, what):
+        self.status["reindexed"] = (self.status["reindexed"] + [
+            {"course": course_name, "index": what, "at": now_iso()}
+        ])[-20:]
+
+    def poll(self, source):
+        """Poll one source, updating its status and backoff."""
+        info = self.status["sources"][source]
+        info["last_poll"] = now_iso()
+        try:
+            if source == "drive":
+                changed = self.poll_drive()
+            elif source == "context_db":
+                changed = self.poll_context_dbs()
+            else:
+                changed = self.poll_labs(source.split(":", 1)[1])
+            for paths in changed.values():
+                info["changes"] += len(paths)
+            if self.queue_reindex(changed):
+                write_json(self.state_path, self.state)
+            self.reindex()
+        except Exception as e:
+            info["failures"] += 1
+            info["last_error"] = f"{type(e).__name__}: {e}"
+            delay = min(self.interval * 2 ** info["failures"], self.max_backoff)
+            print(f"[{source}] poll failed ({info['last_error']}); retrying in {delay:.0f}s")
+        else:
+            info["failures"] = 0
+            info["last_error"] = None
+            info["last_success"] = info["last_poll"]
+            delay = self.interval
+        info["next_poll"] = time.time() + delay
+
+    def write_status(self):
+        self.status["updated"] = now_iso()
+        write_json(self.status_path, self.status)
+        with self.lock:
+            self.snapshot = json.dumps(self.status, indent=2).encode()
+
+    def run_once(self):
+        """Poll every source once, regardless of schedule."""
+        for source in self.status["sources"]:
+            self.poll(source)
+        self.write_status()
+
+    def run_forever(self):
+        """Poll sources as they come due until stop is set."""
+        while not self.stop.is_set():
+            for source, info in self.status["sources"].items():
+                if info["next_poll"] <= time.time() and not self.stop.is_set():
+                    self.poll(source)
+                    self.write_status()
+            next_due = min(info["next_poll"] for info in self.status["sources"].values())
+            self.stop.wait(max(0.0, next_due - time.time()))
+
+    def serve_status(self, port):
+        """Serve the status as JSON on 127.0.0.1:port from a background thread."""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with daemon.lock:
+                    body = daemon.snapshot
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--interval", "--max-backoff", "--port"):
+        if flag in args:
+            at = args.index(flag)
+            options[flag] = float(args[at + 1])
+            args = args[:at] + args[at + 2:]
+
+    daemon = SyncDaemon(
+        load_config(),
+        interval=options.get("--interval", DEFAULT_INTERVAL),
+        max_backoff=options.get("--max-backoff", DEFAULT_MAX_BACKOFF),
+    )
+    if not daemon.drive_courses and not daemon.lab_courses:
+        print("Nothing to sync. Add drive_folder_name or repo_url to courses in config.json.")
+        return
+
+    if "--once" in args:
+        daemon.run_once()
+        return
+
+    if "--port" in options:
+        daemon.serve_status(int(options["--port"]))
+        print(f"Status at http://127.0.0.1:{int(options['--port'])}/")
+    print(f"Watching {len(daemon.status['sources'])} source(s); status in {daemon.status_path}")
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        print("\nStopping.")
+        daemon.write_status()
+
+
+if __name__ == "__main__":
+    main()
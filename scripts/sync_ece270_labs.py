@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
 """
-Sync new ECE 270 labs without touching existing content.
-Run: python3 sync_ece270_labs.py
+Sync ECE 270 labs without clobbering local edits.
+
+Keeps a persistent bare mirror of the course repo under the workspace
+(.mirrors/student-labs.git) and updates it with git fetch, so checking for
+changes is one small fetch instead of a full clone. Changed paths come from
+git diff between the last synced commit and the new head.
+
+Each installed file's upstream blob hash is recorded, so fixes pushed to
+existing labs are applied to files you haven't edited. Files changed on both
+sides are left alone and the upstream version is saved next to them as
+<name>.upstream.
+
+The repo URL can be overridden with "repo_url" in the ECE 270 config (or
+--repo), e.g. a local bare repo for testing.
+
+Run: python3 sync_ece270_labs.py [--repo URL_OR_PATH]
 """
+import hashlib
 import subprocess
-import tempfile
-import shutil
 import json
 import sys
 from pathlib import Path
@@ -13,6 +26,9 @@ from pathlib import Path
 SCRIPT_DIR = Path(__file__).parent
 CONFIG_PATH = SCRIPT_DIR.parent / "config.json"
 COURSE_REPO = "https://github.com/ece270/student-labs.git"
+MIRROR_DIR = ".mirrors"
+STATE_FILE = ".lab_sync.json"
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
 
 
 def load_config():
@@ -28,73 +44,323 @@ def load_config():
 
 def get_lab_folders(path):
     """Get all labX folders in a directory."""
+    path = Path(path)
+    if not path.exists():
+        return set()
     return {
-        d.name for d in Path(path).iterdir()
-        if d.is_dir() and d.name.startswith("lab") and d.name[3:].isdigit()
+        d.name for d in path.iterdir()
+        if d.is_dir() and is_lab_name(d.name)
     }
 
 
-def sync():
-    config = load_config()
-    base_path = Path(config["workspace_path"])
+def is_lab_name(name):
+    return name.startswith("lab") and name[3:].isdigit()
 
-    # Get ECE 270 config
-    ece270_config = config["courses"].get("ECE 270", {})
-    local_folder = ece270_config.get("local_folder_name", "ECE 270")
-    labs_path = ece270_config.get("labs_path", "student-labs-main")
 
-    local_path = base_path / local_folder / labs_path
+def git(*args, git_dir=None, input=None):
+    """Run git, returning stdout bytes. Raises CalledProcessError on failure."""
+    cmd = ["git"]
+    if git_dir is not None:
+        cmd.append(f"--git-dir={git_dir}")
+    result = subprocess.run(cmd + list(args), input=input, capture_output=True, check=True)
+    return result.stdout
 
-    print("Checking for new ECE 270 labs...")
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        clone_path = Path(tmpdir) / "student-labs"
+def update_mirror(repo_url, mirror_path):
+    """
+    Create or fetch the bare mirror.
 
-        result = subprocess.run(
-            ["git", "clone", "--depth", "1", COURSE_REPO, str(clone_path)],
-            capture_output=True,
-            text=True
-        )
+    Returns:
+        Commit hash of the mirror's HEAD after the update
+    """
+    mirror_path = Path(mirror_path)
+    if not (mirror_path / "HEAD").exists():
+        mirror_path.parent.mkdir(parents=True, exist_ok=True)
+        git("clone", "--mirror", "--quiet", str(repo_url), str(mirror_path))
+    else:
+        current = git("config", "--get", "remote.origin.url", git_dir=mirror_path).decode().strip()
+        if current != str(repo_url):
+            git("remote", "set-url", "origin", str(repo_url), git_dir=mirror_path)
+        git("fetch", "--prune", "--quiet", "origin", git_dir=mirror_path)
+    return git("rev-parse", "HEAD^{commit}", git_dir=mirror_path).decode().strip()
 
-        if result.returncode != 0:
-            print(f"Failed to clone repo: {result.stderr}")
-            return
 
-        remote_labs = get_lab_folders(clone_path)
-        local_labs = get_lab_folders(local_path)
-        new_labs = remote_labs - local_labs
+def has_commit(mirror_path, commit):
+    try:
+        git("cat-file", "-e", f"{commit}^{{commit}}", git_dir=mirror_path)
+        return True
+    except subprocess.CalledProcessError:
+        return False
 
-        if not new_labs:
-            print("No new labs available. You're up to date.")
-            return
 
-        print(f"Found {len(new_labs)} new lab(s)!")
+def changed_files(mirror_path, old, new):
+    """
+    Files changed between two commits, from git diff --raw (the same list
+    as --name-status, plus the new blob hash of each file).
 
-        for lab in sorted(new_labs):
-            src = clone_path / lab
-            dst = local_path / lab
-            shutil.copytree(src, dst)
-            print(f"  Added: {lab}")
+    Args:
+        old: Last synced commit, or None to diff against the empty tree
+             (also used when old is gone from the mirror after a force push)
+
+    Returns:
+        List of (status, path, blob) with status A, M or D; blob is None for D
+    """
+    if not old or not has_commit(mirror_path, old):
+        old = EMPTY_TREE
+    out = git("diff", "--raw", "-z", "--no-renames", "--no-abbrev", old, new, git_dir=mirror_path)
+    fields = out.decode().split("\0")
+    changes = []
+    for i in range(0, len(fields) - 1, 2):
+        _, _, _, blob, status = fields[i].split()
+        changes.append((status[0], fields[i + 1], None if status[0] == "D" else blob))
+    return changes
+
+
+def tree_blobs(mirror_path, commit):
+    """{path: blob hash} for every file at a commit."""
+    out = git("ls-tree", "-r", "-z", "--full-tree", commit, git_dir=mirror_path)
+    blobs = {}
+    for entry in out.decode().split("\0"):
+        if entry:
+            meta, path = entry.split("\t", 1)
+            blobs[path] = meta.split()[2]
+    return blobs
+
+
+def blob_hash(path):
+    """Git blob hash of a local file, or None if it doesn't exist."""
+    try:
+        data = Path(path).read_bytes()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def read_blobs(mirror_path, commit, paths):
+    """
+    File contents at a commit, read in one git cat-file --batch call.
+
+    Returns:
+        {path: bytes}; paths that do not exist at the commit are omitted
+    """
+    if not paths:
+        return {}
+    request = "".join(f"{commit}:{p}\n" for p in paths).encode()
+    out = git("cat-file", "--batch", git_dir=mirror_path, input=request)
+
+    blobs, pos = {}, 0
+    for path in paths:
+        end = out.index(b"\n", pos)
+        header = out[pos:end].split()
+        pos = end + 1
+        if header[-1] == b"missing":
+            continue
+        size = int(header[2])
+        blobs[path] = out[pos:pos + size]
+        pos += size + 1
+    return blobs
+
+
+def load_state(local_path):
+    path = Path(local_path) / STATE_FILE
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(local_path, state):
+    path = Path(local_path) / STATE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(path)
+
+
+def is_synced_path(path):
+    """Lab folders and refs/ are synced; the rest of the repo is not."""
+    top = path.split("/", 1)[0]
+    return is_lab_name(top) or top == "refs"
+
+
+def write_file(target, data):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".sync-tmp")
+    tmp.write_bytes(data)
+    tmp.replace(target)
+
+
+def apply_changes(mirror_path, head, changes, local_path, state):
+    """
+    Three-way merge of upstream changes into the local labs folder.
+
+    For each file, the base is the blob hash recorded when it was last
+    installed (state["files"]), theirs is the upstream blob, and ours is the
+    file on disk. Unmodified files are updated or removed; modified files
+    are left alone and the upstream version is written next to them as
+    <name>.upstream. Conflicts stay in state["conflicts"] until the local
+    file matches upstream or the .upstream copy is deleted (keeping ours).
 
-        # Sync new files in refs/ without overwriting existing
-        remote_refs = clone_path / "refs"
-        local_refs = local_path / "refs"
-        new_refs = []
+    Returns:
+        Dict of path lists: added, updated, removed, conflicts
+    """
+    local_path = Path(local_path)
+    files = state.setdefault("files", {})
+    conflicts = state.setdefault("conflicts", {})
+    result = {"added": [], "updated": [], "removed": [], "conflicts": []}
 
-        if remote_refs.exists():
-            for item in remote_refs.rglob("*"):
-                if item.is_file():
-                    relative = item.relative_to(remote_refs)
-                    target = local_refs / relative
-                    if not target.exists():
-                        target.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(item, target)
-                        new_refs.append(str(relative))
+    # Re-check unresolved conflicts alongside this run's changes
+    pending = {path: (status, blob) for status, path, blob in changes if is_synced_path(path)}
+    for path, blob in conflicts.items():
+        pending.setdefault(path, ("M", blob))
 
-        if new_refs:
-            print(f"  Added {len(new_refs)} new reference file(s)")
+    # Files installed before hashes were tracked: their base is the old commit
+    old_tree = {}
+    if state.get("commit") and has_commit(mirror_path, state["commit"]) \
+            and any(path not in files for path in pending):
+        old_tree = tree_blobs(mirror_path, state["commit"])
+
+    to_read = []
+    for path, (status, theirs) in sorted(pending.items()):
+        target = local_path / path
+        ours = blob_hash(target)
+        base = files.get(path, old_tree.get(path))
+
+        if ours == theirs:
+            # Already identical (including conflicts resolved by taking theirs)
+            if theirs:
+                files[path] = theirs
+            else:
+                files.pop(path, None)
+            conflicts.pop(path, None)
+            Path(str(target) + ".upstream").unlink(missing_ok=True)
+            continue
+
+        if path in conflicts and conflicts[path] == theirs \
+                and not Path(str(target) + ".upstream").exists():
+            # .upstream deleted: keep the local version, treat theirs as the base
+            files[path] = theirs
+            del conflicts[path]
+            continue
+
+        if status == "D":
+            if ours is not None and ours == base:
+                target.unlink()
+                result["removed"].append(path)
+            files.pop(path, None)
+            conflicts.pop(path, None)
+            continue
+
+        if ours is None and base is None:
+            to_read.append((path, "added"))
+        elif ours == base:
+            to_read.append((path, "updated"))
+        elif ours is None:
+            # Deleted locally after being installed: respect that
+            files[path] = theirs
+        else:
+            to_read.append((path, "conflicts"))
+            conflicts[path] = theirs
+
+    blobs = read_blobs(mirror_path, head, [path for path, _ in to_read])
+    for path, outcome in to_read:
+        if path not in blobs:
+            continue
+        target = local_path / path
+        if outcome == "conflicts":
+            write_file(Path(str(target) + ".upstream"), blobs[path])
+        else:
+            write_file(target, blobs[path])
+            files[path] = pending[path][1]
+        result[outcome].append(path)
+
+    return result
+
+
+def mirror_name(repo_url):
+    """Mirror directory name for a repo URL or path (student-labs.git)."""
+    name = Path(str(repo_url).rstrip("/")).name
+    return name if name.endswith(".git") else name + ".git"
+
+
+def lab_mirror_path(base_path, course_config):
+    """Bare mirror a course's labs sync through; courses with the same repo share one."""
+    configured = course_config.get("repo_url", COURSE_REPO)
+    return Path(base_path) / MIRROR_DIR / course_config.get("mirror_name", mirror_name(configured))
+
+
+def sync_labs(base_path, course_name, course_config, repo_url=None):
+    """
+    Sync one course's labs from its git repo.
+
+    Args:
+        base_path: Workspace path
+        course_name: Key of the course in config.json
+        course_config: That course's config (local_folder_name, labs_path,
+                       repo_url, mirror_name)
+        repo_url: Overrides the configured repo for this run
+
+    Returns:
+        Dict of path lists (added, updated, removed, conflicts), or None if
+        the mirror could not be updated
+    """
+    local_folder = course_config.get("local_folder_name", course_name)
+    labs_path = course_config.get("labs_path", "student-labs-main")
+    configured = course_config.get("repo_url", COURSE_REPO)
+    repo_url = repo_url or configured
+
+    local_path = Path(base_path) / local_folder / labs_path
+    mirror_path = lab_mirror_path(base_path, course_config)
+
+    print(f"Checking for {course_name} lab updates...")
+
+    try:
+        head = update_mirror(repo_url, mirror_path)
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to update mirror: {e.stderr.decode().strip()}")
+        return None
+
+    state = load_state(local_path)
+    last = state.get("commit")
+    if last == head and not state.get("conflicts"):
+        print("No lab updates available. You're up to date.")
+        return {"added": [], "updated": [], "removed": [], "conflicts": []}
+
+    changes = [] if last == head else changed_files(mirror_path, last, head)
+    local_labs = get_lab_folders(local_path)
+    result = apply_changes(mirror_path, head, changes, local_path, state)
+
+    state["commit"] = head
+    state["repo"] = str(repo_url)
+    save_state(local_path, state)
+
+    new_labs = sorted(get_lab_folders(local_path) - local_labs)
+    if new_labs:
+        print(f"Found {len(new_labs)} new lab(s)!")
+        for lab in new_labs:
+            print(f"  Added: {lab}")
+    for outcome in ("added", "updated", "removed"):
+        if result[outcome]:
+            print(f"  {outcome.capitalize()} {len(result[outcome])} file(s)")
+    if result["conflicts"]:
+        print(f"  {len(result['conflicts'])} file(s) changed both locally and upstream "
+              "(upstream copy saved as <name>.upstream):")
+        for path in result["conflicts"]:
+            print(f"    {path}")
+    if not any(result.values()):
+        print(f"No lab updates to apply ({len(changes)} upstream change(s) since last sync).")
+    else:
+        print("Sync complete.")
+    return result
+
+
+def sync(repo_url=None):
+    config = load_config()
+    ece270_config = config["courses"].get("ECE 270", {})
+    return sync_labs(config["workspace_path"], "ECE 270", ece270_config, repo_url)
 
-    print("Sync complete.")
 
 if __name__ == "__main__":
-    sync()
+    args = sys.argv[1:]
+    sync(args[args.index("--repo") + 1] if "--repo" in args else None)